@@ -0,0 +1,71 @@
+"""Denormalized course and lesson counters
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _counter(name):
+    return sa.Column(name, sa.Integer(), nullable=False, server_default='0')
+
+
+def upgrade():
+    op.create_table(
+        'course_stats',
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        _counter('lesson_count'),
+        _counter('enrollment_count'),
+        _counter('comment_count'),
+        _counter('rating_sum'),
+        _counter('rating_count'),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('course_id')
+    )
+    op.create_table(
+        'lesson_stats',
+        sa.Column('lesson_id', sa.Integer(), nullable=False),
+        _counter('comment_count'),
+        _counter('rating_sum'),
+        _counter('rating_count'),
+        sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('lesson_id')
+    )
+
+    # Заполнение счетчиков по существующим данным (то же, что python -m app.aggregates reconcile)
+    op.execute("""
+        INSERT INTO lesson_stats (lesson_id, comment_count, rating_sum, rating_count)
+        SELECT lessons.id,
+               (SELECT count(comments.id) FROM comments WHERE comments.lesson_id = lessons.id),
+               coalesce((SELECT sum(ratings.stars) FROM ratings WHERE ratings.lesson_id = lessons.id), 0),
+               (SELECT count(ratings.stars) FROM ratings WHERE ratings.lesson_id = lessons.id)
+        FROM lessons
+    """)
+    op.execute("""
+        INSERT INTO course_stats (course_id, lesson_count, enrollment_count, comment_count, rating_sum, rating_count)
+        SELECT courses.id,
+               (SELECT count(lessons.id) FROM lessons WHERE lessons.course_id = courses.id),
+               (SELECT count(enrollments.id) FROM enrollments WHERE enrollments.course_id = courses.id),
+               coalesce((SELECT sum(lesson_stats.comment_count) FROM lesson_stats JOIN lessons
+                         ON lessons.id = lesson_stats.lesson_id WHERE lessons.course_id = courses.id), 0),
+               coalesce((SELECT sum(lesson_stats.rating_sum) FROM lesson_stats JOIN lessons
+                         ON lessons.id = lesson_stats.lesson_id WHERE lessons.course_id = courses.id), 0),
+               coalesce((SELECT sum(lesson_stats.rating_count) FROM lesson_stats JOIN lessons
+                         ON lessons.id = lesson_stats.lesson_id WHERE lessons.course_id = courses.id), 0)
+        FROM courses
+    """)
+
+
+def downgrade():
+    op.drop_table('lesson_stats')
+    op.drop_table('course_stats')
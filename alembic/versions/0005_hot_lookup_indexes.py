@@ -0,0 +1,64 @@
+"""Composite indexes and unique constraints for hot lookups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def _delete_duplicates(table, columns):
+    """Удаление повторов перед созданием уникального ограничения (остается самая ранняя строка)"""
+    op.execute(f"""
+        DELETE FROM {table} WHERE id NOT IN (
+            SELECT min(id) FROM {table} GROUP BY {columns}
+        )
+    """)
+
+
+def upgrade():
+    _delete_duplicates('enrollments', 'user_id, course_id')
+    _delete_duplicates('ratings', 'user_id, lesson_id')
+
+    # Счетчики записей и оценок после удаления повторов
+    op.execute("""
+        UPDATE course_stats SET enrollment_count =
+            (SELECT count(enrollments.id) FROM enrollments WHERE enrollments.course_id = course_stats.course_id)
+    """)
+    op.execute("""
+        UPDATE lesson_stats SET
+            rating_sum = coalesce((SELECT sum(ratings.stars) FROM ratings WHERE ratings.lesson_id = lesson_stats.lesson_id), 0),
+            rating_count = (SELECT count(ratings.stars) FROM ratings WHERE ratings.lesson_id = lesson_stats.lesson_id)
+    """)
+    op.execute("""
+        UPDATE course_stats SET
+            rating_sum = coalesce((SELECT sum(lesson_stats.rating_sum) FROM lesson_stats JOIN lessons
+                                   ON lessons.id = lesson_stats.lesson_id WHERE lessons.course_id = course_stats.course_id), 0),
+            rating_count = coalesce((SELECT sum(lesson_stats.rating_count) FROM lesson_stats JOIN lessons
+                                     ON lessons.id = lesson_stats.lesson_id WHERE lessons.course_id = course_stats.course_id), 0)
+    """)
+
+    with op.batch_alter_table('enrollments') as batch_op:
+        batch_op.create_unique_constraint('uq_enrollments_user_course', ['user_id', 'course_id'])
+    with op.batch_alter_table('ratings') as batch_op:
+        batch_op.create_unique_constraint('uq_ratings_user_lesson', ['user_id', 'lesson_id'])
+
+    op.create_index('ix_lessons_course_order', 'lessons', ['course_id', 'order', 'id'])
+    op.create_index('ix_comments_lesson_id_id', 'comments', ['lesson_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_comments_lesson_id_id', table_name='comments')
+    op.drop_index('ix_lessons_course_order', table_name='lessons')
+    with op.batch_alter_table('ratings') as batch_op:
+        batch_op.drop_constraint('uq_ratings_user_lesson', type_='unique')
+    with op.batch_alter_table('enrollments') as batch_op:
+        batch_op.drop_constraint('uq_enrollments_user_course', type_='unique')
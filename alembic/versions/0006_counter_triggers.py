@@ -0,0 +1,137 @@
+"""Database triggers for rating and enrollment counters
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+# Оценки и записи на курс пишутся через INSERT ... ON CONFLICT в обход событий ORM,
+# их счетчики в course_stats/lesson_stats поддерживают триггеры (см. app.aggregates)
+SQLITE_UPGRADE = (
+    """
+    CREATE TRIGGER IF NOT EXISTS ratings_stats_ai AFTER INSERT ON ratings BEGIN
+        UPDATE lesson_stats SET rating_sum = rating_sum + new.stars, rating_count = rating_count + 1 WHERE lesson_id = new.lesson_id AND new.stars IS NOT NULL;
+        UPDATE course_stats SET rating_sum = rating_sum + new.stars, rating_count = rating_count + 1 WHERE course_id = (SELECT course_id FROM lessons WHERE id = new.lesson_id) AND new.stars IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ratings_stats_ad AFTER DELETE ON ratings BEGIN
+        UPDATE lesson_stats SET rating_sum = rating_sum - old.stars, rating_count = rating_count - 1 WHERE lesson_id = old.lesson_id AND old.stars IS NOT NULL;
+        UPDATE course_stats SET rating_sum = rating_sum - old.stars, rating_count = rating_count - 1 WHERE course_id = (SELECT course_id FROM lessons WHERE id = old.lesson_id) AND old.stars IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ratings_stats_au AFTER UPDATE OF stars, lesson_id ON ratings BEGIN
+        UPDATE lesson_stats SET rating_sum = rating_sum - old.stars, rating_count = rating_count - 1 WHERE lesson_id = old.lesson_id AND old.stars IS NOT NULL;
+        UPDATE course_stats SET rating_sum = rating_sum - old.stars, rating_count = rating_count - 1 WHERE course_id = (SELECT course_id FROM lessons WHERE id = old.lesson_id) AND old.stars IS NOT NULL;
+        UPDATE lesson_stats SET rating_sum = rating_sum + new.stars, rating_count = rating_count + 1 WHERE lesson_id = new.lesson_id AND new.stars IS NOT NULL;
+        UPDATE course_stats SET rating_sum = rating_sum + new.stars, rating_count = rating_count + 1 WHERE course_id = (SELECT course_id FROM lessons WHERE id = new.lesson_id) AND new.stars IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS enrollments_stats_ai AFTER INSERT ON enrollments BEGIN
+        UPDATE course_stats SET enrollment_count = enrollment_count + 1 WHERE course_id = new.course_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS enrollments_stats_ad AFTER DELETE ON enrollments BEGIN
+        UPDATE course_stats SET enrollment_count = enrollment_count - 1 WHERE course_id = old.course_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS enrollments_stats_au AFTER UPDATE OF course_id ON enrollments BEGIN
+        UPDATE course_stats SET enrollment_count = enrollment_count - 1 WHERE course_id = old.course_id;
+        UPDATE course_stats SET enrollment_count = enrollment_count + 1 WHERE course_id = new.course_id;
+    END
+    """,
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS ratings_stats_ai",
+    "DROP TRIGGER IF EXISTS ratings_stats_ad",
+    "DROP TRIGGER IF EXISTS ratings_stats_au",
+    "DROP TRIGGER IF EXISTS enrollments_stats_ai",
+    "DROP TRIGGER IF EXISTS enrollments_stats_ad",
+    "DROP TRIGGER IF EXISTS enrollments_stats_au",
+)
+
+POSTGRESQL_UPGRADE = (
+    """
+    CREATE OR REPLACE FUNCTION ratings_stats() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.stars IS NOT NULL THEN
+            UPDATE lesson_stats SET rating_sum = rating_sum - OLD.stars, rating_count = rating_count - 1
+            WHERE lesson_id = OLD.lesson_id;
+            UPDATE course_stats SET rating_sum = rating_sum - OLD.stars, rating_count = rating_count - 1
+            WHERE course_id = (SELECT course_id FROM lessons WHERE id = OLD.lesson_id);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.stars IS NOT NULL THEN
+            UPDATE lesson_stats SET rating_sum = rating_sum + NEW.stars, rating_count = rating_count + 1
+            WHERE lesson_id = NEW.lesson_id;
+            UPDATE course_stats SET rating_sum = rating_sum + NEW.stars, rating_count = rating_count + 1
+            WHERE course_id = (SELECT course_id FROM lessons WHERE id = NEW.lesson_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER ratings_stats AFTER INSERT OR DELETE OR UPDATE OF stars, lesson_id ON ratings
+    FOR EACH ROW EXECUTE FUNCTION ratings_stats()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION enrollments_stats() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE course_stats SET enrollment_count = enrollment_count - 1 WHERE course_id = OLD.course_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE course_stats SET enrollment_count = enrollment_count + 1 WHERE course_id = NEW.course_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER enrollments_stats AFTER INSERT OR DELETE OR UPDATE OF course_id ON enrollments
+    FOR EACH ROW EXECUTE FUNCTION enrollments_stats()
+    """,
+)
+
+POSTGRESQL_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS ratings_stats ON ratings",
+    "DROP TRIGGER IF EXISTS enrollments_stats ON enrollments",
+    "DROP FUNCTION IF EXISTS ratings_stats()",
+    "DROP FUNCTION IF EXISTS enrollments_stats()",
+)
+
+
+def _run(statements):
+    for statement in statements:
+        op.execute(statement)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_UPGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRESQL_UPGRADE)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRESQL_DOWNGRADE)
@@ -0,0 +1,34 @@
+"""Expression indexes for typeahead lookups
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('ix_users_full_name_lower', 'users', 'full_name'),
+    ('ix_users_email_lower', 'users', 'email'),
+    ('ix_courses_title_lower', 'courses', 'title'),
+    ('ix_lessons_title_lower', 'lessons', 'title'),
+)
+
+
+def upgrade():
+    for name, table, column in INDEXES:
+        op.create_index(name, table, [sa.text(f'lower({column})')])
+
+
+def downgrade():
+    for name, table, column in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
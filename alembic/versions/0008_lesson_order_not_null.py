@@ -0,0 +1,40 @@
+"""Make lessons.order NOT NULL
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def _alter_order(nullable, server_default):
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    if sqlite:
+        # SQLite пересоздает таблицу; триггеры счетчиков ссылаются на lessons, и без
+        # legacy_alter_table переименование временной таблицы завершается ошибкой
+        op.execute('PRAGMA legacy_alter_table = ON')
+    with op.batch_alter_table('lessons') as batch_op:
+        batch_op.alter_column('order', existing_type=sa.Integer(), nullable=nullable, server_default=server_default)
+    if sqlite:
+        op.execute('PRAGMA legacy_alter_table = OFF')
+        # Индекс по выражению не отражается при пересоздании таблицы и теряется
+        op.create_index('ix_lessons_title_lower', 'lessons', [sa.text('lower(title)')])
+
+
+def upgrade():
+    # order входит в ключ keyset пагинации уроков: строки с NULL выпадали бы из страниц
+    op.execute('UPDATE lessons SET "order" = 0 WHERE "order" IS NULL')
+    _alter_order(nullable=False, server_default='0')
+
+
+def downgrade():
+    _alter_order(nullable=True, server_default=None)
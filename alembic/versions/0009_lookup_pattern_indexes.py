@@ -0,0 +1,39 @@
+"""Pattern-ops indexes for typeahead lookups on PostgreSQL
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+# Только PostgreSQL: в SQLite поиск по префиксу идет диапазоном по ix_*_lower
+INDEXES = (
+    ('ix_users_full_name_lower_pattern', 'users', 'full_name'),
+    ('ix_users_email_lower_pattern', 'users', 'email'),
+    ('ix_courses_title_lower_pattern', 'courses', 'title'),
+    ('ix_lessons_title_lower_pattern', 'lessons', 'title'),
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, column in INDEXES:
+        op.create_index(name, table, [sa.text(f'lower({column}) text_pattern_ops')])
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, column in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
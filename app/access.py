@@ -0,0 +1,147 @@
+"""Проверка доступа к материалам курса.
+
+Уроки, комментарии и оценки курса доступны слушателям курса, его автору и
+администраторам. Курс и автор урока вместе со списком курсов, на которые записан
+пользователь, читаются одним запросом (lessons ⋈ courses ⟕ enrollments) и
+запоминаются на ACCESS_CACHE_TTL_SECONDS, поэтому повторные запросы слушателя
+к урокам его курсов проверяются без обращения к базе данных.
+
+Из кэша берется только наличие записи на курс. Если курса урока в списке нет,
+список перечитывается из БД: запись могла появиться в другом процессе, и
+пользователь не должен получать 403 до истечения кэша. Запись на курс сбрасывает
+список курсов пользователя, удаление урока или курса — курс урока.
+"""
+import os
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+
+from app import models
+from app.cache import TTLCache
+from app.database import get_async_db
+from app.security import Principal, get_current_principal
+
+ACCESS_CACHE_TTL_SECONDS = float(os.getenv("ACCESS_CACHE_TTL_SECONDS", "30"))
+ACCESS_CACHE_SIZE = int(os.getenv("ACCESS_CACHE_SIZE", "10000"))
+
+# lesson_id -> (course_id, author_id)
+lesson_course_cache = TTLCache(maxsize=ACCESS_CACHE_SIZE, ttl=ACCESS_CACHE_TTL_SECONDS, name="lesson_course")
+# user_id -> frozenset(course_id, ...)
+enrolled_courses_cache = TTLCache(maxsize=ACCESS_CACHE_SIZE, ttl=ACCESS_CACHE_TTL_SECONDS, name="enrolled_courses")
+
+
+@dataclass(frozen=True)
+class CourseAccess:
+    """Курс урока и отношение к нему текущего пользователя"""
+    lesson_id: int
+    course_id: int
+    author_id: Optional[int]
+    enrolled: bool
+    is_author: bool
+    is_admin: bool
+
+    @property
+    def allowed(self) -> bool:
+        return self.enrolled or self.is_author or self.is_admin
+
+
+def _access_query(lesson_id: int, user_id: int):
+    """Курс и автор урока и все курсы пользователя (по строке на запись на курс)"""
+    return (
+        select(models.Lesson.course_id, models.Course.author_id, models.Enrollment.course_id.label("enrolled_course_id"))
+        .join(models.Course, models.Course.id == models.Lesson.course_id)
+        .outerjoin(models.Enrollment, models.Enrollment.user_id == user_id)
+        .where(models.Lesson.id == lesson_id)
+    )
+
+
+def _cached(lesson_id: int, user_id: int):
+    lesson_course = lesson_course_cache.get(lesson_id)
+    enrolled = enrolled_courses_cache.get(user_id)
+    # Отсутствие записи на курс из кэша не берется: пользователь мог записаться
+    # в другом процессе или через другой путь записи
+    if lesson_course is None or enrolled is None or lesson_course[0] not in enrolled:
+        return None
+    return lesson_course, enrolled
+
+
+def _remember(rows, lesson_id: int, user_id: int):
+    if not rows:
+        return None
+    lesson_course = (rows[0].course_id, rows[0].author_id)
+    enrolled: FrozenSet[int] = frozenset(row.enrolled_course_id for row in rows if row.enrolled_course_id is not None)
+    lesson_course_cache.set(lesson_id, lesson_course)
+    enrolled_courses_cache.set(user_id, enrolled)
+    return lesson_course, enrolled
+
+
+def _build(resolved, lesson_id: int, principal: Principal) -> CourseAccess:
+    if resolved is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Урок не найден"
+        )
+    (course_id, author_id), enrolled = resolved
+    return CourseAccess(
+        lesson_id=lesson_id,
+        course_id=course_id,
+        author_id=author_id,
+        enrolled=course_id in enrolled,
+        is_author=author_id == principal.id,
+        is_admin=principal.is_admin,
+    )
+
+
+def _require(access: CourseAccess) -> CourseAccess:
+    if not access.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Вы не записаны на этот курс"
+        )
+    return access
+
+
+def get_lesson_access(db, principal: Principal, lesson_id: int) -> CourseAccess:
+    """Доступ к уроку для синхронной сессии (404, если урока нет)"""
+    resolved = _cached(lesson_id, principal.id)
+    if resolved is None:
+        rows = db.execute(_access_query(lesson_id, principal.id)).all()
+        resolved = _remember(rows, lesson_id, principal.id)
+    return _build(resolved, lesson_id, principal)
+
+
+async def get_lesson_access_async(db, principal: Principal, lesson_id: int) -> CourseAccess:
+    """Доступ к уроку для асинхронной сессии (404, если урока нет)"""
+    resolved = _cached(lesson_id, principal.id)
+    if resolved is None:
+        result = await db.execute(_access_query(lesson_id, principal.id))
+        resolved = _remember(result.all(), lesson_id, principal.id)
+    return _build(resolved, lesson_id, principal)
+
+
+def check_course_access(db, principal: Principal, lesson_id: int) -> CourseAccess:
+    """Доступ к уроку или ошибка 404/403"""
+    return _require(get_lesson_access(db, principal, lesson_id))
+
+
+async def require_course_access(
+    lesson_id: int,
+    current_user: Principal = Depends(get_current_principal),
+    db=Depends(get_async_db)
+) -> CourseAccess:
+    """Зависимость для эндпоинтов урока с параметром пути ``lesson_id``"""
+    return _require(await get_lesson_access_async(db, current_user, lesson_id))
+
+
+def forget_enrollments(user_id: int):
+    enrolled_courses_cache.pop(user_id)
+
+
+def forget_lesson(lesson_id: int):
+    lesson_course_cache.pop(lesson_id)
+
+
+def forget_lessons():
+    lesson_course_cache.clear()
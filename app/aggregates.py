@@ -0,0 +1,269 @@
+"""Денормализованные счетчики курсов и уроков.
+
+Таблицы ``course_stats`` и ``lesson_stats`` хранят количество уроков, записей,
+комментариев, а также сумму и количество оценок, поэтому средний рейтинг и
+счетчики читаются одной выборкой по первичному ключу вместо ``COUNT``/``AVG``.
+
+Счетчики обновляются инкрементально в той же транзакции, что и исходные данные:
+обработчики событий ORM выполняют ``UPDATE ... SET x = x + delta`` (атомарно,
+без предварительного чтения). Строка счетчиков создается вместе с курсом или
+уроком. Оценки и записи на курс пишутся одним ``INSERT ... ON CONFLICT``
+(см. ``app.upserts``) в обход событий ORM и при обновлении оценки старое значение
+приложению неизвестно, поэтому их счетчики поддерживают триггеры базы данных
+(SQLite и PostgreSQL; для остальных СУБД ``app.upserts`` читает строку перед
+записью и вызывает ``rating_saved``/``enrollment_inserted``).
+Массовая вставка уроков (см. ``app.bulk``) учитывает новые уроки явно через
+``lessons_inserted``. Остальные записи в обход ORM (массовые вставки, SQL вручную) учитываются полным
+пересчетом:
+
+    python -m app.aggregates reconcile
+"""
+import argparse
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.schema import DDL
+
+from app import models
+
+course_stats = models.CourseStats.__table__
+lesson_stats = models.LessonStats.__table__
+
+
+def _bump(connection, table, condition, **deltas):
+    """Атомарное изменение счетчиков строки на заданные величины"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        connection.execute(
+            update(table).where(condition).values({name: table.c[name] + delta for name, delta in deltas.items()})
+        )
+
+
+def _lesson_row(lesson_id):
+    return lesson_stats.c.lesson_id == lesson_id
+
+
+def _course_row(course_id):
+    return course_stats.c.course_id == course_id
+
+
+def _course_row_of_lesson(lesson_id):
+    course_id = select(models.Lesson.course_id).where(models.Lesson.id == lesson_id).scalar_subquery()
+    return course_stats.c.course_id == course_id
+
+
+# Курсы и уроки: создание и удаление строки счетчиков
+
+@event.listens_for(models.Course, "after_insert")
+def _course_created(mapper, connection, target):
+    connection.execute(insert(course_stats).values(course_id=target.id))
+
+
+@event.listens_for(models.Course, "after_delete")
+def _course_deleted(mapper, connection, target):
+    connection.execute(delete(course_stats).where(_course_row(target.id)))
+
+
+@event.listens_for(models.Lesson, "after_insert")
+def _lesson_created(mapper, connection, target):
+    connection.execute(insert(lesson_stats).values(lesson_id=target.id))
+    _bump(connection, course_stats, _course_row(target.course_id), lesson_count=1)
+
+
+@event.listens_for(models.Lesson, "after_delete")
+def _lesson_deleted(mapper, connection, target):
+    connection.execute(delete(lesson_stats).where(_lesson_row(target.id)))
+    _bump(connection, course_stats, _course_row(target.course_id), lesson_count=-1)
+
+
+def lessons_inserted(connection, course_id, lesson_ids):
+    """Счетчики уроков курса, вставленных массово в обход событий ORM"""
+    if lesson_ids:
+        connection.execute(insert(lesson_stats), [{"lesson_id": lesson_id} for lesson_id in lesson_ids])
+        _bump(connection, course_stats, _course_row(course_id), lesson_count=len(lesson_ids))
+
+
+# Комментарии
+
+def _comment_changed(connection, lesson_id, sign):
+    _bump(connection, lesson_stats, _lesson_row(lesson_id), comment_count=sign)
+    _bump(connection, course_stats, _course_row_of_lesson(lesson_id), comment_count=sign)
+
+
+@event.listens_for(models.Comment, "after_insert")
+def _comment_created(mapper, connection, target):
+    _comment_changed(connection, target.lesson_id, 1)
+
+
+@event.listens_for(models.Comment, "after_delete")
+def _comment_deleted(mapper, connection, target):
+    _comment_changed(connection, target.lesson_id, -1)
+
+
+# Оценки и записи на курс: триггеры
+
+# СУБД, для которых создаются триггеры счетчиков оценок и записей
+TRIGGER_DIALECTS = ("sqlite", "postgresql")
+
+
+def rating_saved(connection, lesson_id, old_stars, new_stars):
+    """Счетчики оценки, записанной на СУБД без триггеров (old_stars — None для новой оценки)"""
+    deltas = {"rating_sum": new_stars - (old_stars or 0), "rating_count": 1 if old_stars is None else 0}
+    _bump(connection, lesson_stats, _lesson_row(lesson_id), **deltas)
+    _bump(connection, course_stats, _course_row_of_lesson(lesson_id), **deltas)
+
+
+def enrollment_inserted(connection, course_id):
+    """Счетчик записей курса на СУБД без триггеров"""
+    _bump(connection, course_stats, _course_row(course_id), enrollment_count=1)
+
+
+def _sqlite_counter_trigger(name, table, event_name, statements):
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS {name} AFTER {event_name} ON {table} BEGIN
+        {" ".join(statements)}
+    END
+    """
+
+
+def _sqlite_rating_bump(row, sign):
+    course_id = f"(SELECT course_id FROM lessons WHERE id = {row}.lesson_id)"
+    delta = f"rating_sum = rating_sum {sign} {row}.stars, rating_count = rating_count {sign} 1"
+    return [
+        f"UPDATE lesson_stats SET {delta} WHERE lesson_id = {row}.lesson_id AND {row}.stars IS NOT NULL;",
+        f"UPDATE course_stats SET {delta} WHERE course_id = {course_id} AND {row}.stars IS NOT NULL;",
+    ]
+
+
+def _sqlite_enrollment_bump(row, sign):
+    return [f"UPDATE course_stats SET enrollment_count = enrollment_count {sign} 1 WHERE course_id = {row}.course_id;"]
+
+
+SQLITE_TRIGGERS = {
+    "ratings": (
+        _sqlite_counter_trigger("ratings_stats_ai", "ratings", "INSERT", _sqlite_rating_bump("new", "+")),
+        _sqlite_counter_trigger("ratings_stats_ad", "ratings", "DELETE", _sqlite_rating_bump("old", "-")),
+        _sqlite_counter_trigger("ratings_stats_au", "ratings", "UPDATE OF stars, lesson_id",
+                                _sqlite_rating_bump("old", "-") + _sqlite_rating_bump("new", "+")),
+    ),
+    "enrollments": (
+        _sqlite_counter_trigger("enrollments_stats_ai", "enrollments", "INSERT", _sqlite_enrollment_bump("new", "+")),
+        _sqlite_counter_trigger("enrollments_stats_ad", "enrollments", "DELETE", _sqlite_enrollment_bump("old", "-")),
+        _sqlite_counter_trigger("enrollments_stats_au", "enrollments", "UPDATE OF course_id",
+                                _sqlite_enrollment_bump("old", "-") + _sqlite_enrollment_bump("new", "+")),
+    ),
+}
+
+POSTGRESQL_TRIGGERS = {
+    "ratings": (
+        """
+        CREATE OR REPLACE FUNCTION ratings_stats() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.stars IS NOT NULL THEN
+                UPDATE lesson_stats SET rating_sum = rating_sum - OLD.stars, rating_count = rating_count - 1
+                WHERE lesson_id = OLD.lesson_id;
+                UPDATE course_stats SET rating_sum = rating_sum - OLD.stars, rating_count = rating_count - 1
+                WHERE course_id = (SELECT course_id FROM lessons WHERE id = OLD.lesson_id);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.stars IS NOT NULL THEN
+                UPDATE lesson_stats SET rating_sum = rating_sum + NEW.stars, rating_count = rating_count + 1
+                WHERE lesson_id = NEW.lesson_id;
+                UPDATE course_stats SET rating_sum = rating_sum + NEW.stars, rating_count = rating_count + 1
+                WHERE course_id = (SELECT course_id FROM lessons WHERE id = NEW.lesson_id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER ratings_stats AFTER INSERT OR DELETE OR UPDATE OF stars, lesson_id ON ratings
+        FOR EACH ROW EXECUTE FUNCTION ratings_stats()
+        """,
+    ),
+    "enrollments": (
+        """
+        CREATE OR REPLACE FUNCTION enrollments_stats() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE course_stats SET enrollment_count = enrollment_count - 1 WHERE course_id = OLD.course_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE course_stats SET enrollment_count = enrollment_count + 1 WHERE course_id = NEW.course_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER enrollments_stats AFTER INSERT OR DELETE OR UPDATE OF course_id ON enrollments
+        FOR EACH ROW EXECUTE FUNCTION enrollments_stats()
+        """,
+    ),
+}
+
+
+def _listen(triggers, dialect):
+    for model in (models.Rating, models.Enrollment):
+        for statement in triggers[model.__tablename__]:
+            event.listen(model.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+
+
+_listen(SQLITE_TRIGGERS, "sqlite")
+_listen(POSTGRESQL_TRIGGERS, "postgresql")
+
+
+# Полный пересчет
+
+def _scalar(column, *conditions, default=None):
+    value = select(column).where(*conditions).scalar_subquery()
+    return func.coalesce(value, default) if default is not None else value
+
+
+def reconcile(connection):
+    """Пересоздание всех счетчиков по исходным таблицам"""
+    Lesson, Course = models.Lesson, models.Course
+    Comment, Rating, Enrollment = models.Comment, models.Rating, models.Enrollment
+
+    connection.execute(delete(lesson_stats))
+    connection.execute(delete(course_stats))
+
+    connection.execute(insert(lesson_stats).from_select(
+        ["lesson_id", "comment_count", "rating_sum", "rating_count"],
+        select(
+            Lesson.id,
+            _scalar(func.count(Comment.id), Comment.lesson_id == Lesson.id),
+            _scalar(func.sum(Rating.stars), Rating.lesson_id == Lesson.id, default=0),
+            _scalar(func.count(Rating.stars), Rating.lesson_id == Lesson.id),
+        ),
+    ))
+    connection.execute(insert(course_stats).from_select(
+        ["course_id", "lesson_count", "enrollment_count", "comment_count", "rating_sum", "rating_count"],
+        select(
+            Course.id,
+            _scalar(func.count(Lesson.id), Lesson.course_id == Course.id),
+            _scalar(func.count(Enrollment.id), Enrollment.course_id == Course.id),
+            _scalar(func.sum(lesson_stats.c.comment_count), lesson_stats.c.lesson_id == Lesson.id,
+                    Lesson.course_id == Course.id, default=0),
+            _scalar(func.sum(lesson_stats.c.rating_sum), lesson_stats.c.lesson_id == Lesson.id,
+                    Lesson.course_id == Course.id, default=0),
+            _scalar(func.sum(lesson_stats.c.rating_count), lesson_stats.c.lesson_id == Lesson.id,
+                    Lesson.course_id == Course.id, default=0),
+        ),
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание денормализованных счетчиков")
+    parser.add_argument("command", choices=["reconcile"])
+    parser.parse_args()
+
+    from app.database import engine
+
+    with engine.begin() as connection:
+        reconcile(connection)
+        courses = connection.execute(select(func.count()).select_from(course_stats)).scalar()
+        lessons = connection.execute(select(func.count()).select_from(lesson_stats)).scalar()
+    print(f"Счетчики пересчитаны: курсов {courses}, уроков {lessons}")
+
+
+if __name__ == "__main__":
+    main()
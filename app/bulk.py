@@ -0,0 +1,52 @@
+"""Массовая загрузка и переупорядочивание уроков курса.
+
+Импорт курса по одному уроку — это по запросу, проверке прав и транзакции на
+каждый урок. ``insert_lessons`` вставляет все уроки одним ``INSERT ...
+RETURNING`` с пакетом параметров (SQLAlchemy отправляет его многострочными
+``VALUES``), а ``reorder_lessons`` переназначает ``Lesson.order`` всех уроков
+одним ``UPDATE ... SET "order" = CASE id ... END``.
+
+Массовая вставка ORM не вызывает события ``after_insert``, поэтому строки
+``lesson_stats`` и счетчик уроков курса обновляются явно
+(``app.aggregates.lessons_inserted``) в той же транзакции.
+"""
+from typing import List, Sequence
+
+from sqlalchemy import case, insert, update
+
+from app import models
+from app.aggregates import lessons_inserted
+
+
+def insert_lessons(db, course_id: int, lessons: Sequence[dict]) -> List[models.Lesson]:
+    """Вставка уроков курса; уроки возвращаются в порядке ``lessons``.
+
+    ``RETURNING`` многострочного ``VALUES`` не гарантирует порядок строк.
+    Порядок параметров восстанавливает ``sort_by_parameter_order``, но в SQLite
+    он возвращается к вставке по одной строке. SQLite выдает rowid строкам
+    одного ``VALUES`` по возрастанию, поэтому там порядок восстанавливается по id.
+    """
+    rows = [{**lesson, "course_id": course_id} for lesson in lessons]
+    if db.get_bind().dialect.name == "sqlite":
+        statement = insert(models.Lesson).returning(models.Lesson)
+        created = sorted(db.scalars(statement, rows), key=lambda lesson: lesson.id)
+    else:
+        statement = insert(models.Lesson).returning(models.Lesson, sort_by_parameter_order=True)
+        created = db.scalars(statement, rows).all()
+    lessons_inserted(db.connection(), course_id, [lesson.id for lesson in created])
+    return created
+
+def reorder_lessons(db, course_id: int, lesson_ids: Sequence[int]) -> int:
+    """Порядковые номера 1, 2, ... урокам курса в порядке ``lesson_ids``.
+
+    Возвращает число измененных строк: меньше ``len(lesson_ids)``, если часть
+    уроков не принадлежит курсу.
+    """
+    positions = {lesson_id: position for position, lesson_id in enumerate(lesson_ids, start=1)}
+    statement = (
+        update(models.Lesson)
+        .where(models.Lesson.course_id == course_id, models.Lesson.id.in_(positions))
+        .values(order=case(positions, value=models.Lesson.id))
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(statement).rowcount
@@ -0,0 +1,63 @@
+"""Внутрипроцессные кэши с ограничением по размеру (LRU) и времени жизни (TTL)."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.metrics import Counter
+
+CACHE_HITS = Counter("cache_hits", "Попадания в кэш", labelnames=("cache",))
+CACHE_MISSES = Counter("cache_misses", "Промахи кэша", labelnames=("cache",))
+CACHE_EVICTIONS = Counter("cache_evictions", "Вытеснения из кэша по размеру", labelnames=("cache",))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Потокобезопасный LRU кэш, у каждой записи которого есть срок жизни"""
+
+    def __init__(self, maxsize: int, ttl: float, name: str):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = CACHE_HITS.labels(name)
+        self._misses = CACHE_MISSES.labels(name)
+        self._evictions = CACHE_EVICTIONS.labels(name)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires_at = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._hits.inc()
+                    return value
+                del self._data[key]
+        self._misses.inc()
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions.inc()
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[0] if item else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,143 @@
+"""Снимок статистики административного дашборда.
+
+Счетчики и списки дашборда вычисляются фоновой задачей раз в
+DASHBOARD_REFRESH_SECONDS и отдаются из памяти вместе со временем вычисления,
+поэтому частое обновление страницы не нагружает базу данных. Обновление по
+запросу администратора не чаще DASHBOARD_MIN_REFRESH_SECONDS; одновременные
+запросы на обновление дожидаются одного вычисления.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
+
+from app import models
+from app.database import SessionLocal
+from app.metrics import Histogram
+
+# Период фонового обновления (0 — только по запросу) и минимальный интервал ручного обновления
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "60"))
+DASHBOARD_MIN_REFRESH_SECONDS = float(os.getenv("DASHBOARD_MIN_REFRESH_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_REFRESH_DURATION = Histogram(
+    "dashboard_refresh_duration_seconds",
+    "Время вычисления снимка статистики дашборда",
+)
+
+
+@dataclass
+class DashboardSnapshot:
+    """Статистика дашборда на момент ``computed_at`` (без ORM объектов)"""
+    stats: dict
+    recent_users: List[dict] = field(default_factory=list)
+    popular_courses: List[dict] = field(default_factory=list)
+    computed_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+def compute_snapshot(db: Session) -> DashboardSnapshot:
+    """Вычисление статистики дашборда по базе данных"""
+    stats = {
+        "users_count": db.query(func.count(models.User.id)).scalar(),
+        "courses_count": db.query(func.count(models.Course.id)).scalar(),
+        "lessons_count": db.query(func.count(models.Lesson.id)).scalar(),
+        "enrollments_count": db.query(func.count(models.Enrollment.id)).scalar(),
+    }
+
+    # Последние 5 пользователей
+    recent_users = [
+        {"id": user.id, "full_name": user.full_name, "email": user.email, "is_active": user.is_active}
+        for user in db.query(models.User).order_by(models.User.id.desc()).limit(5).all()
+    ]
+
+    # Популярные курсы (по количеству записей) со счетчиками из course_stats
+    popular = db.query(models.Course, models.CourseStats)\
+        .options(joinedload(models.Course.author))\
+        .join(models.CourseStats, models.CourseStats.course_id == models.Course.id)\
+        .filter(models.CourseStats.enrollment_count > 0)\
+        .order_by(models.CourseStats.enrollment_count.desc()).limit(5).all()
+    popular_courses = [
+        {
+            "id": course.id,
+            "title": course.title,
+            "author": {"full_name": course.author.full_name if course.author else None},
+            "students_count": course_stats.enrollment_count,
+            "average_rating": round(course_stats.average_rating, 1) if course_stats.average_rating else 0,
+        }
+        for course, course_stats in popular
+    ]
+
+    return DashboardSnapshot(stats=stats, recent_users=recent_users, popular_courses=popular_courses)
+
+
+class DashboardStatsCache:
+    """Последний снимок статистики и его обновление (одно вычисление за раз)"""
+
+    def __init__(self, min_refresh_interval: float = DASHBOARD_MIN_REFRESH_SECONDS):
+        self.min_refresh_interval = min_refresh_interval
+        self._snapshot: Optional[DashboardSnapshot] = None
+        self._computed_monotonic = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> Optional[DashboardSnapshot]:
+        return self._snapshot
+
+    def get(self, db: Session) -> DashboardSnapshot:
+        """Текущий снимок; вычисляется только если его еще нет"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh(db, force=False)
+        return snapshot
+
+    def refresh(self, db: Session, force: bool = True) -> DashboardSnapshot:
+        """Пересчет снимка.
+
+        Без ``force`` снимок моложе ``min_refresh_interval`` не пересчитывается:
+        запрос, ожидавший на блокировке, получает результат соседнего вычисления.
+        """
+        with self._lock:
+            age = time.monotonic() - self._computed_monotonic
+            if not force and self._snapshot is not None and age < self.min_refresh_interval:
+                return self._snapshot
+            started = time.perf_counter()
+            snapshot = compute_snapshot(db)
+            DASHBOARD_REFRESH_DURATION.observe(time.perf_counter() - started)
+            self._snapshot = snapshot
+            self._computed_monotonic = time.monotonic()
+            return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self._computed_monotonic = 0.0
+
+
+dashboard_cache = DashboardStatsCache()
+
+
+def _refresh_in_new_session():
+    db = SessionLocal()
+    try:
+        dashboard_cache.refresh(db)
+    finally:
+        db.close()
+
+
+async def run_refresher(interval: float = DASHBOARD_REFRESH_SECONDS):
+    """Фоновая задача: периодический пересчет снимка в пуле потоков"""
+    while True:
+        try:
+            await run_in_threadpool(_refresh_in_new_session)
+        except Exception:
+            logger.exception("Не удалось обновить статистику дашборда")
+        await asyncio.sleep(interval)
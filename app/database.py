@@ -1,20 +1,191 @@
-from sqlalchemy import create_engine
+import anyio.to_thread
+from fastapi import Depends
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 import os
+import time
+
+from app.metrics import Counter, Gauge, Histogram
+from app.query_stats import instrument_queries
 
 # Загрузка переменных окружения
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./online_courses.db")
 
+# Количество потоков, в которых выполняются синхронные обработчики и запросы к БД
+DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", "40"))
+
+# Модель выполнения "горячих" запросов на чтение:
+# threadpool — синхронная сессия в пуле потоков, async — AsyncSession (aiosqlite/asyncpg)
+DB_EXECUTION_MODE = os.getenv("DB_EXECUTION_MODE", "threadpool")
+
+
+def to_async_url(url: str) -> str:
+    """Преобразование синхронного URL базы данных в URL асинхронного драйвера"""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    if url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url[len("postgres://"):]
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Настройки пула соединений (для файловой SQLite и серверных СУБД)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+
+# Настройки SQLite: WAL позволяет читать параллельно с записью,
+# busy_timeout ждет освобождения блокировки вместо "database is locked"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Метрики пула соединений
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Время ожидания свободного соединения в пуле",
+    labelnames=("engine",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Количество отказов из-за исчерпания пула соединений",
+    labelnames=("engine",),
+)
+POOL_CONNECTIONS_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Количество соединений, выданных из пула",
+    labelnames=("engine",),
+)
+
+
+class _MeteredPoolMixin:
+    """Замер времени ожидания соединения при выдаче из пула"""
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    metrics_label = "sync"
+
+
+class MeteredAsyncQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def _is_sqlite_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Параметры create_engine для конкретного бэкенда"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    options = {}
+
+    if backend == "sqlite":
+        connect_args = {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+        if not is_async:
+            connect_args["check_same_thread"] = False
+        options["connect_args"] = connect_args
+        # Для БД в памяти SQLAlchemy сам выбирает подходящий пул
+        if _is_sqlite_memory(url):
+            return options
+    elif backend == "postgresql":
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"timeout": DB_CONNECT_TIMEOUT}
+        else:
+            options["connect_args"] = {"connect_timeout": DB_CONNECT_TIMEOUT}
+
+    options.update(
+        poolclass=MeteredAsyncQueuePool if is_async else MeteredQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        # Для SQLite проверка соединения не нужна, для серверных СУБД включена по умолчанию
+        pool_pre_ping=_env_bool("DB_POOL_PRE_PING", backend != "sqlite"),
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _instrument_engine(sync_engine, label: str):
+    """Подключение обработчиков событий к движку (pragma SQLite, метрики пула, учет SQL запросов)"""
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_queries(sync_engine)
+
+    in_use = POOL_CONNECTIONS_IN_USE.labels(label)
+    event.listen(sync_engine, "checkout", lambda *args: in_use.inc())
+    event.listen(sync_engine, "checkin", lambda *args: in_use.dec())
+
+
+def create_db_engine(url: str):
+    """Создание синхронного движка с настройками пула из окружения"""
+    db_engine = create_engine(url, **engine_options(url))
+    _instrument_engine(db_engine, "sync")
+    return db_engine
+
+
+def create_async_db_engine(url: str):
+    """Создание асинхронного движка с настройками пула из окружения"""
+    db_engine = create_async_engine(url, **engine_options(url, is_async=True))
+    _instrument_engine(db_engine.sync_engine, "async")
+    return db_engine
+
+
 # Создание подключения к базе данных
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_db_engine(DATABASE_URL)
 
 # Создание сессии
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок создается только в режиме async, чтобы драйвер
+# (aiosqlite/asyncpg) не был обязательной зависимостью
+async_engine = None
+AsyncSessionLocal = None
+if DB_EXECUTION_MODE == "async":
+    async_engine = create_async_db_engine(ASYNC_DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Базовый класс для всех моделей
 Base = declarative_base()
 
@@ -25,3 +196,54 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def configure_db_threadpool():
+    """Ограничение пула потоков, в который FastAPI отправляет синхронные обработчики.
+
+    Все обработчики роутеров объявлены через обычный ``def``, поэтому работа с
+    синхронной сессией выполняется вне event loop. Лимит задается переменной
+    окружения DB_THREADPOOL_SIZE и должен вызываться внутри запущенного цикла.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = DB_THREADPOOL_SIZE
+
+
+class ThreadedSession:
+    """Асинхронный интерфейс чтения поверх синхронной сессии.
+
+    Повторяет подмножество API ``AsyncSession`` (execute/scalar/scalars/get/get_bind),
+    выполняя каждый вызов в пуле потоков. Результаты буферизуются в потоке,
+    поэтому чтение строк не обращается к БД из event loop.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def execute(self, statement, params=None):
+        frozen = await run_in_threadpool(lambda: self.sync_session.execute(statement, params).freeze())
+        return frozen()
+
+    async def scalar(self, statement, params=None):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params)
+
+    async def scalars(self, statement, params=None):
+        result = await self.execute(statement, params)
+        return result.scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(lambda: self.sync_session.get(entity, ident, **kwargs))
+
+    def get_bind(self, *args, **kwargs):
+        return self.sync_session.get_bind(*args, **kwargs)
+
+
+async def _get_native_async_db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+async def _get_threaded_async_db(db: Session = Depends(get_db)):
+    yield ThreadedSession(db)
+
+# Зависимость для асинхронных обработчиков чтения: AsyncSession в режиме async,
+# иначе синхронная сессия из get_db, вызовы которой уходят в пул потоков
+get_async_db = _get_native_async_db if DB_EXECUTION_MODE == "async" else _get_threaded_async_db
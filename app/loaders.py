@@ -0,0 +1,54 @@
+"""Опции загрузки связей ORM по схеме ответа.
+
+Схема ответа (Pydantic модель) определяет, какие связи будут прочитаны при
+сериализации. ``loader_options(Model, Schema)`` строит по ней опции eager
+загрузки: коллекции — ``selectinload`` (один дополнительный запрос на связь),
+связи "многие к одному" — ``joinedload`` (в том же запросе). Вложенные схемы
+обрабатываются рекурсивно, поэтому число запросов фиксировано и не зависит от
+количества строк, а ленивые загрузки во время сериализации не выполняются.
+
+Сортировка коллекций задается в ``relationship(order_by=...)`` и соблюдается
+``selectinload``.
+"""
+import typing
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+
+def _nested_schema(annotation) -> Optional[type]:
+    """Вложенная схема из аннотации поля (``X``, ``Optional[X]``, ``List[X]``)"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for argument in typing.get_args(annotation):
+        schema = _nested_schema(argument)
+        if schema is not None:
+            return schema
+    return None
+
+
+def _options(model, schema, parent=None) -> list:
+    relationships = inspect(model).relationships
+    options = []
+    for name, field in schema.model_fields.items():
+        relationship = relationships.get(name)
+        nested = _nested_schema(field.annotation)
+        if relationship is None or nested is None:
+            continue
+        attribute = getattr(model, name)
+        if parent is None:
+            loader = selectinload(attribute) if relationship.uselist else joinedload(attribute)
+        else:
+            loader = parent.selectinload(attribute) if relationship.uselist else parent.joinedload(attribute)
+        options.append(loader)
+        options.extend(_options(relationship.mapper.class_, nested, loader))
+    return options
+
+
+@lru_cache(maxsize=None)
+def loader_options(model, schema) -> Tuple:
+    """Опции ``.options(...)`` для загрузки ``model`` в форме схемы ``schema``"""
+    return tuple(_options(model, schema))
@@ -0,0 +1,224 @@
+"""Структурированное логирование без блокировки обработчиков запросов.
+
+Логгер ``app`` (и все ``app.*``) пишет записи в очередь через ``QueueHandler``,
+а форматирование и вывод выполняет фоновый поток ``QueueListener``. Обработчик
+запроса только создает запись и кладет ее в очередь, поэтому медленный stdout
+или файл не задерживает ответ.
+
+Каждая запись дополняется id и путем текущего запроса (``LoggingMiddleware``)
+и выводится в JSON (``LOG_FORMAT=json``) или текстом. Записи ниже WARNING
+можно прореживать по префиксам путей (``LOG_SAMPLING``), предупреждения и
+ошибки сохраняются всегда.
+
+Токены, пароли и заголовки авторизации в логи не передаются.
+"""
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.query_stats import query_stats_var
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Доля сохраняемых записей ниже WARNING по префиксам путей: "/api/courses=0.1,/admin=1"
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+# Журнал запросов (метод, путь, статус, время) в логгер app.access
+LOG_REQUESTS = os.getenv("LOG_REQUESTS", "1") == "1"
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s %(path)s] %(message)s"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_path_var: ContextVar[Optional[str]] = ContextVar("request_path", default=None)
+
+access_logger = logging.getLogger("app.access")
+
+# Атрибуты LogRecord; все остальные — поля, переданные через extra
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_CONTEXT_FIELDS = ("request_id", "path")
+
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """``"/api/courses=0.1,/admin=1"`` -> {"/api/courses": 0.1, "/admin": 1.0}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        prefix, _, rate = item.partition("=")
+        rates[prefix.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class RequestContextFilter(logging.Filter):
+    """Добавляет к записи id и путь запроса и прореживает записи по путям.
+
+    Выполняется в потоке, создавшем запись (контекст запроса доступен только
+    там), до постановки записи в очередь.
+    """
+
+    def __init__(self, sampling: Optional[Dict[str, float]] = None):
+        super().__init__()
+        # Длинные префиксы проверяются первыми
+        self.sampling = sorted((sampling or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate(self, path: Optional[str]) -> float:
+        if path is not None:
+            for prefix, rate in self.sampling:
+                if path.startswith(prefix):
+                    return rate
+        return 1.0
+
+    def filter(self, record):
+        path = request_path_var.get()
+        record.request_id = request_id_var.get()
+        record.path = path
+        if record.levelno >= logging.WARNING or not self.sampling:
+            return True
+        rate = self.rate(path)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись: время, уровень, логгер, сообщение, контекст и extra"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in _CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and name not in _CONTEXT_FIELDS:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        for name in _CONTEXT_FIELDS:
+            if getattr(record, name, None) is None:
+                setattr(record, name, "-")
+        return super().format(record)
+
+
+class _QueueHandler(QueueHandler):
+    """``QueueHandler``, сохраняющий поля записи для форматирования в фоновом потоке.
+
+    Стандартный ``prepare`` форматирует и копирует запись в вызывающем потоке;
+    здесь подставляются только аргументы сообщения и текст исключения. Других
+    обработчиков у логгера ``app`` нет, поэтому запись изменяется на месте.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[_QueueHandler] = None
+
+
+def setup_logging(stream=None, level: str = LOG_LEVEL, format: str = LOG_FORMAT,
+                  sampling: Optional[Dict[str, float]] = None) -> QueueListener:
+    """Подключение очереди и фонового потока вывода к логгеру ``app`` (повторный вызов ничего не меняет)"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if format == "json" else _TextFormatter(TEXT_FORMAT))
+
+    records = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(records)
+    _queue_handler.addFilter(RequestContextFilter(parse_sampling(LOG_SAMPLING) if sampling is None else sampling))
+
+    logger = logging.getLogger("app")
+    logger.setLevel(level)
+    logger.addHandler(_queue_handler)
+    logger.propagate = False
+
+    _listener = QueueListener(records, output)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Вывод оставшихся записей и отключение очереди"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logger = logging.getLogger("app")
+    logger.removeHandler(_queue_handler)
+    logger.propagate = True
+    _listener = _queue_handler = None
+
+
+_request_ids = itertools.count(1)
+_process_tag = f"{os.getpid():x}"
+
+
+class LoggingMiddleware:
+    """ASGI middleware: контекст запроса для логов и журнал запросов ``app.access``"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = f"{_process_tag}-{next(_request_ids)}"
+        path = scope["path"]
+        id_token = request_id_var.set(request_id)
+        path_token = request_path_var.set(path)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if LOG_REQUESTS and access_logger.isEnabledFor(logging.INFO):
+                extra = {
+                    "method": scope["method"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                }
+                # SQL запросы учитывает QueryStatsMiddleware снаружи этого middleware
+                stats = query_stats_var.get()
+                if stats is not None:
+                    extra["db_count"] = stats.count
+                    extra["db_ms"] = round(stats.duration * 1000, 3)
+                # Запись собирается без Logger.info: место вызова всегда одно и то же,
+                # а поиск его по стеку — заметная часть стоимости записи
+                access_logger.handle(access_logger.makeRecord(
+                    access_logger.name, logging.INFO, __file__, 0,
+                    "%s %s %s", (scope["method"], path, status_code), None, extra=extra,
+                ))
+            request_path_var.reset(path_token)
+            request_id_var.reset(id_token)
@@ -0,0 +1,78 @@
+"""Поиск с подсказками (typeahead) для выпадающих списков админки.
+
+Вместо выгрузки всех пользователей, курсов и уроков в каждую страницу
+админки выпадающие списки запрашивают первые ``limit`` совпадений по началу
+строки, без сканирования таблицы.
+
+В SQLite условие "начинается с q" записано диапазоном
+``lower(col) >= lower(q) AND lower(col) < lower(q) || U+10FFFF``: запрос
+читает только нужный участок индекса по выражению ``lower(col)``
+(``ix_*_lower``) в порядке сортировки и не сортирует результаты. ``LIKE 'q%'``
+такой индекс в SQLite не использует. Диапазон корректен только при побайтовом
+сравнении строк, поэтому в PostgreSQL, где порядок задает правило сортировки
+базы, используется ``lower(col) LIKE lower(q) || '%'`` (``%`` и ``_`` в q
+экранируются) с индексом ``ix_*_lower_pattern`` (``text_pattern_ops``).
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, select
+
+from app import models
+
+LOOKUP_DEFAULT_LIMIT = 10
+LOOKUP_MAX_LIMIT = 50
+
+# Наибольший символ Unicode: любая строка с префиксом q меньше, чем q + _PREFIX_END
+_PREFIX_END = "\U0010ffff"
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _starts_with(column, q: str, dialect: str):
+    """Строки, начинающиеся с q без учета регистра, по индексу lower(column)"""
+    key = func.lower(column)
+    if dialect == "sqlite":
+        prefix = func.lower(q)
+        return and_(key >= prefix, key < prefix.concat(_PREFIX_END))
+    return key.like(func.lower(_escape_like(q)).concat("%"), escape="\\")
+
+
+def _search(db, query, column, q: str, limit: int, item_id: Optional[int], id_column) -> list:
+    if item_id is not None:
+        return db.execute(query.where(id_column == item_id)).all()
+    if q:
+        query = query.where(_starts_with(column, q, db.get_bind().dialect.name))
+    return db.execute(query.order_by(func.lower(column)).limit(limit)).all()
+
+
+def lookup_users(db, q: str = "", limit: int = LOOKUP_DEFAULT_LIMIT, item_id: Optional[int] = None) -> List[Dict]:
+    """Пользователи, у которых имя или email начинается с q; сначала совпадения по имени"""
+    query = select(models.User.id, models.User.full_name, models.User.email)
+    rows = _search(db, query, models.User.full_name, q, limit, item_id, models.User.id)
+    if q and item_id is None and len(rows) < limit:
+        # Отдельный диапазон по индексу email: OR двух диапазонов потребовал бы сортировки
+        seen = {row.id for row in rows}
+        rows += [row for row in _search(db, query, models.User.email, q, limit, None, None) if row.id not in seen]
+    return [{"id": row.id, "label": f"{row.full_name} ({row.email})"} for row in rows[:limit]]
+
+
+def lookup_courses(db, q: str = "", limit: int = LOOKUP_DEFAULT_LIMIT, item_id: Optional[int] = None) -> List[Dict]:
+    """Курсы, название которых начинается с q"""
+    query = select(models.Course.id, models.Course.title)
+    rows = _search(db, query, models.Course.title, q, limit, item_id, models.Course.id)
+    return [{"id": row.id, "label": row.title} for row in rows]
+
+
+def lookup_lessons(db, q: str = "", limit: int = LOOKUP_DEFAULT_LIMIT, item_id: Optional[int] = None,
+                   course_id: Optional[int] = None) -> List[Dict]:
+    """Уроки (с названием курса), название которых начинается с q"""
+    query = (
+        select(models.Lesson.id, models.Lesson.title, models.Course.title.label("course_title"))
+        .join(models.Course, models.Course.id == models.Lesson.course_id)
+    )
+    if course_id is not None:
+        query = query.where(models.Lesson.course_id == course_id)
+    rows = _search(db, query, models.Lesson.title, q, limit, item_id, models.Lesson.id)
+    return [{"id": row.id, "label": f"{row.title} ({row.course_title})"} for row in rows]
@@ -0,0 +1,368 @@
+"""Простейший реестр метрик процесса: счетчики, gauge и гистограммы с метками.
+
+Метрики хранятся в памяти процесса; при нескольких процессах (``uvicorn
+--workers``) каждый отдает по ``/metrics`` свои значения.
+"""
+import bisect
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+# Границы гистограмм времени по умолчанию (в секундах)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Если задан, GET /metrics требует заголовок "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Content-Type текстового формата Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    """Реестр всех метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+            self._metrics[metric.name] = metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def collect(self):
+        return list(self._metrics.values())
+
+    def snapshot(self):
+        """Текущие значения всех метрик в виде словаря (для JSON)"""
+        return {
+            metric.name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "samples": [
+                    {"name": name, "labels": labels, "value": value}
+                    for name, labels, value in metric.samples()
+                ],
+            }
+            for metric in self.collect()
+        }
+
+    def render_text(self) -> str:
+        """Все метрики в текстовом формате Prometheus (exposition format 0.0.4)"""
+        lines = []
+        for metric in self.collect():
+            documentation = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {metric.name} {documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    pairs = ",".join(f'{label}="{_escape_label(str(text))}"' for label, text in labels.items())
+                    name = f"{name}{{{pairs}}}"
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        if registry is not None:
+            registry.register(self)
+
+    @abstractmethod
+    def _new_child(self):
+        """Объект, хранящий значение для одного набора меток"""
+
+    def labels(self, *values):
+        """Дочерняя метрика для конкретного набора значений меток"""
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name}: ожидались метки {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self._children[()]
+
+    def samples(self) -> List[Tuple[str, dict, float]]:
+        result = []
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            result.extend(child.samples(self.name, labels))
+        return result
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def samples(self, name, labels):
+        return [(f"{name}_total", labels, self._value)]
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    @property
+    def value(self):
+        return self._default().value
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def samples(self, name, labels):
+        return [(name, labels, self._value)]
+
+
+class Gauge(_Metric):
+    """Значение, которое может как расти, так и уменьшаться"""
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    @property
+    def value(self):
+        return self._default().value
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def sum(self):
+        return self._sum
+
+    def samples(self, name, labels):
+        result = []
+        cumulative = 0
+        for bound, count in zip(self._buckets, self._counts):
+            cumulative += count
+            result.append((f"{name}_bucket", {**labels, "le": repr(float(bound))}, cumulative))
+        result.append((f"{name}_bucket", {**labels, "le": "+Inf"}, self._count))
+        result.append((f"{name}_sum", labels, self._sum))
+        result.append((f"{name}_count", labels, self._count))
+        return result
+
+
+class Histogram(_Metric):
+    """Распределение наблюдаемых значений по корзинам"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets=DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    @property
+    def count(self):
+        return self._default().count
+
+    @property
+    def sum(self):
+        return self._default().sum
+
+
+# Метрики HTTP запросов (MetricsMiddleware)
+HTTP_REQUESTS = Counter(
+    "http_requests",
+    "Количество обработанных HTTP запросов",
+    labelnames=("route", "method", "status"),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Количество HTTP запросов в обработке",
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP запроса",
+    labelnames=("route", "method", "status"),
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Размер тела HTTP ответа",
+    labelnames=("route", "method"),
+    buckets=(100, 1000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+
+# Метка запросов, не подошедших ни к одному маршруту (произвольные пути не попадают в метки)
+UNMATCHED_ROUTE = "unmatched"
+# Сколько путей помнить для ответов, отданных без маршрутизации
+ROUTE_TEMPLATES_SIZE = 4096
+
+
+def route_template(scope, root_path: str = "") -> Optional[str]:
+    """Шаблон пути маршрута, обработавшего запрос (``/api/courses/{course_id}``)"""
+    # FastAPI с вложенными роутерами хранит полный путь (с префиксом) отдельно
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None:
+        return context.path
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("root_path", "") != root_path:
+        # Mount (статические файлы) дописывает свой путь к root_path
+        return scope["root_path"] + "/{path}"
+    return None
+
+
+class MetricsMiddleware:
+    """ASGI middleware: количество, время и размер ответов по шаблону маршрута.
+
+    Метка ``route`` — шаблон пути, а не сам путь, чтобы число рядов не росло
+    с количеством курсов и уроков. Ответы, отданные до маршрутизации (кэш
+    каталога), получают шаблон, запомненный для того же пути при предыдущем
+    запросе, иначе ``unmatched``.
+
+    Дочерние метрики для каждого сочетания меток запоминаются, поэтому запрос
+    стоит нескольких неконкурентных блокировок: middleware выполняется в
+    потоке цикла событий.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children = {}
+        self._templates = {}
+
+    def _metrics(self, route: str, method: str, status: int):
+        key = (route, method, status)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                HTTP_REQUESTS.labels(route, method, status),
+                HTTP_REQUEST_DURATION.labels(route, method, status),
+                HTTP_RESPONSE_SIZE.labels(route, method),
+            )
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        root_path = scope.get("root_path", "")
+        status_code = 500
+        size = 0
+
+        async def send_with_size(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_size)
+        finally:
+            duration = time.perf_counter() - started
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            template = route_template(scope, root_path)
+            if template is not None:
+                if len(self._templates) >= ROUTE_TEMPLATES_SIZE:
+                    self._templates.clear()
+                self._templates[scope["path"]] = template
+            else:
+                template = self._templates.get(scope["path"], UNMATCHED_ROUTE)
+            requests, durations, sizes = self._metrics(template, scope["method"], status_code)
+            requests.inc()
+            durations.observe(duration)
+            sizes.observe(size)
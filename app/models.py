@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Float
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -13,6 +13,8 @@ class User(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    # Увеличивается при смене email/пароля/прав: токены со старой версией перепроверяются по БД
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Отношения
     courses = relationship("Course", back_populates="author")
@@ -32,12 +34,17 @@ class Course(Base):
     
     # Отношения
     author = relationship("User", back_populates="courses")
-    lessons = relationship("Lesson", back_populates="course", cascade="all, delete-orphan")
+    lessons = relationship(
+        "Lesson", back_populates="course", cascade="all, delete-orphan",
+        order_by="(Lesson.order, Lesson.id)"
+    )
     enrollments = relationship("Enrollment", back_populates="course", cascade="all, delete-orphan")
 
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
+    # Одна запись пользователя на курс; индекс для проверки доступа (user_id, course_id)
+    __table_args__ = (UniqueConstraint("user_id", "course_id", name="uq_enrollments_user_course"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -51,13 +58,16 @@ class Enrollment(Base):
 
 class Lesson(Base):
     __tablename__ = "lessons"
+    # Уроки курса в порядке keyset пагинации (order, id)
+    __table_args__ = (Index("ix_lessons_course_order", "course_id", "order", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"))
     title = Column(String, index=True)
     video_url = Column(String)
     content = Column(Text)
-    order = Column(Integer, default=0)  # Для сортировки уроков
+    # Для сортировки уроков; NOT NULL, так как входит в ключ keyset пагинации
+    order = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Отношения
     course = relationship("Course", back_populates="lessons")
@@ -67,6 +77,8 @@ class Lesson(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    # Комментарии урока, новые первыми (keyset пагинации — id по убыванию)
+    __table_args__ = (Index("ix_comments_lesson_id_id", "lesson_id", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -81,6 +93,8 @@ class Comment(Base):
 
 class Rating(Base):
     __tablename__ = "ratings"
+    # Одна оценка пользователя на урок
+    __table_args__ = (UniqueConstraint("user_id", "lesson_id", name="uq_ratings_user_lesson"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -90,3 +104,52 @@ class Rating(Base):
     # Отношения
     user = relationship("User", back_populates="ratings")
     lesson = relationship("Lesson", back_populates="ratings")
+
+
+class CourseStats(Base):
+    """Денормализованные счетчики курса (поддерживаются app.aggregates)"""
+    __tablename__ = "course_stats"
+    
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    lesson_count = Column(Integer, nullable=False, default=0, server_default="0")
+    enrollment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+
+class LessonStats(Base):
+    """Денормализованные счетчики урока (поддерживаются app.aggregates)"""
+    __tablename__ = "lesson_stats"
+    
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+
+# Индексы по lower(...) для поиска с подсказками по префиксу (см. app.lookup)
+Index("ix_users_full_name_lower", func.lower(User.full_name))
+Index("ix_users_email_lower", func.lower(User.email))
+Index("ix_courses_title_lower", func.lower(Course.title))
+Index("ix_lessons_title_lower", func.lower(Lesson.title))
+
+# PostgreSQL: LIKE 'q%' использует индекс по lower(...) только с классом
+# операторов text_pattern_ops; в SQLite поиск идет по диапазону (см. app.lookup)
+for _name, _column in (
+    ("ix_users_full_name_lower_pattern", User.full_name),
+    ("ix_users_email_lower_pattern", User.email),
+    ("ix_courses_title_lower_pattern", Course.title),
+    ("ix_lessons_title_lower_pattern", Lesson.title),
+):
+    Index(
+        _name, func.lower(_column).label("value"), postgresql_ops={"value": "text_pattern_ops"}
+    ).ddl_if(dialect="postgresql")
@@ -0,0 +1,99 @@
+"""Keyset (курсорная) пагинация списков.
+
+Страница выбирается условием ``(колонки сортировки) > значения последней строки``
+вместо ``OFFSET``, поэтому время получения страницы не зависит от ее номера.
+Курсор — непрозрачная строка (base64 от значений ключа последней строки),
+клиент получает ее в заголовке ``X-Next-Cursor`` и передает в параметре ``after``.
+Параметр ``skip`` продолжает работать для обратной совместимости.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DateTime, and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Ключ сортировки: последовательность (колонка модели, по убыванию ли).
+# Последней колонкой должен быть уникальный id, колонки не должны содержать NULL.
+Keyset = Sequence[Tuple[object, bool]]
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value):
+    if value is not None and isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def encode_cursor(row, keyset: Keyset) -> str:
+    """Курсор, указывающий на строку ``row``"""
+    values = [_encode_value(getattr(row, column.key)) for column, _ in keyset]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keyset: Keyset) -> list:
+    """Значения ключа из курсора; некорректный курсор — ошибка 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keyset):
+            raise ValueError(cursor)
+        return [_decode_value(column, value) for (column, _), value in zip(keyset, values)]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации"
+        )
+
+
+def _after_clause(keyset: Keyset, values):
+    """Условие "строго после" для составного ключа с произвольными направлениями"""
+    clauses = []
+    for index, (column, descending) in enumerate(keyset):
+        equal_prefix = [keyset[i][0] == values[i] for i in range(index)]
+        step = column < values[index] if descending else column > values[index]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def paginate(query, keyset: Keyset, limit: int, after: Optional[str] = None, skip: int = 0):
+    """Сортировка по ключу и выбор страницы по курсору (или смещению, если курсора нет).
+
+    Подходит и для ``select()``, и для ``Session.query()``. Выбирается на одну
+    строку больше ``limit``, чтобы узнать, есть ли следующая страница.
+    """
+    order = [column.desc() if descending else column.asc() for column, descending in keyset]
+    query = query.order_by(*order)
+    if after:
+        query = query.where(_after_clause(keyset, decode_cursor(after, keyset)))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+
+def split_page(rows, keyset: Keyset, limit: int) -> Tuple[list, Optional[str]]:
+    """Обрезка лишней строки; курсор следующей страницы или None, если она последняя"""
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if rows:
+            return rows, encode_cursor(rows[-1], keyset)
+    return rows, None
+
+
+def page_items(rows, keyset: Keyset, limit: int, response: Response):
+    """Обрезка лишней строки и передача курсора следующей страницы в заголовке"""
+    rows, cursor = split_page(rows, keyset, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return rows
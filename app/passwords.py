@@ -0,0 +1,174 @@
+"""Хеширование паролей в отдельном ограниченном пуле потоков.
+
+bcrypt занимает процессор на сотни миллисекунд и освобождает GIL на время
+вычисления, поэтому пул потоков масштабируется по ядрам без накладных
+расходов пула процессов. Пул ограничен по числу одновременных вычислений и
+длине очереди: при переполнении запрос отклоняется с 503, а не копится.
+
+Политика хеширования (схема и ее стоимость) задается переменными окружения.
+Хеши, созданные со старыми параметрами, пересчитываются при успешном входе.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.metrics import Counter, Gauge, Histogram
+
+# Количество одновременно вычисляемых хешей и допустимая очередь ожидания
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# Политика хеширования: первая схема используется для новых хешей,
+# остальные только для проверки старых (с последующим пересчетом)
+PASSWORD_SCHEMES = [
+    scheme.strip() for scheme in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if scheme.strip()
+]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# argon2id (требуется пакет argon2-cffi): число проходов, память в КиБ, число потоков
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+
+def build_password_context(
+    schemes: Sequence[str] = tuple(PASSWORD_SCHEMES),
+    bcrypt_rounds: int = BCRYPT_ROUNDS,
+    argon2_time_cost: int = ARGON2_TIME_COST,
+    argon2_memory_cost: int = ARGON2_MEMORY_COST,
+    argon2_parallelism: int = ARGON2_PARALLELISM,
+) -> CryptContext:
+    """Создание контекста passlib по политике хеширования.
+
+    Минимальная и максимальная стоимость совпадают с заданной, поэтому хеш с
+    любыми другими параметрами (как дешевле, так и дороже) считается устаревшим.
+    """
+    settings = {}
+    if "bcrypt" in schemes:
+        settings.update(
+            bcrypt__rounds=bcrypt_rounds,
+            bcrypt__min_rounds=bcrypt_rounds,
+            bcrypt__max_rounds=bcrypt_rounds,
+        )
+    if "argon2" in schemes:
+        from passlib.hash import argon2
+
+        if not argon2.has_backend():
+            raise RuntimeError("Для схемы argon2 необходимо установить пакет argon2-cffi")
+        settings.update(
+            argon2__type="ID",
+            argon2__rounds=argon2_time_cost,
+            argon2__min_rounds=argon2_time_cost,
+            argon2__max_rounds=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__parallelism=argon2_parallelism,
+        )
+    return CryptContext(schemes=list(schemes), deprecated="auto", **settings)
+
+
+# Настройка хеширования паролей
+pwd_context = build_password_context()
+
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Количество операций хеширования паролей, ожидающих свободного потока",
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_wait_seconds",
+    "Время ожидания операции хеширования в очереди",
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Время вычисления хеша или проверки пароля",
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected",
+    "Операции хеширования, отклоненные из-за переполнения очереди",
+)
+
+_executor = None
+_slots = None
+
+
+def configure_password_pool(workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+    """Создание (или пересоздание) пула потоков для хеширования паролей"""
+    global _executor, _slots
+    previous = _executor
+    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+    _slots = threading.BoundedSemaphore(workers + max_queue)
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+configure_password_pool()
+
+
+def _submit(func, *args) -> Future:
+    """Постановка операции в пул с учетом ограничения очереди"""
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        PASSWORD_HASH_REJECTED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Слишком много одновременных попыток входа, повторите позже",
+            headers={"Retry-After": "1"},
+        )
+
+    submitted = time.perf_counter()
+    PASSWORD_HASH_QUEUE_DEPTH.inc()
+
+    def task():
+        started = time.perf_counter()
+        PASSWORD_HASH_QUEUE_DEPTH.dec()
+        PASSWORD_HASH_WAIT.observe(started - submitted)
+        try:
+            return func(*args)
+        finally:
+            PASSWORD_HASH_DURATION.observe(time.perf_counter() - started)
+            slots.release()
+
+    def release_if_cancelled(future):
+        # Отмененная в очереди операция (например, клиент отключился) не
+        # запускает task, поэтому место и глубину очереди освобождаем здесь
+        if future.cancelled():
+            PASSWORD_HASH_QUEUE_DEPTH.dec()
+            slots.release()
+
+    try:
+        future = _executor.submit(task)
+    except RuntimeError:
+        PASSWORD_HASH_QUEUE_DEPTH.dec()
+        slots.release()
+        raise
+    future.add_done_callback(release_if_cancelled)
+    return future
+
+
+def verify_password(plain_password, hashed_password):
+    """Проверка пароля"""
+    return _submit(pwd_context.verify, plain_password, hashed_password).result()
+
+def get_password_hash(password):
+    """Хеширование пароля"""
+    return _submit(pwd_context.hash, password).result()
+
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Проверка пароля; второй элемент — новый хеш, если политика хеширования изменилась"""
+    return _submit(pwd_context.verify_and_update, plain_password, hashed_password).result()
+
+async def verify_password_async(plain_password, hashed_password):
+    """Проверка пароля без блокировки event loop и потока обработчика"""
+    return await asyncio.wrap_future(_submit(pwd_context.verify, plain_password, hashed_password))
+
+async def get_password_hash_async(password):
+    """Хеширование пароля без блокировки event loop и потока обработчика"""
+    return await asyncio.wrap_future(_submit(pwd_context.hash, password))
+
+async def verify_and_update_password_async(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Асинхронный вариант verify_and_update_password"""
+    return await asyncio.wrap_future(_submit(pwd_context.verify_and_update, plain_password, hashed_password))
@@ -0,0 +1,154 @@
+"""Учет SQL запросов по HTTP запросам: количество, время в БД и медленные запросы.
+
+Обработчики событий движка (``instrument_queries``) замеряют каждый запрос к
+БД и добавляют его к статистике текущего HTTP запроса. Статистика хранится в
+``ContextVar``, поэтому доступна и в пуле потоков, где выполняются синхронные
+обработчики. ``QueryStatsMiddleware`` создает статистику для каждого запроса и
+добавляет к ответу заголовок ``Server-Timing: db;dur=<мс>;count=<запросов>``.
+
+Запросы дольше ``SLOW_QUERY_MS`` пишутся в лог с планом выполнения (EXPLAIN
+для SELECT). Параметры запросов могут содержать хэши паролей и email, поэтому
+попадают в лог только при ``SLOW_QUERY_LOG_PARAMS=1``. Если задан ``QUERY_BUDGET``, HTTP запросы,
+выполнившие больше SQL запросов, отмечаются предупреждением, а в тестах
+(``budget_violations``) приводят к ошибке теста.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Порог медленного запроса в миллисекундах, 0 — не логировать
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# План выполнения медленных SELECT в логе (дополнительный запрос к БД)
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1") == "1"
+# Параметры медленных запросов в логе (могут содержать персональные данные)
+SLOW_QUERY_LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "0") == "1"
+# Максимум SQL запросов на HTTP запрос, 0 — без ограничения
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "0"))
+# Заголовок Server-Timing в ответах
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+# Максимальная длина параметров запроса в логе
+_PARAMS_LOG_LIMIT = 1000
+
+# Превышения бюджета (метод, путь, количество); тесты подставляют список
+budget_violations: Optional[List[Tuple[str, str, int]]] = None
+
+
+@dataclass
+class QueryStats:
+    """SQL запросы одного HTTP запроса"""
+    count: int = 0
+    duration: float = 0.0  # секунды
+
+    def server_timing(self) -> str:
+        return f"db;dur={self.duration * 1000:.3f};count={self.count}"
+
+
+query_stats_var: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Учет SQL запросов, выполненных внутри блока (в том числе в пуле потоков)"""
+    stats = QueryStats()
+    token = query_stats_var.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats_var.reset(token)
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        return None
+    # Курсор драйвера напрямую: EXPLAIN не должен снова попасть в обработчики событий
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement: str, parameters, executemany: bool, duration: float):
+    plan = None
+    if SLOW_QUERY_EXPLAIN and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as error:
+            plan = f"EXPLAIN не выполнен: {type(error).__name__}"
+    extra = {"duration_ms": round(duration * 1000, 3), "statement": statement, "plan": plan}
+    if SLOW_QUERY_LOG_PARAMS:
+        extra["params"] = repr(parameters)[:_PARAMS_LOG_LIMIT]
+    logger.warning("Медленный SQL запрос: %.1f мс", duration * 1000, extra=extra)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_started"].pop()
+    stats = query_stats_var.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += duration
+    if 0 < SLOW_QUERY_MS <= duration * 1000:
+        _log_slow_query(conn, statement, parameters, executemany, duration)
+
+
+def _handle_error(exception_context):
+    # Запрос с ошибкой не доходит до after_cursor_execute
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_queries(sync_engine):
+    """Подключение учета SQL запросов к синхронному движку (или ``AsyncEngine.sync_engine``)"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: статистика SQL запросов на HTTP запрос и заголовок ``Server-Timing``"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with track_queries() as stats:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start" and SERVER_TIMING:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if 0 < QUERY_BUDGET < stats.count:
+                    logger.warning(
+                        "Превышен бюджет SQL запросов: %d > %d", stats.count, QUERY_BUDGET,
+                        extra={"method": scope["method"], "db_count": stats.count, "budget": QUERY_BUDGET},
+                    )
+                    if budget_violations is not None:
+                        budget_violations.append((scope["method"], scope["path"], stats.count))
@@ -0,0 +1,300 @@
+"""Кэш ответов публичных эндпоинтов каталога с ETag и ``304 Not Modified``.
+
+``ResponseCacheMiddleware`` сохраняет готовое тело ответа (после сериализации)
+для GET запросов к перечисленным путям, ключ — путь и отсортированная строка
+запроса. Повторный запрос не доходит до обработчика и базы данных. Каждый ответ
+получает сильный ETag (хэш тела); если клиент прислал совпадающий
+``If-None-Match``, тело не отправляется вовсе.
+
+Инвалидация — через номер поколения: ключ записи содержит текущее поколение
+кэша, а ``invalidate()`` увеличивает его, после чего все старые записи
+становятся недостижимыми и вытесняются по TTL или размеру. Обработчики,
+изменяющие курсы и уроки, вызывают ``catalog_cache.invalidate()`` после commit.
+Ответ, вычисленный параллельно с изменением, сохраняется под поколением,
+прочитанным до обработки запроса, и поэтому не переживает инвалидацию.
+
+Хранилище подключаемое: по умолчанию внутрипроцессный LRU с TTL, при
+``RESPONSE_CACHE_URL=redis://...`` — Redis-совместимый сервер (общий для всех
+процессов приложения, требуется пакет ``redis``).
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from app.cache import TTLCache
+from app.metrics import Counter
+
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests",
+    "Запросы к кэшу ответов по результату (hit, miss, not_modified)",
+    labelnames=("cache", "result"),
+)
+
+# Заголовки ответа, которые сохраняются вместе с телом
+_STORED_HEADERS = {b"content-type", b"x-next-cursor"}
+
+
+class CacheBackend(ABC):
+    """Хранилище кэша ответов: байтовые значения с TTL и счетчики поколений"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Значение по ключу или None, если его нет или истек TTL"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float):
+        """Сохранение значения на ttl секунд"""
+
+    @abstractmethod
+    def counter(self, key: str) -> int:
+        """Текущее значение счетчика (0, если его нет)"""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Атомарное увеличение счетчика, возвращает новое значение"""
+
+    @abstractmethod
+    def clear(self):
+        """Удаление всех значений и счетчиков"""
+
+
+class MemoryBackend(CacheBackend):
+    """Внутрипроцессное хранилище (инвалидация видна только этому процессу)"""
+
+    def __init__(self, maxsize: int, ttl: float, name: str):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl, name=name)
+        # Поколения хранятся без TTL: сброс счетчика вернул бы к жизни старые записи
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value, ttl):
+        self._entries.set(key, value, ttl=ttl)
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        self._entries.clear()
+        with self._lock:
+            self._counters.clear()
+
+
+class RedisBackend(CacheBackend):
+    """Хранилище на Redis-совместимом сервере (клиент с API redis-py)"""
+
+    def __init__(self, client, prefix: str = "response-cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Для RESPONSE_CACHE_URL=redis://... требуется пакет redis")
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        if ttl > 0:
+            self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+
+    def to_bytes(self) -> bytes:
+        meta = {
+            "status": self.status,
+            "etag": self.etag,
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in self.headers],
+        }
+        return json.dumps(meta).encode() + b"\n" + self.body
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "CachedResponse":
+        meta, body = raw.split(b"\n", 1)
+        meta = json.loads(meta)
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in meta["headers"]]
+        return cls(status=meta["status"], headers=headers, body=body, etag=meta["etag"])
+
+
+def make_etag(body: bytes) -> str:
+    """Сильный ETag: хэш тела ответа"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """Кэш ответов одной группы эндпоинтов с общей инвалидацией"""
+
+    def __init__(self, backend: CacheBackend, name: str, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+        self._generation_key = f"{name}:generation"
+        self._requests = {
+            result: RESPONSE_CACHE_REQUESTS.labels(name, result)
+            for result in ("hit", "miss", "not_modified")
+        }
+
+    def generation(self) -> int:
+        return self.backend.counter(self._generation_key)
+
+    def key(self, generation: int, path: str, query_string: str) -> str:
+        query = urlencode(sorted(parse_qsl(query_string, keep_blank_values=True)))
+        return f"{self.name}:{generation}:{path}?{query}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raw = self.backend.get(key)
+        return CachedResponse.from_bytes(raw) if raw is not None else None
+
+    def set(self, key: str, response: CachedResponse):
+        self.backend.set(key, response.to_bytes(), self.ttl)
+
+    def invalidate(self):
+        """Все сохраненные ответы становятся недействительными"""
+        self.backend.incr(self._generation_key)
+
+    def record(self, result: str):
+        self._requests[result].inc()
+
+    def clear(self):
+        self.backend.clear()
+
+
+def build_backend(url: str = RESPONSE_CACHE_URL, name: str = "response") -> CacheBackend:
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend.from_url(url)
+    return MemoryBackend(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS, name=name)
+
+
+# Курсы и уроки: список курсов, курс с уроками, список уроков
+catalog_cache = ResponseCache(build_backend(name="catalog_response"), name="catalog")
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware: кэш GET ответов для путей ``paths`` и ответы 304 по ETag"""
+
+    def __init__(self, app, cache: ResponseCache, paths: Iterable[str]):
+        self.app = app
+        self.cache = cache
+        # Шаблоны путей: {id} — числовой сегмент
+        self.patterns = [
+            re.compile("^" + re.escape(path).replace(re.escape("{id}"), r"\d+") + "$") for path in paths
+        ]
+
+    def _cacheable(self, scope) -> bool:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return False
+        return any(pattern.match(scope["path"]) for pattern in self.patterns)
+
+    async def __call__(self, scope, receive, send):
+        if not self._cacheable(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        key = self.cache.key(
+            self.cache.generation(), scope["path"], scope.get("query_string", b"").decode("latin-1")
+        )
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            if etag_matches(if_none_match, cached.etag):
+                self.cache.record("not_modified")
+                await self._send_not_modified(send, cached.etag)
+            else:
+                self.cache.record("hit")
+                await self._send(send, cached, b"HIT")
+            return
+
+        self.cache.record("miss")
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+
+        body = b"".join(chunks)
+        etag = make_etag(body)
+        headers = [(name, value) for name, value in start.get("headers", []) if name.lower() in _STORED_HEADERS]
+        response = CachedResponse(status=start["status"], headers=headers, body=body, etag=etag)
+        # Кэшируются только успешные ответы без cookies
+        if response.status == 200 and not any(name.lower() == b"set-cookie" for name, _ in start["headers"]):
+            self.cache.set(key, response)
+            if etag_matches(if_none_match, etag):
+                await self._send_not_modified(send, etag)
+                return
+            await self._send(send, response, b"MISS", extra=start["headers"])
+            return
+        await send(start)
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _validators(etag: str):
+        return [
+            (b"etag", etag.encode("latin-1")),
+            # Клиенты и CDN хранят ответ, но перед использованием сверяют ETag
+            (b"cache-control", b"public, no-cache"),
+        ]
+
+    async def _send_not_modified(self, send, etag: str):
+        await send({"type": "http.response.start", "status": 304, "headers": self._validators(etag)})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _send(self, send, response: CachedResponse, cache_status: bytes, extra=None):
+        headers = [
+            (name, value) for name, value in (extra if extra is not None else response.headers)
+            if name.lower() not in (b"content-length", b"etag", b"cache-control")
+        ]
+        headers += self._validators(response.etag)
+        headers += [(b"content-length", str(len(response.body)).encode()), (b"x-cache", cache_status)]
+        await send({"type": "http.response.start", "status": response.status, "headers": headers})
+        await send({"type": "http.response.body", "body": response.body})
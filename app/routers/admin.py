@@ -1,170 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List
-from sqlalchemy import func, desc
+from typing import List, Optional
+from sqlalchemy import desc
 
-from app import models, schemas
+from app import lookup, models, schemas, stats
+from app.dashboard import dashboard_cache
 from app.database import get_db
+from app.metrics import REGISTRY
 from app.security import get_current_admin_user
 
 router = APIRouter(tags=["Admin"])
 
+def _dashboard_response(snapshot):
+    return schemas.DashboardStats(
+        **snapshot.stats,
+        recent_users=snapshot.recent_users,
+        popular_courses=snapshot.popular_courses,
+        computed_at=snapshot.computed_at
+    )
+
+@router.get("/stats/dashboard", response_model=schemas.DashboardStats)
+def get_dashboard_stats(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Снимок статистики дашборда из памяти (только для администраторов)"""
+    return _dashboard_response(dashboard_cache.get(db))
+
+@router.post("/stats/dashboard/refresh", response_model=schemas.DashboardStats)
+def refresh_dashboard_stats(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Пересчет снимка статистики дашборда (не чаще DASHBOARD_MIN_REFRESH_SECONDS)"""
+    return _dashboard_response(dashboard_cache.refresh(db, force=False))
+
 @router.get("/stats/courses", response_model=List[schemas.CourseStats])
-async def get_course_stats(
+def get_course_stats(
     skip: int = 0,
     limit: int = 100,
+    sort: Optional[str] = None,
+    min_students: Optional[int] = None,
+    min_lessons: Optional[int] = None,
+    min_rating: Optional[float] = None,
+    format: stats.ExportFormat = stats.ExportFormat.json,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user)
 ):
-    """Получение статистики по курсам (только для администраторов)"""
-    # Подзапрос для подсчета количества студентов на каждом курсе
-    courses_with_students = db.query(
-        models.Course.id,
-        models.Course.title,
-        func.count(models.Enrollment.id).label("total_students")
-    ).outerjoin(
-        models.Enrollment, models.Course.id == models.Enrollment.course_id
-    ).group_by(
-        models.Course.id
-    ).subquery()
-    
-    # Подзапрос для подсчета количества уроков на каждом курсе
-    courses_with_lessons = db.query(
-        models.Course.id,
-        func.count(models.Lesson.id).label("total_lessons")
-    ).outerjoin(
-        models.Lesson, models.Course.id == models.Lesson.course_id
-    ).group_by(
-        models.Course.id
-    ).subquery()
-    
-    # Подзапрос для вычисления среднего рейтинга курса
-    courses_with_ratings = db.query(
-        models.Lesson.course_id,
-        func.avg(models.Rating.stars).label("average_rating")
-    ).join(
-        models.Rating, models.Lesson.id == models.Rating.lesson_id
-    ).group_by(
-        models.Lesson.course_id
-    ).subquery()
-    
-    # Объединение всех подзапросов
-    results = db.query(
-        courses_with_students.c.id.label("course_id"),
-        courses_with_students.c.title,
-        courses_with_students.c.total_students,
-        courses_with_lessons.c.total_lessons,
-        courses_with_ratings.c.average_rating
-    ).outerjoin(
-        courses_with_lessons, courses_with_students.c.id == courses_with_lessons.c.id
-    ).outerjoin(
-        courses_with_ratings, courses_with_students.c.id == courses_with_ratings.c.course_id
-    ).offset(skip).limit(limit).all()
-    
-    # Преобразование результатов в список схем CourseStats
-    stats = []
-    for result in results:
-        stats.append(schemas.CourseStats(
-            course_id=result.course_id,
-            title=result.title,
-            total_students=result.total_students or 0,
-            total_lessons=result.total_lessons or 0,
-            average_rating=round(float(result.average_rating), 1) if result.average_rating else None
-        ))
-    
-    return stats
+    """Получение статистики по курсам (только для администраторов).
+
+    ``sort`` — поля через запятую, ``-`` для убывания (например ``-total_students``).
+    При ``format=ndjson``/``csv`` выгружается весь отчет потоком, без skip/limit.
+    """
+    query = stats.apply_min_filters(stats.course_stats_query(), {
+        "total_students": min_students,
+        "total_lessons": min_lessons,
+        "average_rating": min_rating,
+    })
+    query = stats.apply_sort(query, sort, key="course_id")
+    if format != stats.ExportFormat.json:
+        return stats.export_response(db, query, format, "course-stats")
+    return db.execute(query.offset(skip).limit(limit)).mappings().all()
 
 @router.get("/stats/users", response_model=List[schemas.UserStats])
-async def get_user_stats(
+def get_user_stats(
     skip: int = 0,
     limit: int = 100,
+    sort: Optional[str] = None,
+    min_enrolled: Optional[int] = None,
+    min_activity: Optional[int] = None,
+    format: stats.ExportFormat = stats.ExportFormat.json,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user)
 ):
-    """Получение статистики по пользователям (только для администраторов)"""
-    # Подзапрос для подсчета количества курсов, на которые записан каждый пользователь
-    users_with_courses = db.query(
-        models.User.id,
-        models.User.full_name,
-        func.count(models.Enrollment.id).label("total_courses_enrolled")
-    ).outerjoin(
-        models.Enrollment, models.User.id == models.Enrollment.user_id
-    ).group_by(
-        models.User.id
-    ).subquery()
-    
-    # Подзапрос для подсчета количества комментариев каждого пользователя
-    users_with_comments = db.query(
-        models.User.id,
-        func.count(models.Comment.id).label("total_comments")
-    ).outerjoin(
-        models.Comment, models.User.id == models.Comment.user_id
-    ).group_by(
-        models.User.id
-    ).subquery()
-    
-    # Подзапрос для подсчета количества оценок каждого пользователя
-    users_with_ratings = db.query(
-        models.User.id,
-        func.count(models.Rating.id).label("total_ratings")
-    ).outerjoin(
-        models.Rating, models.User.id == models.Rating.user_id
-    ).group_by(
-        models.User.id
-    ).subquery()
-    
-    # Объединение всех подзапросов
-    results = db.query(
-        users_with_courses.c.id.label("user_id"),
-        users_with_courses.c.full_name,
-        users_with_courses.c.total_courses_enrolled,
-        users_with_comments.c.total_comments,
-        users_with_ratings.c.total_ratings
-    ).outerjoin(
-        users_with_comments, users_with_courses.c.id == users_with_comments.c.id
-    ).outerjoin(
-        users_with_ratings, users_with_courses.c.id == users_with_ratings.c.id
-    ).offset(skip).limit(limit).all()
-    
-    # Преобразование результатов в список схем UserStats
-    stats = []
-    for result in results:
-        stats.append(schemas.UserStats(
-            user_id=result.user_id,
-            full_name=result.full_name,
-            total_courses_enrolled=result.total_courses_enrolled or 0,
-            total_comments=result.total_comments or 0,
-            total_ratings=result.total_ratings or 0
-        ))
-    
-    return stats
+    """Получение статистики по пользователям (только для администраторов).
+
+    Параметры сортировки и выгрузки — как у ``/stats/courses``.
+    """
+    query = stats.apply_min_filters(stats.user_stats_query(), {
+        "total_courses_enrolled": min_enrolled,
+        "activity_count": min_activity,
+    })
+    query = stats.apply_sort(query, sort, key="user_id")
+    if format != stats.ExportFormat.json:
+        return stats.export_response(db, query, format, "user-stats")
+    return db.execute(query.offset(skip).limit(limit)).mappings().all()
 
 @router.get("/stats/popular-lessons", response_model=List[schemas.LessonResponse])
-async def get_popular_lessons(
+def get_popular_lessons(
     limit: int = 10,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user)
 ):
     """Получение самых популярных уроков на основе рейтинга (только для администраторов)"""
-    # Подзапрос для вычисления среднего рейтинга каждого урока
-    lessons_with_ratings = db.query(
-        models.Lesson.id,
-        func.avg(models.Rating.stars).label("average_rating"),
-        func.count(models.Rating.id).label("rating_count")
-    ).outerjoin(
-        models.Rating, models.Lesson.id == models.Rating.lesson_id
-    ).group_by(
-        models.Lesson.id
-    ).having(
-        func.count(models.Rating.id) > 0  # Только уроки с оценками
-    ).subquery()
-    
-    # Получение уроков с высоким рейтингом
+    # Средний рейтинг берется из счетчиков lesson_stats (только уроки с оценками)
+    average_rating = models.LessonStats.rating_sum * 1.0 / models.LessonStats.rating_count
     popular_lesson_ids = db.query(
-        lessons_with_ratings.c.id
+        models.LessonStats.lesson_id
+    ).filter(
+        models.LessonStats.rating_count > 0
     ).order_by(
-        desc(lessons_with_ratings.c.average_rating),
-        desc(lessons_with_ratings.c.rating_count)
+        desc(average_rating),
+        desc(models.LessonStats.rating_count)
     ).limit(limit).all()
     
     popular_lesson_ids = [id for (id,) in popular_lesson_ids]
@@ -180,42 +117,52 @@ async def get_popular_lessons(
     return popular_lessons
 
 @router.get("/stats/active-users", response_model=List[schemas.UserResponse])
-async def get_active_users(
+def get_active_users(
     limit: int = 10,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user)
 ):
     """Получение самых активных пользователей (только для администраторов)"""
-    # Подзапрос для подсчета активности пользователей (комментарии + оценки)
-    users_activity = db.query(
-        models.User.id,
-        (
-            func.count(models.Comment.id) + 
-            func.count(models.Rating.id)
-        ).label("activity_count")
-    ).outerjoin(
-        models.Comment, models.User.id == models.Comment.user_id
-    ).outerjoin(
-        models.Rating, models.User.id == models.Rating.user_id
-    ).group_by(
-        models.User.id
-    ).subquery()
-    
-    # Получение ID самых активных пользователей
-    active_user_ids = db.query(
-        users_activity.c.id
-    ).order_by(
-        desc(users_activity.c.activity_count)
-    ).limit(limit).all()
-    
-    active_user_ids = [id for (id,) in active_user_ids]
-    
-    if not active_user_ids:
-        return []
-    
-    # Получение полной информации о самых активных пользователях
-    active_users = db.query(models.User).filter(
-        models.User.id.in_(active_user_ids)
-    ).all()
-    
-    return active_users
+    # Комментарии и оценки считаются раздельно и складываются (см. app.stats)
+    return db.scalars(stats.active_users_query(limit)).all()
+
+@router.get("/stats/runtime")
+def get_runtime_stats(
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Текущие метрики процесса: пул соединений, кэши, очереди (только для администраторов)"""
+    return REGISTRY.snapshot()
+
+@router.get("/lookup/users", response_model=List[schemas.LookupItem])
+def lookup_users(
+    q: str = Query("", max_length=100),
+    limit: int = Query(lookup.LOOKUP_DEFAULT_LIMIT, ge=1, le=lookup.LOOKUP_MAX_LIMIT),
+    id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Подсказки пользователей по началу имени или email (только для администраторов)"""
+    return lookup.lookup_users(db, q, limit, item_id=id)
+
+@router.get("/lookup/courses", response_model=List[schemas.LookupItem])
+def lookup_courses(
+    q: str = Query("", max_length=100),
+    limit: int = Query(lookup.LOOKUP_DEFAULT_LIMIT, ge=1, le=lookup.LOOKUP_MAX_LIMIT),
+    id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Подсказки курсов по началу названия (только для администраторов)"""
+    return lookup.lookup_courses(db, q, limit, item_id=id)
+
+@router.get("/lookup/lessons", response_model=List[schemas.LookupItem])
+def lookup_lessons(
+    q: str = Query("", max_length=100),
+    limit: int = Query(lookup.LOOKUP_DEFAULT_LIMIT, ge=1, le=lookup.LOOKUP_MAX_LIMIT),
+    id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Подсказки уроков по началу названия, с названием курса (только для администраторов)"""
+    return lookup.lookup_lessons(db, q, limit, item_id=id, course_id=course_id)
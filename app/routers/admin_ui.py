@@ -3,17 +3,22 @@ from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional, Dict, Any
 from sqlalchemy import func
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 
+import logging
+
 from app import models, schemas
+from app.dashboard import dashboard_cache
 from app.database import get_db
 from app.security import get_current_admin_user, security_scheme, SECRET_KEY, ALGORITHM
 from app import models
 
+logger = logging.getLogger(__name__)
+
 # Создание маршрутизатора для административного интерфейса
 router = APIRouter(prefix="/admin", tags=["Admin UI"])
 
@@ -28,15 +33,15 @@ async def admin_root():
 @router.get("/debug", response_class=HTMLResponse)
 async def admin_debug(request: Request):
     """Отладочная страница для проверки работы шаблонов"""
-    return templates.TemplateResponse("admin/debug.html", {"request": request})
+    return templates.TemplateResponse(request, "admin/debug.html")
 
 @router.get("/login", response_class=HTMLResponse)
 async def admin_login(request: Request):
     """Страница входа в административную панель"""
-    return templates.TemplateResponse("admin/login.html", {"request": request})
+    return templates.TemplateResponse(request, "admin/login.html")
 
 @router.post("/auth-check")
-async def admin_auth_check(request: Request, db: Session = Depends(get_db), credentials = Depends(security_scheme)):
+def admin_auth_check(request: Request, db: Session = Depends(get_db), credentials = Depends(security_scheme)):
     """Проверка аутентификации для администратора"""
     try:
         token = credentials.credentials
@@ -54,38 +59,34 @@ async def admin_auth_check(request: Request, db: Session = Depends(get_db), cred
         return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Недействительный токен"})
 
 @router.post("/dashboard-redirect")
-async def admin_dashboard_redirect(request: Request, db: Session = Depends(get_db)):
+def admin_dashboard_redirect(request: Request, db: Session = Depends(get_db)):
     """Перенаправление на дашборд с токеном"""
-    print("[ИНФО] Получен запрос на dashboard-redirect")
     try:
         # Получаем токен из заголовка Authorization
         auth_header = request.headers.get("Authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
-            print("[ОШИБКА] Отсутствует заголовок Authorization или неверный формат: {auth_header}")
+            logger.warning("Отсутствует заголовок Authorization или неверный формат")
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authorization header is missing or invalid")
 
         token = auth_header.split(" ")[1]
-        print(f"[ИНФО] Получен токен: {token[:10]}...")
         
         # Проверяем валидность токена
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             email: str = payload.get("sub")
             if email is None:
-                print("[ОШИБКА] Email не найден в токене")
+                logger.warning("Email не найден в токене")
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
                 
             # Проверяем пользователя в базе данных
             user = db.query(models.User).filter(models.User.email == email).first()
             if not user:
-                print(f"[ОШИБКА] Пользователь с email {email} не найден")
+                logger.warning("Пользователь не найден", extra={"email": email})
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found") 
             
             if not user.is_admin:
-                print(f"[ОШИБКА] Пользователь {email} не является администратором")
+                logger.warning("Пользователь не является администратором", extra={"user_id": user.id})
                 raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
-                
-            print(f"[ИНФО] Валидация токена успешна для пользователя {email}")
             
             # Сохраняем токен в cookie
             response = JSONResponse(content={"status": "ok", "message": "Успешная авторизация"})
@@ -98,53 +99,69 @@ async def admin_dashboard_redirect(request: Request, db: Session = Depends(get_d
                 samesite="lax" # Важно для современных браузеров
             )
             
-            print(f"[ИНФО] Токен успешно установлен в cookie")
+            logger.info("Вход в административную панель", extra={"user_id": user.id})
             return response
             
         except JWTError as e:
-            print(f"[ОШИБКА] JWT ошибка: {str(e)}")
+            logger.warning("Недействительный токен", extra={"error": type(e).__name__})
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token format")            
     except Exception as e:
-        print(f"[ОШИБКА] Неожиданная ошибка: {str(e)}")
+        logger.exception("Ошибка входа в административную панель")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
 
+# Агрегаты для списков: один запрос к таблицам счетчиков на страницу вместо запроса на строку
+def _course_aggregates(db: Session, course_ids: List[int]):
+    """Количество уроков, студентов и средний рейтинг для набора курсов"""
+    if not course_ids:
+        return {}, {}, {}
+    stats = db.query(models.CourseStats).filter(models.CourseStats.course_id.in_(course_ids)).all()
+    lessons_count = {row.course_id: row.lesson_count for row in stats}
+    students_count = {row.course_id: row.enrollment_count for row in stats}
+    average_rating = {row.course_id: row.average_rating for row in stats}
+    return lessons_count, students_count, average_rating
+
+def _lesson_aggregates(db: Session, lesson_ids: List[int]):
+    """Средний рейтинг и количество комментариев для набора уроков"""
+    if not lesson_ids:
+        return {}, {}
+    stats = db.query(models.LessonStats).filter(models.LessonStats.lesson_id.in_(lesson_ids)).all()
+    average_rating = {row.lesson_id: row.average_rating for row in stats}
+    comments_count = {row.lesson_id: row.comment_count for row in stats}
+    return average_rating, comments_count
+
 # Обработка токена и аутентификации
 def get_token_from_cookie(access_token: Optional[str] = Cookie(None)):
     """Получаем токен из cookie"""
     if access_token is None:
-        print("[ОШИБКА] Токен не найден в cookie")
-        return None
-    
-    print(f"[ИНФО] Токен получен из cookie: {access_token[:10]}...")
+        logger.debug("Токен не найден в cookie")
     return access_token
 
 # Функция проверки пользователя по токену
-async def get_current_admin_user_from_token(token: str, db: Session):
+def get_current_admin_user_from_token(token: str, db: Session):
     """Проверяем токен и получаем пользователя с правами админа"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            print("[ОШИБКА] Email не найден в токене")
+            logger.warning("Email не найден в токене")
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
         
         user = db.query(models.User).filter(models.User.email == email).first()
         if not user:
-            print(f"[ОШИБКА] Пользователь с email {email} не найден")
+            logger.warning("Пользователь не найден", extra={"email": email})
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
         
         if not user.is_admin:
-            print(f"[ОШИБКА] Пользователь {email} не является администратором")
+            logger.warning("Пользователь не является администратором", extra={"user_id": user.id})
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
         
-        print(f"[ИНФО] Успешная аутентификация пользователя {email}")
         return user
     except JWTError as e:
-        print(f"[ОШИБКА] JWT ошибка: {str(e)}")
+        logger.warning("Недействительный токен", extra={"error": type(e).__name__})
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
 @router.get("/dashboard", response_class=HTMLResponse)
-async def admin_dashboard(
+def admin_dashboard(
     request: Request,
     db: Session = Depends(get_db),
     token: Optional[str] = Depends(get_token_from_cookie)
@@ -152,49 +169,20 @@ async def admin_dashboard(
     """Главная страница административной панели"""
     # Если токен отсутствует, перенаправляем на страницу входа
     if token is None:
-        print("[ИНФО] Токен отсутствует, перенаправление на страницу входа")
         return RedirectResponse("/admin/login", status_code=status.HTTP_303_SEE_OTHER)
     
-    print(f"[ИНФО] Попытка доступа к дашборду, токен: {token[:10]}...")
     try:
         # Проверяем токен и получаем пользователя
-        user = await get_current_admin_user_from_token(token, db)
-        
-        # Получение статистики
-        users_count = db.query(func.count(models.User.id)).scalar()
-        courses_count = db.query(func.count(models.Course.id)).scalar()
-        lessons_count = db.query(func.count(models.Lesson.id)).scalar()
-        enrollments_count = db.query(func.count(models.Enrollment.id)).scalar()
-        
-        # Последние 5 пользователей
-        recent_users = db.query(models.User).order_by(models.User.id.desc()).limit(5).all()
-        
-        # Популярные курсы (по количеству записей)
-        popular_courses = db.query(models.Course).join(models.Enrollment).group_by(models.Course.id)\
-            .order_by(func.count(models.Enrollment.id).desc()).limit(5).all()
-        
-        # Добавление дополнительных данных к курсам
-        for course in popular_courses:
-            # Количество студентов
-            course.students_count = db.query(func.count(models.Enrollment.id))\
-                .filter(models.Enrollment.course_id == course.id).scalar()
-            
-            # Средний рейтинг
-            avg_rating = db.query(func.avg(models.Rating.stars))\
-                .join(models.Lesson, models.Lesson.id == models.Rating.lesson_id)\
-                .filter(models.Lesson.course_id == course.id).scalar()
-            course.average_rating = round(avg_rating, 1) if avg_rating else 0
-        
-        return templates.TemplateResponse("admin/dashboard.html", {
-            "request": request,
-            "stats": {
-                "users_count": users_count,
-                "courses_count": courses_count,
-                "lessons_count": lessons_count,
-                "enrollments_count": enrollments_count
-            },
-            "recent_users": recent_users,
-            "popular_courses": popular_courses,
+        user = get_current_admin_user_from_token(token, db)
+        
+        # Статистика берется из снимка, который обновляется в фоне
+        snapshot = dashboard_cache.get(db)
+        
+        return templates.TemplateResponse(request, "admin/dashboard.html", {
+            "stats": snapshot.stats,
+            "recent_users": snapshot.recent_users,
+            "popular_courses": snapshot.popular_courses,
+            "computed_at": snapshot.computed_at,
             "current_user": user
         })
     except JWTError:
@@ -203,8 +191,25 @@ async def admin_dashboard(
         response.delete_cookie("access_token")
         return response
 
+@router.post("/dashboard/refresh")
+def admin_dashboard_refresh(
+    db: Session = Depends(get_db),
+    token: Optional[str] = Depends(get_token_from_cookie)
+):
+    """Пересчет статистики дашборда по запросу (не чаще DASHBOARD_MIN_REFRESH_SECONDS)"""
+    if token is None:
+        return RedirectResponse("/admin/login", status_code=status.HTTP_303_SEE_OTHER)
+    try:
+        get_current_admin_user_from_token(token, db)
+        dashboard_cache.refresh(db, force=False)
+        return RedirectResponse("/admin/dashboard", status_code=status.HTTP_303_SEE_OTHER)
+    except JWTError:
+        response = RedirectResponse("/admin/login")
+        response.delete_cookie("access_token")
+        return response
+
 @router.get("/users", response_class=HTMLResponse)
-async def admin_users(
+def admin_users(
     request: Request,
     page: int = 1,
     limit: int = 10,
@@ -217,7 +222,7 @@ async def admin_users(
     """Фойдаланувчиларни бошқариш саҳифаси"""
     try:
         # Проверяем токен и получаем пользователя
-        user = await get_current_admin_user_from_token(token, db)
+        user = get_current_admin_user_from_token(token, db)
         
         # Пагинация
         offset = (page - 1) * limit
@@ -229,8 +234,7 @@ async def admin_users(
         total = db.query(func.count(models.User.id)).scalar()
         pages = (total + limit - 1) // limit  # Юқорига тўғрилаш
         
-        return templates.TemplateResponse("admin/users.html", {
-            "request": request,
+        return templates.TemplateResponse(request, "admin/users.html", {
             "users": users,
             "total": total,
             "pages": pages,
@@ -244,7 +248,7 @@ async def admin_users(
         return response
 
 @router.get("/courses", response_class=HTMLResponse)
-async def admin_courses(
+def admin_courses(
     request: Request,
     page: int = 1,
     limit: int = 10,
@@ -256,57 +260,38 @@ async def admin_courses(
         return RedirectResponse("/admin/login", status_code=status.HTTP_303_SEE_OTHER)
     try:
         # Проверяем токен и получаем пользователя
-        user = await get_current_admin_user_from_token(token, db)
+        user = get_current_admin_user_from_token(token, db)
         
         # Пагинация
         offset = (page - 1) * limit
         
         # Получение курсов с пагинацией
-        courses_query = db.query(models.Course).offset(offset).limit(limit).all()
+        courses_query = db.query(models.Course).options(joinedload(models.Course.author))\
+            .offset(offset).limit(limit).all()
         
         # Общее количество курсов для пагинации
         total_courses = db.query(func.count(models.Course.id)).scalar()
         total_pages = (total_courses + limit - 1) // limit  # Округление вверх
         
-        # Получение дополнительных данных для каждого курса
+        # Получение дополнительных данных для всех курсов страницы
+        lessons_count, students_count, average_rating = _course_aggregates(
+            db, [course.id for course in courses_query]
+        )
         courses = []
         for course in courses_query:
-            # Количество уроков
-            lessons_count = db.query(func.count(models.Lesson.id)).filter(
-                models.Lesson.course_id == course.id
-            ).scalar()
-            
-            # Количество студентов
-            students_count = db.query(func.count(models.Enrollment.id)).filter(
-                models.Enrollment.course_id == course.id
-            ).scalar()
-            
-            # Средний рейтинг
-            avg_rating = db.query(func.avg(models.Rating.stars)).join(
-                models.Lesson, models.Rating.lesson_id == models.Lesson.id
-            ).filter(
-                models.Lesson.course_id == course.id
-            ).scalar()
-            
-            # Получение информации об авторе
-            author = db.query(models.User).filter(models.User.id == course.author_id).first()
-            
+            avg_rating = average_rating.get(course.id)
             courses.append({
                 "id": course.id,
                 "title": course.title,
-                "author": author,
-                "lessons_count": lessons_count,
-                "students_count": students_count,
+                "author": course.author,
+                "lessons_count": lessons_count.get(course.id, 0),
+                "students_count": students_count.get(course.id, 0),
                 "average_rating": round(float(avg_rating), 1) if avg_rating else 0
             })
         
-        # Получение всех авторов для выпадающего списка формы добавления курса
-        authors = db.query(models.User).all()
-        
-        return templates.TemplateResponse("admin/courses.html", {
-            "request": request,
+        # Выпадающие списки загружают варианты с /api/admin/lookup/* по мере ввода
+        return templates.TemplateResponse(request, "admin/courses.html", {
             "courses": courses,
-            "authors": authors,
             "total": total_courses,
             "pages": total_pages,
             "current_page": page,
@@ -319,7 +304,7 @@ async def admin_courses(
         return response
 
 @router.get("/lessons", response_class=HTMLResponse)
-async def admin_lessons(
+def admin_lessons(
     request: Request,
     course_id: Optional[int] = None,
     page: int = 1,
@@ -333,13 +318,13 @@ async def admin_lessons(
     """Урокларни бошқариш саҳифаси"""
     try:
         # Проверяем токен и получаем пользователя
-        user = await get_current_admin_user_from_token(token, db)
+        user = get_current_admin_user_from_token(token, db)
             
         # Пагинация
         offset = (page - 1) * limit
         
         # Базовый запрос
-        lessons_query = db.query(models.Lesson)
+        lessons_query = db.query(models.Lesson).options(joinedload(models.Lesson.course))
         
         # Если указан ID курса, фильтруем по нему
         if course_id:
@@ -355,35 +340,25 @@ async def admin_lessons(
         total_lessons = total_lessons_query.scalar()
         total_pages = (total_lessons + limit - 1) // limit  # Округление вверх
         
-        # Получение дополнительных данных для каждого урока
+        # Получение дополнительных данных для всех уроков страницы
+        average_rating, comments_count = _lesson_aggregates(db, [lesson.id for lesson in lessons_db])
         lessons = []
         for lesson in lessons_db:
-            # Получение курса
-            course = db.query(models.Course).filter(models.Course.id == lesson.course_id).first()
-            
-            # Средний рейтинг урока
-            avg_rating = db.query(func.avg(models.Rating.stars)).filter(models.Rating.lesson_id == lesson.id).scalar()
-            
-            # Количество комментариев к уроку
-            comments_count = db.query(models.Comment).filter(models.Comment.lesson_id == lesson.id).count()
-            
+            avg_rating = average_rating.get(lesson.id)
             lessons.append({
                 "id": lesson.id,
                 "title": lesson.title,
                 "content": lesson.content,
                 "video_url": lesson.video_url,
-                "course": course,
+                "order": lesson.order,
+                "course": lesson.course,
                 "average_rating": round(float(avg_rating), 1) if avg_rating else None,
-                "comments_count": comments_count
+                "comments_count": comments_count.get(lesson.id, 0)
             })
         
-        # Получение всех курсов для выпадающего списка
-        courses = db.query(models.Course).all()
-        
-        return templates.TemplateResponse("admin/lessons.html", {
-            "request": request,
+        # Выпадающие списки загружают варианты с /api/admin/lookup/* по мере ввода
+        return templates.TemplateResponse(request, "admin/lessons.html", {
             "lessons": lessons,
-            "courses": courses,
             "selected_course": course_id,
             "current_page": page,
             "total_pages": total_pages,
@@ -398,7 +373,7 @@ async def admin_lessons(
         return response
 
 @router.get("/comments", response_class=HTMLResponse)
-async def admin_comments(
+def admin_comments(
     request: Request,
     lesson_id: Optional[int] = None,
     page: int = 1,
@@ -411,13 +386,15 @@ async def admin_comments(
         return RedirectResponse("/admin/login", status_code=status.HTTP_303_SEE_OTHER)
     try:
         # Проверяем токен и получаем пользователя
-        user = await get_current_admin_user_from_token(token, db)
+        user = get_current_admin_user_from_token(token, db)
         
         # Пагинация
         offset = (page - 1) * limit
         
         # Базовый запрос
-        comments_query = db.query(models.Comment)
+        comments_query = db.query(models.Comment).options(
+            joinedload(models.Comment.user), joinedload(models.Comment.lesson)
+        )
         
         # Если указан ID урока, фильтруем по нему
         if lesson_id:
@@ -433,38 +410,21 @@ async def admin_comments(
         total_comments = total_comments_query.scalar()
         total_pages = (total_comments + limit - 1) // limit  # Округление вверх
         
-        # Получение дополнительных данных для каждого комментария
-        comments = []
-        for comment in comments_db:
-            # Получение пользователя
-            user = db.query(models.User).filter(models.User.id == comment.user_id).first()
-            
-            # Получение урока
-            lesson = db.query(models.Lesson).filter(models.Lesson.id == comment.lesson_id).first()
-            
-            comments.append({
+        # Пользователь и урок загружены вместе с комментариями
+        comments = [
+            {
                 "id": comment.id,
                 "text": comment.text,
                 "created_at": comment.created_at,
-                "user": user,
-                "lesson": lesson
-            })
-        
-        # Получение всех уроков для выпадающего списка
-        lessons_db = db.query(models.Lesson).all()
-        lessons = []
-        for lesson in lessons_db:
-            course = db.query(models.Course).filter(models.Course.id == lesson.course_id).first()
-            lessons.append({
-                "id": lesson.id,
-                "title": lesson.title,
-                "course": course
-            })
-        
-        return templates.TemplateResponse("admin/comments.html", {
-            "request": request,
+                "user": comment.user,
+                "lesson": comment.lesson
+            }
+            for comment in comments_db
+        ]
+        
+        # Выпадающие списки загружают варианты с /api/admin/lookup/* по мере ввода
+        return templates.TemplateResponse(request, "admin/comments.html", {
             "comments": comments,
-            "lessons": lessons,
             "selected_lesson": lesson_id,
             "total_pages": total_pages,
             "current_page": page,
@@ -480,7 +440,7 @@ async def admin_comments(
         return response
 
 @router.get("/ratings", response_class=HTMLResponse)
-async def admin_ratings(
+def admin_ratings(
     request: Request,
     lesson_id: Optional[int] = None,
     stars: Optional[int] = None,
@@ -494,13 +454,16 @@ async def admin_ratings(
         return RedirectResponse("/admin/login", status_code=status.HTTP_303_SEE_OTHER)
     try:
         # Проверяем токен и получаем пользователя
-        user = await get_current_admin_user_from_token(token, db)
+        user = get_current_admin_user_from_token(token, db)
         
         # Пагинация
         offset = (page - 1) * limit
         
         # Базовый запрос
-        ratings_query = db.query(models.Rating)
+        ratings_query = db.query(models.Rating).options(
+            joinedload(models.Rating.user),
+            joinedload(models.Rating.lesson).joinedload(models.Lesson.course)
+        )
         
         # Применяем фильтры
         if lesson_id:
@@ -520,43 +483,21 @@ async def admin_ratings(
         total_ratings = total_ratings_query.scalar()
         total_pages = (total_ratings + limit - 1) // limit  # Округление вверх
         
-        # Получение дополнительных данных для каждого рейтинга
-        ratings = []
-        for rating in ratings_db:
-            # Получение пользователя
-            user = db.query(models.User).filter(models.User.id == rating.user_id).first()
-            
-            # Получение урока
-            lesson = db.query(models.Lesson).filter(models.Lesson.id == rating.lesson_id).first()
-            
-            # Получение курса
-            course = None
-            if lesson:
-                course = db.query(models.Course).filter(models.Course.id == lesson.course_id).first()
-            
-            ratings.append({
+        # Пользователь, урок и курс урока загружены вместе с оценками
+        ratings = [
+            {
                 "id": rating.id,
                 "stars": rating.stars,
-                "user": user,
-                "lesson": lesson,
-                "lesson_course": course
-            })
-        
-        # Получение всех уроков для выпадающего списка
-        lessons_db = db.query(models.Lesson).all()
-        lessons = []
-        for lesson in lessons_db:
-            course = db.query(models.Course).filter(models.Course.id == lesson.course_id).first()
-            lessons.append({
-                "id": lesson.id,
-                "title": lesson.title,
-                "course": course
-            })
-        
-        return templates.TemplateResponse("admin/ratings.html", {
-            "request": request,
+                "user": rating.user,
+                "lesson": rating.lesson,
+                "lesson_course": rating.lesson.course if rating.lesson else None
+            }
+            for rating in ratings_db
+        ]
+        
+        # Выпадающие списки загружают варианты с /api/admin/lookup/* по мере ввода
+        return templates.TemplateResponse(request, "admin/ratings.html", {
             "ratings": ratings,
-            "lessons": lessons,
             "stars_options": list(range(1, 6)),
             "selected_lesson": lesson_id,
             "selected_stars": stars,
@@ -574,7 +515,7 @@ async def admin_ratings(
         return response
 
 @router.get("/enrollments", response_class=HTMLResponse)
-async def admin_enrollments(
+def admin_enrollments(
     request: Request,
     course_id: Optional[int] = None,
     user_id: Optional[int] = None,
@@ -588,13 +529,15 @@ async def admin_enrollments(
         return RedirectResponse("/admin/login", status_code=status.HTTP_303_SEE_OTHER)
     try:
         # Проверяем токен и получаем пользователя
-        user = await get_current_admin_user_from_token(token, db)
+        user = get_current_admin_user_from_token(token, db)
         
         # Пагинация
         offset = (page - 1) * limit
         
         # Базовый запрос
-        enrollments_query = db.query(models.Enrollment)
+        enrollments_query = db.query(models.Enrollment).options(
+            joinedload(models.Enrollment.user), joinedload(models.Enrollment.course)
+        )
         
         # Применяем фильтры
         if course_id:
@@ -614,31 +557,20 @@ async def admin_enrollments(
         total_enrollments = total_enrollments_query.scalar()
         total_pages = (total_enrollments + limit - 1) // limit  # Округление вверх
         
-        # Получение дополнительных данных для каждой записи
-        enrollments = []
-        for enrollment in enrollments_db:
-            # Получение пользователя
-            user = db.query(models.User).filter(models.User.id == enrollment.user_id).first()
-            
-            # Получение курса
-            course = db.query(models.Course).filter(models.Course.id == enrollment.course_id).first()
-            
-            enrollments.append({
+        # Пользователь и курс загружены вместе с записями
+        enrollments = [
+            {
                 "id": enrollment.id,
                 "enrolled_at": enrollment.enrolled_at,
-                "user": user,
-                "course": course
-            })
-        
-        # Получение всех курсов и пользователей для выпадающих списков
-        courses = db.query(models.Course).all()
-        users = db.query(models.User).all()
-        
-        return templates.TemplateResponse("admin/enrollments.html", {
-            "request": request,
+                "user": enrollment.user,
+                "course": enrollment.course
+            }
+            for enrollment in enrollments_db
+        ]
+        
+        # Выпадающие списки загружают варианты с /api/admin/lookup/* по мере ввода
+        return templates.TemplateResponse(request, "admin/enrollments.html", {
             "enrollments": enrollments,
-            "courses": courses,
-            "users": users,
             "selected_course": course_id,
             "total_pages": total_pages,
             "current_page": page,
@@ -655,7 +587,7 @@ async def admin_enrollments(
         return response
 
 @router.get("/db-schema", response_class=HTMLResponse)
-async def admin_db_schema(
+def admin_db_schema(
     request: Request,
     db: Session = Depends(get_db),
     token: Optional[str] = Depends(get_token_from_cookie)
@@ -665,10 +597,9 @@ async def admin_db_schema(
         return RedirectResponse("/admin/login", status_code=status.HTTP_303_SEE_OTHER)
     try:
         # Проверяем токен и получаем пользователя
-        user = await get_current_admin_user_from_token(token, db)
+        user = get_current_admin_user_from_token(token, db)
             
-        return templates.TemplateResponse("admin/db_schema.html", {
-            "request": request,
+        return templates.TemplateResponse(request, "admin/db_schema.html", {
             "current_user": user
         })
     except JWTError:
@@ -1,21 +1,26 @@
+import logging
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import models, schemas
 from app.database import get_db
 from app.security import (
-    authenticate_user, create_access_token, get_password_hash,
-    ACCESS_TOKEN_EXPIRE_MINUTES
+    authenticate_user_async, create_user_access_token, get_password_hash_async,
+    get_user, remember_token_version, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Получение токена доступа"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    # Проверка пароля выполняется в отдельном пуле, поток обработчика не занимается
+    user = await authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -23,16 +28,15 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user, expires_delta=access_token_expires)
+    remember_token_version(user)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=schemas.UserResponse)
 async def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
     """Регистрация нового пользователя"""
     # Проверка существования пользователя с таким email
-    db_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+    db_user = await run_in_threadpool(get_user, db, user_data.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -40,7 +44,7 @@ async def register(user_data: schemas.UserCreate, db: Session = Depends(get_db))
         )
     
     # Создание нового пользователя
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = models.User(
         full_name=user_data.full_name,
         email=user_data.email,
@@ -49,8 +53,13 @@ async def register(user_data: schemas.UserCreate, db: Session = Depends(get_db))
         is_admin=False  # По умолчанию не админ
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(_save_user, db, new_user)
     
     return new_user
+
+def _save_user(db: Session, user: models.User):
+    """Сохранение нового пользователя"""
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    logger.info("Зарегистрирован пользователь", extra={"user_id": user.id})
@@ -1,41 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models, schemas
-from app.database import get_db
-from app.security import get_current_user, get_current_admin_user
+from app.database import get_db, get_async_db
+from app.access import CourseAccess, check_course_access, require_course_access
+from app.pagination import paginate, page_items
+from app.security import get_current_user, get_current_admin_user, get_current_principal, Principal
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
+# Ключ keyset пагинации: новые комментарии первыми. created_at задается сервером
+# при вставке, поэтому убывание id совпадает с убыванием времени создания
+COMMENT_KEYSET = ((models.Comment.id, True),)
+
 @router.post("/", response_model=schemas.CommentResponse)
-async def create_comment(
+def create_comment(
     comment_data: schemas.CommentCreate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Создание нового комментария к уроку"""
-    # Проверка существования урока
-    lesson = db.query(models.Lesson).filter(models.Lesson.id == comment_data.lesson_id).first()
-    if not lesson:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Урок не найден"
-        )
-    
-    # Проверка, записан ли пользователь на курс
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == lesson.course_id
-    ).first()
-    
-    # Если пользователь не записан на курс и не является автором или администратором
-    course = db.query(models.Course).filter(models.Course.id == lesson.course_id).first()
-    if not enrollment and course.author_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Вы не записаны на этот курс"
-        )
+    # Урок существует, и пользователь записан на курс, является его автором или администратором
+    check_course_access(db, current_user, comment_data.lesson_id)
     
     # Создание комментария
     new_comment = models.Comment(
@@ -47,52 +40,34 @@ async def create_comment(
     db.add(new_comment)
     db.commit()
     db.refresh(new_comment)
+    logger.info("Комментарий добавлен", extra={"comment_id": new_comment.id, "lesson_id": new_comment.lesson_id, "user_id": current_user.id})
     
     return new_comment
 
 @router.get("/lesson/{lesson_id}", response_model=List[schemas.CommentResponse])
 async def get_lesson_comments(
     lesson_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    access: CourseAccess = Depends(require_course_access)
 ):
     """Получение комментариев к конкретному уроку"""
-    # Проверка существования урока
-    lesson = db.query(models.Lesson).filter(models.Lesson.id == lesson_id).first()
-    if not lesson:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Урок не найден"
-        )
-    
-    # Проверка, записан ли пользователь на курс
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == lesson.course_id
-    ).first()
-    
-    # Если пользователь не записан на курс и не является автором или администратором
-    course = db.query(models.Course).filter(models.Course.id == lesson.course_id).first()
-    if not enrollment and course.author_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Вы не записаны на этот курс"
-        )
-    
     # Получение комментариев
-    comments = db.query(models.Comment).filter(
-        models.Comment.lesson_id == lesson_id
-    ).order_by(models.Comment.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(paginate(
+        select(models.Comment).where(models.Comment.lesson_id == lesson_id),
+        COMMENT_KEYSET, limit, after=after, skip=skip
+    ))
     
-    return comments
+    return page_items(result.scalars(), COMMENT_KEYSET, limit, response)
 
 @router.get("/{comment_id}", response_model=schemas.CommentResponse)
-async def get_comment(
+def get_comment(
     comment_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Получение конкретного комментария"""
     # Получение комментария
@@ -103,27 +78,13 @@ async def get_comment(
             detail="Комментарий не найден"
         )
     
-    # Получение связанного урока и курса
-    lesson = db.query(models.Lesson).filter(models.Lesson.id == comment.lesson_id).first()
-    course = db.query(models.Course).filter(models.Course.id == lesson.course_id).first()
-    
-    # Проверка, записан ли пользователь на курс
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == course.id
-    ).first()
-    
-    # Если пользователь не записан на курс и не является автором или администратором
-    if not enrollment and course.author_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Вы не записаны на этот курс"
-        )
+    # Пользователь записан на курс урока, является его автором или администратором
+    check_course_access(db, current_user, comment.lesson_id)
     
     return comment
 
 @router.put("/{comment_id}", response_model=schemas.CommentResponse)
-async def update_comment(
+def update_comment(
     comment_id: int,
     comment_data: schemas.CommentBase,
     db: Session = Depends(get_db),
@@ -150,11 +111,12 @@ async def update_comment(
     
     db.commit()
     db.refresh(comment)
+    logger.info("Комментарий изменен", extra={"comment_id": comment.id, "user_id": current_user.id})
     
     return comment
 
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_comment(
+def delete_comment(
     comment_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
@@ -180,5 +142,6 @@ async def delete_comment(
     
     db.delete(comment)
     db.commit()
+    logger.info("Комментарий удален", extra={"comment_id": comment_id, "user_id": current_user.id})
     
     return None
@@ -1,16 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models, schemas
-from app.database import get_db
-from app.security import get_current_user, get_current_admin_user
+from app.access import forget_enrollments, forget_lessons
+from app.bulk import insert_lessons, reorder_lessons
+from app.loaders import loader_options
+from app.search import apply_course_search
+from app.pagination import paginate, page_items
+from app.response_cache import catalog_cache
+from app.database import get_db, get_async_db
+from app.upserts import insert_enrollment
+from app.security import get_current_user, get_current_admin_user, get_current_principal, Principal
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
+# Ключ keyset пагинации списка курсов
+COURSE_KEYSET = ((models.Course.id, False),)
+
 @router.post("/", response_model=schemas.CourseResponse)
-async def create_course(
+def create_course(
     course_data: schemas.CourseCreate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -24,37 +39,54 @@ async def create_course(
     
     db.add(new_course)
     db.commit()
+    # Закэшированные ответы каталога больше не актуальны
+    catalog_cache.invalidate()
     db.refresh(new_course)
+    logger.info("Курс создан", extra={"course_id": new_course.id, "user_id": current_user.id})
     
     return new_course
 
 @router.get("/", response_model=List[schemas.CourseResponse])
 async def get_courses(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получение списка всех курсов с возможностью поиска"""
-    query = db.query(models.Course)
+    query = select(models.Course)
     
-    # Применение фильтра поиска, если он указан
+    # Полнотекстовый поиск по префиксам слов, результаты упорядочены по релевантности,
+    # поэтому для поиска доступна только пагинация через skip
     if search:
-        query = query.filter(
-            models.Course.title.ilike(f"%{search}%") | 
-            models.Course.description.ilike(f"%{search}%")
-        )
+        if after:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Курсор пагинации не поддерживается вместе с поиском"
+            )
+        query = apply_course_search(query, search, db)
+        result = await db.execute(query.offset(skip).limit(limit))
+        return result.scalars().all()
     
-    courses = query.offset(skip).limit(limit).all()
-    return courses
+    result = await db.execute(paginate(query, COURSE_KEYSET, limit, after=after, skip=skip))
+    return page_items(result.scalars(), COURSE_KEYSET, limit, response)
 
 @router.get("/{course_id}", response_model=schemas.CourseWithLessons)
 async def get_course(
     course_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получение информации о конкретном курсе и его уроках"""
-    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    # Автор и упорядоченные уроки загружаются сразу (два запроса), без ленивой
+    # загрузки при сериализации; в асинхронной сессии она и вовсе недоступна
+    result = await db.execute(
+        select(models.Course)
+        .options(*loader_options(models.Course, schemas.CourseWithLessons))
+        .where(models.Course.id == course_id)
+    )
+    course = result.scalars().first()
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -64,7 +96,7 @@ async def get_course(
     return course
 
 @router.put("/{course_id}", response_model=schemas.CourseResponse)
-async def update_course(
+def update_course(
     course_id: int,
     course_data: schemas.CourseUpdate,
     current_user: models.User = Depends(get_current_user),
@@ -92,12 +124,14 @@ async def update_course(
         course.description = course_data.description
     
     db.commit()
+    logger.info("Курс изменен", extra={"course_id": course_id, "user_id": current_user.id})
+    catalog_cache.invalidate()
     db.refresh(course)
     
     return course
 
 @router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_course(
+def delete_course(
     course_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -119,11 +153,96 @@ async def delete_course(
     
     db.delete(course)
     db.commit()
+    logger.info("Курс удален", extra={"course_id": course_id, "user_id": current_user.id})
+    catalog_cache.invalidate()
+    forget_lessons()
     
     return None
 
+@router.post("/{course_id}/lessons:bulk", response_model=List[schemas.LessonResponse])
+def create_lessons_bulk(
+    course_id: int,
+    lessons_data: schemas.LessonBulkCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Добавление нескольких уроков к курсу одной транзакцией"""
+    course = db.get(models.Course, course_id)
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Курс не найден"
+        )
+    
+    # Проверка прав доступа (автор курса или администратор)
+    if course.author_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для добавления уроков к этому курсу"
+        )
+    
+    # Один INSERT для всех уроков вместо запроса и коммита на каждый урок
+    lessons = insert_lessons(db, course_id, [lesson.model_dump() for lesson in lessons_data.lessons])
+    result = [schemas.LessonResponse.model_validate(lesson, from_attributes=True) for lesson in lessons]
+    db.commit()
+    logger.info("Уроки добавлены к курсу", extra={"course_id": course_id, "lessons": len(result), "user_id": current_user.id})
+    catalog_cache.invalidate()
+    
+    return result
+
+@router.patch("/{course_id}/lessons/order", response_model=List[schemas.LessonResponse])
+def reorder_course_lessons(
+    course_id: int,
+    order_data: schemas.LessonOrderUpdate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Изменение порядка всех уроков курса одним запросом"""
+    course = db.get(models.Course, course_id)
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Курс не найден"
+        )
+    
+    # Проверка прав доступа (автор курса или администратор)
+    if course.author_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для изменения уроков этого курса"
+        )
+    
+    # Нужны все уроки курса, каждый ровно один раз. Список берется из lessons, а
+    # не из счетчика course_stats: денормализованный счетчик может разойтись
+    lesson_ids = order_data.lesson_ids
+    course_lesson_ids = set(db.scalars(
+        select(models.Lesson.id).where(models.Lesson.course_id == course_id)
+    ))
+    if len(set(lesson_ids)) != len(lesson_ids) or set(lesson_ids) != course_lesson_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Нужно передать все уроки курса, каждый один раз"
+        )
+    
+    if reorder_lessons(db, course_id, lesson_ids) != len(lesson_ids):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Уроки не принадлежат этому курсу"
+        )
+    db.commit()
+    logger.info("Порядок уроков изменен", extra={"course_id": course_id, "lessons": len(lesson_ids), "user_id": current_user.id})
+    catalog_cache.invalidate()
+    
+    lessons = db.scalars(
+        select(models.Lesson)
+        .where(models.Lesson.course_id == course_id)
+        .order_by(models.Lesson.order, models.Lesson.id)
+    ).all()
+    return lessons
+
 @router.post("/enroll/{course_id}", response_model=schemas.EnrollmentResponse)
-async def enroll_in_course(
+def enroll_in_course(
     course_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -137,33 +256,24 @@ async def enroll_in_course(
             detail="Курс не найден"
         )
     
-    # Проверка, не записан ли пользователь уже на этот курс
-    existing_enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == course_id
-    ).first()
-    
-    if existing_enrollment:
+    # Запись одним запросом (INSERT ... ON CONFLICT DO NOTHING); повторная запись
+    # не вставляет строку и не возвращает ее
+    enrollment = insert_enrollment(db, current_user.id, course_id)
+    if enrollment is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Вы уже записаны на этот курс"
         )
-    
-    # Создание новой записи
-    enrollment = models.Enrollment(
-        user_id=current_user.id,
-        course_id=course_id
-    )
-    
-    db.add(enrollment)
+    result = schemas.EnrollmentResponse.model_validate(enrollment, from_attributes=True)
     db.commit()
-    db.refresh(enrollment)
+    logger.info("Запись на курс", extra={"course_id": course_id, "user_id": current_user.id})
+    forget_enrollments(current_user.id)
     
-    return enrollment
+    return result
 
 @router.get("/enrolled/my", response_model=List[schemas.CourseResponse])
-async def get_enrolled_courses(
-    current_user: models.User = Depends(get_current_user),
+def get_enrolled_courses(
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Получение списка курсов, на которые записан текущий пользователь"""
@@ -183,7 +293,7 @@ async def get_enrolled_courses(
     return courses
 
 @router.get("/{course_id}/students", response_model=List[schemas.UserResponse])
-async def get_course_students(
+def get_course_students(
     course_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
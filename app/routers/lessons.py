@@ -1,16 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
-from sqlalchemy import func
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models, schemas
-from app.database import get_db
+from app.access import CourseAccess, forget_lesson, require_course_access
+from app.database import get_db, get_async_db
+from app.pagination import paginate, page_items, split_page
+from app.response_cache import catalog_cache
+from app.routers.comments import COMMENT_KEYSET
 from app.security import get_current_user, get_current_admin_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/lessons", tags=["Lessons"])
 
+# Ключ keyset пагинации: порядковый номер урока, затем id
+LESSON_KEYSET = ((models.Lesson.order, False), (models.Lesson.id, False))
+
+# Сколько последних комментариев встраивается в ответ урока (по умолчанию и максимум)
+LESSON_COMMENTS_EMBED_LIMIT = int(os.getenv("LESSON_COMMENTS_EMBED_LIMIT", "20"))
+LESSON_COMMENTS_EMBED_MAX = 100
+
 @router.post("/", response_model=schemas.LessonResponse)
-async def create_lesson(
+def create_lesson(
     lesson_data: schemas.LessonCreate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -42,15 +59,20 @@ async def create_lesson(
     
     db.add(new_lesson)
     db.commit()
+    # Закэшированные ответы каталога больше не актуальны
+    catalog_cache.invalidate()
     db.refresh(new_lesson)
+    logger.info("Урок создан", extra={"lesson_id": new_lesson.id, "course_id": new_lesson.course_id, "user_id": current_user.id})
     
     return new_lesson
 
 @router.get("/", response_model=List[schemas.LessonResponse])
-async def get_lessons(
+def get_lessons(
+    response: Response,
     course_id: int = None,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Получение списка уроков с возможностью фильтрации по курсу"""
@@ -61,53 +83,50 @@ async def get_lessons(
         query = query.filter(models.Lesson.course_id == course_id)
     
     # Сортировка по порядковому номеру
-    query = query.order_by(models.Lesson.order)
-    
-    lessons = query.offset(skip).limit(limit).all()
-    return lessons
+    lessons = paginate(query, LESSON_KEYSET, limit, after=after, skip=skip).all()
+    return page_items(lessons, LESSON_KEYSET, limit, response)
 
 @router.get("/{lesson_id}", response_model=schemas.LessonWithCommentsRatings)
 async def get_lesson(
     lesson_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    comments_limit: int = Query(LESSON_COMMENTS_EMBED_LIMIT, ge=0, le=LESSON_COMMENTS_EMBED_MAX),
+    access: CourseAccess = Depends(require_course_access),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Получение информации о конкретном уроке, его комментариях и рейтинге"""
-    # Получение урока
-    lesson = db.query(models.Lesson).filter(models.Lesson.id == lesson_id).first()
+    """Получение информации о конкретном уроке, его последних комментариях и рейтинге"""
+    # Доступ уже проверен зависимостью (слушатель, автор курса или администратор)
+    lesson = await db.get(models.Lesson, lesson_id)
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Урок не найден"
         )
     
-    # Проверка, записан ли пользователь на курс
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == lesson.course_id
-    ).first()
-    
-    # Если пользователь не записан на курс и не является автором или администратором
-    course = db.query(models.Course).filter(models.Course.id == lesson.course_id).first()
-    if not enrollment and course.author_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Вы не записаны на этот курс"
-        )
-    
-    # Получение среднего рейтинга
-    avg_rating = db.query(func.avg(models.Rating.stars)).filter(
-        models.Rating.lesson_id == lesson_id
-    ).scalar()
-    
-    # Добавление среднего рейтинга к результату
-    lesson_data = schemas.LessonWithCommentsRatings.from_orm(lesson)
-    lesson_data.average_rating = round(float(avg_rating), 1) if avg_rating else None
+    # Первые comments_limit новых комментариев и курсор на продолжение в /comments/lesson/{id}
+    comments, comments_next_cursor = [], None
+    if comments_limit:
+        result = await db.execute(paginate(
+            select(models.Comment).where(models.Comment.lesson_id == lesson_id),
+            COMMENT_KEYSET, comments_limit
+        ))
+        comments, comments_next_cursor = split_page(result.scalars(), COMMENT_KEYSET, comments_limit)
+    
+    # Количество комментариев и средний рейтинг из счетчиков урока
+    stats = await db.get(models.LessonStats, lesson_id)
+    avg_rating = stats.average_rating if stats else None
+    
+    lesson_data = schemas.LessonWithCommentsRatings(
+        **schemas.LessonResponse.model_validate(lesson, from_attributes=True).model_dump(),
+        comments=[schemas.CommentResponse.model_validate(comment, from_attributes=True) for comment in comments],
+        comments_count=stats.comment_count if stats else 0,
+        comments_next_cursor=comments_next_cursor,
+        average_rating=round(float(avg_rating), 1) if avg_rating else None
+    )
     
     return lesson_data
 
 @router.put("/{lesson_id}", response_model=schemas.LessonResponse)
-async def update_lesson(
+def update_lesson(
     lesson_id: int,
     lesson_data: schemas.LessonUpdate,
     current_user: models.User = Depends(get_current_user),
@@ -143,12 +162,14 @@ async def update_lesson(
         lesson.order = lesson_data.order
     
     db.commit()
+    logger.info("Урок изменен", extra={"lesson_id": lesson_id, "user_id": current_user.id})
+    catalog_cache.invalidate()
     db.refresh(lesson)
     
     return lesson
 
 @router.delete("/{lesson_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_lesson(
+def delete_lesson(
     lesson_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -174,5 +195,8 @@ async def delete_lesson(
     
     db.delete(lesson)
     db.commit()
+    logger.info("Урок удален", extra={"lesson_id": lesson_id, "user_id": current_user.id})
+    catalog_cache.invalidate()
+    forget_lesson(lesson_id)
     
     return None
@@ -1,106 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
-from typing import List
-from sqlalchemy import func
+from typing import List, Optional
 
 from app import models, schemas
 from app.database import get_db
-from app.security import get_current_user, get_current_admin_user
+from app.access import check_course_access, get_lesson_access
+from app.pagination import paginate, page_items
+from app.upserts import upsert_rating
+from app.security import get_current_user, get_current_admin_user, get_current_principal, Principal
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ratings", tags=["Ratings"])
 
+# Ключ keyset пагинации списков оценок
+RATING_KEYSET = ((models.Rating.id, False),)
+
 @router.post("/", response_model=schemas.RatingResponse)
-async def create_or_update_rating(
+def create_or_update_rating(
     rating_data: schemas.RatingCreate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Создание или обновление оценки для урока"""
-    # Проверка существования урока
-    lesson = db.query(models.Lesson).filter(models.Lesson.id == rating_data.lesson_id).first()
-    if not lesson:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Урок не найден"
-        )
-    
-    # Проверка, записан ли пользователь на курс
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == lesson.course_id
-    ).first()
-    
-    if not enrollment:
+    # Оценивать урок могут только слушатели курса
+    access = get_lesson_access(db, current_user, rating_data.lesson_id)
+    if not access.enrolled:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Вы не записаны на этот курс"
         )
     
-    # Проверка, существует ли уже оценка от этого пользователя
-    existing_rating = db.query(models.Rating).filter(
-        models.Rating.user_id == current_user.id,
-        models.Rating.lesson_id == rating_data.lesson_id
-    ).first()
+    # Создание или изменение оценки одним запросом (INSERT ... ON CONFLICT DO UPDATE)
+    rating = upsert_rating(db, current_user.id, rating_data.lesson_id, rating_data.stars)
+    result = schemas.RatingResponse.model_validate(rating, from_attributes=True)
+    db.commit()
+    logger.info("Оценка сохранена", extra={"lesson_id": rating_data.lesson_id, "user_id": current_user.id})
     
-    if existing_rating:
-        # Обновление существующей оценки
-        existing_rating.stars = rating_data.stars
-        db.commit()
-        db.refresh(existing_rating)
-        return existing_rating
-    else:
-        # Создание новой оценки
-        new_rating = models.Rating(
-            user_id=current_user.id,
-            lesson_id=rating_data.lesson_id,
-            stars=rating_data.stars
-        )
-        
-        db.add(new_rating)
-        db.commit()
-        db.refresh(new_rating)
-        
-        return new_rating
+    return result
 
 @router.get("/lesson/{lesson_id}", response_model=List[schemas.RatingResponse])
-async def get_lesson_ratings(
+def get_lesson_ratings(
     lesson_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Получение всех оценок для урока"""
-    # Проверка существования урока
-    lesson = db.query(models.Lesson).filter(models.Lesson.id == lesson_id).first()
-    if not lesson:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Урок не найден"
-        )
-    
-    # Проверка, записан ли пользователь на курс или является ли автором/админом
-    course = db.query(models.Course).filter(models.Course.id == lesson.course_id).first()
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.user_id == current_user.id,
-        models.Enrollment.course_id == lesson.course_id
-    ).first()
-    
-    if not enrollment and course.author_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Вы не записаны на этот курс"
-        )
+    # Урок существует, и пользователь записан на курс, является его автором или администратором
+    check_course_access(db, current_user, lesson_id)
     
     # Получение всех оценок
-    ratings = db.query(models.Rating).filter(
-        models.Rating.lesson_id == lesson_id
-    ).offset(skip).limit(limit).all()
+    ratings = paginate(
+        db.query(models.Rating).filter(models.Rating.lesson_id == lesson_id),
+        RATING_KEYSET, limit, after=after, skip=skip
+    ).all()
     
-    return ratings
+    return page_items(ratings, RATING_KEYSET, limit, response)
 
 @router.get("/lesson/{lesson_id}/average", response_model=float)
-async def get_lesson_average_rating(
+def get_lesson_average_rating(
     lesson_id: int,
     db: Session = Depends(get_db)
 ):
@@ -113,10 +77,9 @@ async def get_lesson_average_rating(
             detail="Урок не найден"
         )
     
-    # Вычисление среднего рейтинга
-    avg_rating = db.query(func.avg(models.Rating.stars)).filter(
-        models.Rating.lesson_id == lesson_id
-    ).scalar()
+    # Средний рейтинг из счетчиков урока
+    stats = db.get(models.LessonStats, lesson_id)
+    avg_rating = stats.average_rating if stats else None
     
     if avg_rating is None:
         return 0.0
@@ -124,21 +87,24 @@ async def get_lesson_average_rating(
     return round(float(avg_rating), 1)
 
 @router.get("/my", response_model=List[schemas.RatingResponse])
-async def get_my_ratings(
+def get_my_ratings(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Получение всех оценок текущего пользователя"""
-    ratings = db.query(models.Rating).filter(
-        models.Rating.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    ratings = paginate(
+        db.query(models.Rating).filter(models.Rating.user_id == current_user.id),
+        RATING_KEYSET, limit, after=after, skip=skip
+    ).all()
     
-    return ratings
+    return page_items(ratings, RATING_KEYSET, limit, response)
 
 @router.delete("/{rating_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_rating(
+def delete_rating(
     rating_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
@@ -161,5 +127,6 @@ async def delete_rating(
     
     db.delete(rating)
     db.commit()
+    logger.info("Оценка удалена", extra={"rating_id": rating_id, "user_id": current_user.id})
     
     return None
@@ -1,20 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import models, schemas
 from app.database import get_db
-from app.security import get_current_user, get_current_admin_user, get_password_hash
+from app.pagination import paginate, page_items
+from app.response_cache import catalog_cache
+from app.security import (
+    get_current_user, get_current_admin_user, get_password_hash,
+    invalidate_principal, bump_token_version, remember_token_version
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+# Ключ keyset пагинации списка пользователей
+USER_KEYSET = ((models.User.id, False),)
+
 @router.get("/me", response_model=schemas.UserResponse)
-async def read_current_user(current_user: models.User = Depends(get_current_user)):
+def read_current_user(current_user: models.User = Depends(get_current_user)):
     """Получение информации о текущем пользователе"""
     return current_user
 
 @router.put("/me", response_model=schemas.UserResponse)
-async def update_current_user(
+def update_current_user(
     user_data: schemas.UserUpdate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -22,6 +34,7 @@ async def update_current_user(
     """Обновление данных текущего пользователя"""
     # Получаем пользователя из базы данных
     db_user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    old_email = db_user.email
     
     # Обновляем данные, если они предоставлены
     if user_data.full_name:
@@ -39,24 +52,36 @@ async def update_current_user(
     if user_data.password:
         db_user.hashed_password = get_password_hash(user_data.password)
     
+    # Смена email или пароля делает claims ранее выданных токенов устаревшими
+    if db_user.email != old_email or user_data.password:
+        bump_token_version(db_user)
+    
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_user)
+    logger.info("Профиль пользователя изменен", extra={"user_id": db_user.id})
+    
+    # Закэшированные данные пользователя больше не актуальны
+    invalidate_principal(old_email, db_user.email)
+    remember_token_version(db_user)
     
     return db_user
 
 @router.get("/", response_model=List[schemas.UserResponse])
-async def get_all_users(
+def get_all_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
     current_user: models.User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Получение списка всех пользователей (только для администраторов)"""
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    users = paginate(db.query(models.User), USER_KEYSET, limit, after=after, skip=skip).all()
+    return page_items(users, USER_KEYSET, limit, response)
 
 @router.get("/{user_id}", response_model=schemas.UserResponse)
-async def get_user(
+def get_user(
     user_id: int,
     current_user: models.User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -71,7 +96,7 @@ async def get_user(
     return user
 
 @router.put("/{user_id}", response_model=schemas.UserResponse)
-async def update_user(
+def update_user(
     user_id: int,
     user_data: schemas.UserUpdate,
     current_user: models.User = Depends(get_current_admin_user),
@@ -84,6 +109,7 @@ async def update_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Пользователь не найден"
         )
+    old_email = db_user.email
     
     # Обновляем данные, если они предоставлены
     if user_data.full_name:
@@ -101,7 +127,17 @@ async def update_user(
     if user_data.password:
         db_user.hashed_password = get_password_hash(user_data.password)
     
+    # Смена email или пароля делает claims ранее выданных токенов устаревшими
+    if db_user.email != old_email or user_data.password:
+        bump_token_version(db_user)
+    
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_user)
+    logger.info("Пользователь изменен администратором", extra={"user_id": db_user.id, "admin_id": current_user.id})
+    
+    # Закэшированные данные пользователя больше не актуальны
+    invalidate_principal(old_email, db_user.email)
+    remember_token_version(db_user)
     
     return db_user
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from pydantic import BaseModel, EmailStr, Field, validator
 
@@ -33,6 +33,9 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
     id: Optional[int] = None
+    is_admin: Optional[bool] = None
+    is_active: Optional[bool] = None
+    token_version: Optional[int] = None
 
 
 # Базовые схемы курса
@@ -63,6 +66,11 @@ class LessonBase(BaseModel):
     content: str
     order: Optional[int] = 0
 
+    @validator('order', always=True)
+    def default_order(cls, v):
+        # Порядок урока входит в ключ пагинации и не может быть NULL
+        return 0 if v is None else v
+
 class LessonCreate(LessonBase):
     course_id: int
 
@@ -79,6 +87,13 @@ class LessonResponse(LessonBase):
     class Config:
         orm_mode = True
 
+class LessonBulkCreate(BaseModel):
+    lessons: List[LessonBase] = Field(..., min_length=1, max_length=1000)
+
+class LessonOrderUpdate(BaseModel):
+    # Все уроки курса в новом порядке; order получает значения 1, 2, ...
+    lesson_ids: List[int] = Field(..., min_length=1)
+
 
 # Схемы для регистрации на курс
 class EnrollmentCreate(BaseModel):
@@ -135,7 +150,10 @@ class RatingResponse(RatingBase):
 
 # Расширенные схемы для отображения связанных данных
 class LessonWithCommentsRatings(LessonResponse):
+    # Только первые (новые) комментарии; остальные — GET /comments/lesson/{id}?after=comments_next_cursor
     comments: List[CommentResponse] = []
+    comments_count: int = 0
+    comments_next_cursor: Optional[str] = None
     average_rating: Optional[float] = None
 
     class Config:
@@ -155,11 +173,28 @@ class CourseStats(BaseModel):
     title: str
     total_students: int
     total_lessons: int
+    total_comments: int = 0
+    total_ratings: int = 0
     average_rating: Optional[float] = None
 
+class DashboardStats(BaseModel):
+    users_count: int
+    courses_count: int
+    lessons_count: int
+    enrollments_count: int
+    recent_users: List[Dict[str, Any]]
+    popular_courses: List[Dict[str, Any]]
+    computed_at: datetime
+
 class UserStats(BaseModel):
     user_id: int
     full_name: str
     total_courses_enrolled: int
     total_comments: int
     total_ratings: int
+    activity_count: int = 0
+
+class LookupItem(BaseModel):
+    # Вариант выпадающего списка админки (см. app.lookup)
+    id: int
+    label: str
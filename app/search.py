@@ -0,0 +1,136 @@
+"""Полнотекстовый поиск курсов.
+
+SQLite: внешняя FTS5 таблица ``courses_fts`` поверх ``courses``, которую
+синхронизируют триггеры на вставку, изменение и удаление курса.
+PostgreSQL: вычисляемая колонка ``search_vector`` (tsvector) с GIN индексом.
+
+Каждое слово запроса ищется по префиксу (поиск "на лету" по мере ввода,
+для коротких префиксов в FTS5 есть отдельные индексы),
+результаты упорядочены по релевантности: совпадение в названии весит больше,
+чем в описании. Для остальных СУБД используется поиск через ILIKE.
+"""
+import re
+
+from sqlalchemy import event, false, func, literal_column, or_, table, column
+from sqlalchemy.schema import DDL
+
+from app import models
+
+# Вес совпадения в названии относительно описания
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(
+        title, description,
+        content='courses', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_ai AFTER INSERT ON courses BEGIN
+        INSERT INTO courses_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_ad AFTER DELETE ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_au AFTER UPDATE OF title, description ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO courses_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    # Функция ранжирования для скрытой колонки rank (хранится в конфигурации таблицы)
+    f"INSERT INTO courses_fts(courses_fts, rank) VALUES ('rank', 'bm25({TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})')",
+    # Индексация курсов, созданных до появления таблицы
+    "INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')",
+)
+
+POSTGRESQL_DDL = (
+    """
+    ALTER TABLE courses ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_courses_search_vector ON courses USING gin (search_vector)",
+)
+
+# Триггеры удаляются вместе с таблицей courses, виртуальная таблица — нет
+SQLITE_DROP_DDL = ("DROP TABLE IF EXISTS courses_fts",)
+
+
+def _listen(ddl_statements, dialect, event_name):
+    for statement in ddl_statements:
+        event.listen(models.Course.__table__, event_name, DDL(statement).execute_if(dialect=dialect))
+
+
+_listen(SQLITE_DDL, "sqlite", "after_create")
+_listen(SQLITE_DROP_DDL, "sqlite", "before_drop")
+_listen(POSTGRESQL_DDL, "postgresql", "after_create")
+
+courses_fts = table("courses_fts", column("rowid"), column("rank"))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(search: str):
+    """Слова поискового запроса без операторов и спецсимволов"""
+    return _WORD_RE.findall(search.lower())
+
+
+def fts5_query(terms) -> str:
+    """Запрос FTS5: все слова должны встретиться, каждое — по префиксу"""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def tsquery(terms) -> str:
+    """Запрос to_tsquery: все слова по префиксу"""
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def _dialect_name(db) -> str:
+    return db.get_bind().dialect.name
+
+
+def apply_course_search(query, search: str, db):
+    """Фильтрация и сортировка по релевантности запроса ``select(Course)``"""
+    terms = search_terms(search)
+    if not terms:
+        return query.where(false())
+
+    dialect = _dialect_name(db)
+    if dialect == "sqlite":
+        return (
+            query.join(courses_fts, courses_fts.c.rowid == models.Course.id)
+            .where(literal_column("courses_fts").op("MATCH")(fts5_query(terms)))
+            .order_by(courses_fts.c.rank, models.Course.id)
+        )
+    if dialect == "postgresql":
+        vector = literal_column("courses.search_vector")
+        ts_query = func.to_tsquery("simple", tsquery(terms))
+        return (
+            query.where(vector.op("@@")(ts_query))
+            .order_by(func.ts_rank(vector, ts_query).desc(), models.Course.id)
+        )
+    return apply_course_ilike(query, search)
+
+
+def apply_course_ilike(query, search: str):
+    """Поиск подстроки через ILIKE (полный просмотр таблицы)"""
+    return query.where(
+        or_(
+            models.Course.title.ilike(f"%{search}%"),
+            models.Course.description.ilike(f"%{search}%"),
+        )
+    )
@@ -1,15 +1,23 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
+import logging
 import os
+import time
 
 from app import models, schemas
+from app.cache import TTLCache
 from app.database import get_db
+from app.passwords import (
+    pwd_context, verify_password, get_password_hash, verify_and_update_password,
+    verify_password_async, get_password_hash_async, verify_and_update_password_async
+)
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -19,19 +27,65 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Настройка хеширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Кэш пользователей, аутентифицированных по токену (0 — кэш выключен)
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
 
 # Настройка авторизации по токену
 security_scheme = HTTPBearer()
 
-def verify_password(plain_password, hashed_password):
-    """Проверка пароля"""
-    return pwd_context.verify(plain_password, hashed_password)
+logger = logging.getLogger(__name__)
 
-def get_password_hash(password):
-    """Хеширование пароля"""
-    return pwd_context.hash(password)
+
+@dataclass(frozen=True)
+class Principal:
+    """Снимок пользователя, от имени которого выполняется запрос.
+
+    Может быть построен как из строки БД, так и из claims токена
+    (тогда full_name неизвестен).
+    """
+    id: int
+    email: str
+    is_active: bool
+    is_admin: bool
+    token_version: int = 0
+    full_name: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=user.is_active,
+            is_admin=user.is_admin,
+            token_version=user.token_version or 0,
+        )
+
+
+# Ключ — subject токена (email), значение — Principal
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS, name="principal")
+
+# Ключ — id пользователя, значение — актуальная версия токенов из БД
+token_version_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS, name="token_version")
+
+
+def invalidate_principal(*emails: str):
+    """Сброс закэшированных данных пользователя (после изменения профиля или прав)"""
+    for email in emails:
+        if email:
+            principal_cache.pop(email)
+
+
+def bump_token_version(user: models.User):
+    """Увеличение версии токенов пользователя: выданные ранее токены
+    перестают авторизоваться по claims и перепроверяются по БД"""
+    user.token_version = (user.token_version or 0) + 1
+
+
+def remember_token_version(user: models.User):
+    """Запоминание актуальной версии токенов после сохранения пользователя"""
+    token_version_cache.set(user.id, user.token_version or 0)
 
 def get_user(db: Session, email: str):
     """Получение пользователя по email"""
@@ -41,9 +95,38 @@ def authenticate_user(db: Session, email: str, password: str):
     """Аутентификация пользователя"""
     user = get_user(db, email)
     if not user:
+        logger.warning("Неудачная попытка входа", extra={"email": email})
+        return False
+    verified, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not verified:
+        logger.warning("Неудачная попытка входа", extra={"email": email})
+        return False
+    if new_hash:
+        _rehash_password(db, user, new_hash)
+    return user
+
+def _rehash_password(db: Session, user: models.User, new_hash: str):
+    """Сохранение хеша, пересчитанного по текущей политике хеширования.
+
+    Пароль не меняется, поэтому версия токенов не увеличивается.
+    """
+    user.hashed_password = new_hash
+    db.commit()
+    db.refresh(user)
+    logger.info("Хеш пароля пересчитан по текущей политике", extra={"user_id": user.id})
+
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """Аутентификация пользователя: запрос к БД в пуле потоков, проверка пароля в пуле хеширования"""
+    user = await run_in_threadpool(get_user, db, email)
+    if not user:
+        logger.warning("Неудачная попытка входа", extra={"email": email})
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not verified:
+        logger.warning("Неудачная попытка входа", extra={"email": email})
         return False
+    if new_hash:
+        await run_in_threadpool(_rehash_password, db, user, new_hash)
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -57,26 +140,124 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(credentials = Depends(security_scheme), db: Session = Depends(get_db)):
-    """Получение текущего пользователя по токену"""
-    credentials_exception = HTTPException(
+def create_user_access_token(user: models.User, expires_delta: Optional[timedelta] = None):
+    """Создание токена доступа с id, ролью, статусом и версией токенов пользователя"""
+    return create_access_token(
+        data={
+            "sub": user.email,
+            "uid": user.id,
+            "adm": bool(user.is_admin),
+            "act": bool(user.is_active),
+            "ver": user.token_version or 0,
+        },
+        expires_delta=expires_delta,
+    )
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str):
+    """Проверка подписи токена и извлечение claims"""
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
+            logger.info("Токен без subject")
+            raise _credentials_exception()
+        token_data = schemas.TokenData(
+            email=email,
+            id=payload.get("uid"),
+            is_admin=payload.get("adm"),
+            is_active=payload.get("act"),
+            token_version=payload.get("ver"),
+        )
+    except JWTError as e:
+        logger.info("Недействительный токен", extra={"error": type(e).__name__})
+        raise _credentials_exception()
+    return token_data, payload
+
+def _token_version(token_data: schemas.TokenData) -> int:
+    """Версия токенов из claims.
+
+    Токены без ``ver`` выданы до появления версий, когда у всех пользователей
+    была версия 0. Они принимаются как версия 0: первая же смена пароля или
+    email их отзывает, а остальные истекают сами через ACCESS_TOKEN_EXPIRE_MINUTES.
+    """
+    return token_data.token_version if token_data.token_version is not None else 0
+
+def _check_token_version(token_data: schemas.TokenData, current_version: int):
+    """Отказ, если токен выдан до смены пароля или email (версия старше текущей)"""
+    if _token_version(token_data) < current_version:
+        logger.info("Отозванный токен", extra={"email": token_data.email})
+        raise _credentials_exception()
+
+def _load_principal(db: Session, token_data: schemas.TokenData, payload: dict):
+    """Получение пользователя из кэша или БД по subject токена"""
+    principal = principal_cache.get(token_data.email)
+    # Токен новее закэшированной версии: запись устарела, пользователь читается из БД
+    if principal is not None and principal.token_version >= _token_version(token_data):
+        # Версия могла увеличиться после того, как пользователь попал в кэш
+        known_version = token_version_cache.get(principal.id)
+        _check_token_version(token_data, max(principal.token_version, known_version or 0))
+        return principal
+
     user = get_user(db, email=token_data.email)
     if user is None:
-        raise credentials_exception
-    return user
+        logger.info("Пользователь токена не найден", extra={"email": token_data.email})
+        raise _credentials_exception()
+
+    # Запись живет не дольше, чем сам токен
+    principal = Principal.from_user(user)
+    _check_token_version(token_data, principal.token_version)
+    ttl = payload["exp"] - time.time() if "exp" in payload else PRINCIPAL_CACHE_TTL_SECONDS
+    principal_cache.set(token_data.email, principal, ttl=ttl)
+    token_version_cache.set(user.id, principal.token_version, ttl=ttl)
+    return principal
+
+def get_current_user(credentials = Depends(security_scheme), db: Session = Depends(get_db)):
+    """Получение текущего пользователя по токену"""
+    token_data, payload = decode_token(credentials.credentials)
+    return _load_principal(db, token_data, payload)
+
+def get_current_principal(credentials = Depends(security_scheme), db: Session = Depends(get_db)):
+    """Авторизация по claims токена без загрузки пользователя.
+
+    Подходит для эндпоинтов, которым нужны только id и роль. К БД обращается,
+    только если версия токенов пользователя неизвестна процессу (запрос по
+    первичному ключу) или токен новее известной версии (полная проверка как в
+    get_current_user). Токен старше текущей версии отклоняется.
+    """
+    token_data, payload = decode_token(credentials.credentials)
+    if token_data.id is None or token_data.token_version is None:
+        # Токен старого формата без claims
+        return _load_principal(db, token_data, payload)
+
+    current_version = token_version_cache.get(token_data.id)
+    if current_version is None:
+        current_version = db.query(models.User.token_version).filter(
+            models.User.id == token_data.id
+        ).scalar()
+        if current_version is None:
+            logger.info("Пользователь токена не найден", extra={"user_id": token_data.id})
+            raise _credentials_exception()
+        token_version_cache.set(token_data.id, current_version)
+
+    _check_token_version(token_data, current_version)
+    if current_version != token_data.token_version:
+        # Токен новее известной процессу версии: проверка по БД
+        return _load_principal(db, token_data, payload)
+
+    return Principal(
+        id=token_data.id,
+        email=token_data.email,
+        is_active=bool(token_data.is_active),
+        is_admin=bool(token_data.is_admin),
+        token_version=token_data.token_version,
+    )
 
 def get_current_active_user(current_user: schemas.UserResponse = Depends(get_current_user)):
     """Проверка активности пользователя"""
@@ -87,6 +268,7 @@ def get_current_active_user(current_user: schemas.UserResponse = Depends(get_cur
 def get_current_admin_user(current_user: schemas.UserResponse = Depends(get_current_user)):
     """Проверка на права администратора"""
     if not current_user.is_admin:
+        logger.warning("Доступ к административному API без прав администратора", extra={"user_id": current_user.id})
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
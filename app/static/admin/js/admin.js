@@ -11,6 +11,9 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Добавляем токен к каждому запросу
         setupTokenInterceptor();
+        
+        // Выпадающие списки с поиском
+        setupLookupSelects();
     }
     
     // Настройка кнопки выхода
@@ -156,3 +159,72 @@ function filterTable(tableId, searchInputId, columnIndex) {
         }
     });
 }
+
+// Выпадающие списки с подсказками: <select data-lookup="users|courses|lessons">
+// получает поле поиска, варианты загружаются с /api/admin/lookup/<вид> по мере ввода
+const LOOKUP_LIMIT = 20;
+
+function setupLookupSelects() {
+    document.querySelectorAll('select[data-lookup]').forEach(attachLookup);
+}
+
+async function fetchLookup(kind, params) {
+    const query = new URLSearchParams({ limit: LOOKUP_LIMIT, ...params });
+    const response = await fetch(`/api/admin/lookup/${kind}?${query}`);
+    return response.ok ? response.json() : [];
+}
+
+// Замена вариантов списка; пустой вариант и выбранное значение сохраняются
+function fillLookupOptions(select, items) {
+    const selected = select.value;
+    const keep = Array.from(select.options).filter(option => option.value === '' || option.value === selected);
+    select.innerHTML = '';
+    keep.forEach(option => select.appendChild(option));
+    items.forEach(item => {
+        if (String(item.id) !== selected) {
+            select.appendChild(new Option(item.label, item.id));
+        }
+    });
+}
+
+function attachLookup(select) {
+    const input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'form-control lookup-input';
+    input.placeholder = 'Qidirish...';
+    select.parentNode.insertBefore(input, select);
+    
+    let timer = null;
+    let lastQuery = null;
+    const load = async () => {
+        const q = input.value.trim();
+        if (q === lastQuery) {
+            return;
+        }
+        lastQuery = q;
+        const items = await fetchLookup(select.dataset.lookup, { q });
+        // Применяем только ответ на последний ввод
+        if (q === lastQuery) {
+            fillLookupOptions(select, items);
+        }
+    };
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(load, 250);
+    });
+    
+    if (select.dataset.selected) {
+        setLookupValue(select, select.dataset.selected);
+    }
+    load();
+}
+
+// Выбор значения по id: вариант, которого нет среди подсказок, загружается отдельно
+async function setLookupValue(select, id) {
+    const value = String(id);
+    if (!Array.from(select.options).some(option => option.value === value)) {
+        const items = await fetchLookup(select.dataset.lookup, { id: value });
+        items.forEach(item => select.appendChild(new Option(item.label, item.id)));
+    }
+    select.value = value;
+}
@@ -73,7 +73,7 @@ async function editCourse(courseId) {
             // Заполняем форму данными курса
             document.getElementById('title').value = courseData.title;
             document.getElementById('description').value = courseData.description;
-            document.getElementById('author').value = courseData.author_id;
+            await setLookupValue(document.getElementById('author'), courseData.author_id);
             
             // Модифицируем форму для обновления курса
             const courseForm = document.getElementById('courseForm');
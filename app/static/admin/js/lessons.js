@@ -92,7 +92,7 @@ async function editLesson(lessonId) {
             
             // Заполняем форму данными урока
             document.getElementById('title').value = lessonData.title;
-            document.getElementById('course').value = lessonData.course_id;
+            await setLookupValue(document.getElementById('course'), lessonData.course_id);
             document.getElementById('videoUrl').value = lessonData.video_url;
             document.getElementById('content').value = lessonData.content;
             document.getElementById('order').value = lessonData.order;
@@ -0,0 +1,192 @@
+"""Статистика для администраторов: курсы, пользователи, активность.
+
+Каждый отчет — один SQL запрос, в котором все метрики посчитаны базой данных:
+счетчики курсов берутся из ``course_stats``, счетчики пользователей
+предварительно агрегируются отдельно по каждой таблице (записи, комментарии,
+оценки) и присоединяются по ``user_id``. Так строки разных таблиц не
+перемножаются между собой, как при соединении comments × ratings с одним
+``GROUP BY``.
+
+Сортировка (``sort=-total_students,title``) и фильтры по минимальным значениям
+метрик применяются в том же запросе. Полный результат можно выгрузить в NDJSON
+или CSV: строки читаются из курсора порциями и сразу отправляются клиенту, не
+собираясь в список в памяти. Выгрузка читает строки в собственной сессии,
+которая закрывается по окончании ответа: сессия запроса (``get_db``) в
+некоторых версиях FastAPI закрывается до отправки тела.
+"""
+import csv
+import enum
+import io
+import json
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Float, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+# Количество строк, читаемых из курсора и отправляемых клиенту за раз
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, enum.Enum):
+    json = "json"
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+def _user_counts(key_column):
+    """Количество строк на пользователя в одной таблице (агрегация до соединения)"""
+    return (
+        select(key_column.label("user_id"), func.count().label("total"))
+        .group_by(key_column)
+        .subquery()
+    )
+
+
+def course_stats_query():
+    """Отчет по курсам: слушатели, уроки, комментарии и средний рейтинг"""
+    course_stats = models.CourseStats
+    average_rating = case(
+        (course_stats.rating_count > 0,
+         func.round(course_stats.rating_sum * 1.0 / course_stats.rating_count, 1)),
+        else_=None,
+    )
+    return (
+        select(
+            models.Course.id.label("course_id"),
+            models.Course.title,
+            func.coalesce(course_stats.enrollment_count, 0).label("total_students"),
+            func.coalesce(course_stats.lesson_count, 0).label("total_lessons"),
+            func.coalesce(course_stats.comment_count, 0).label("total_comments"),
+            func.coalesce(course_stats.rating_count, 0).label("total_ratings"),
+            cast(average_rating, Float).label("average_rating"),
+        )
+        .outerjoin(course_stats, course_stats.course_id == models.Course.id)
+    )
+
+
+def user_stats_query():
+    """Отчет по пользователям: записи на курсы, комментарии, оценки и их сумма"""
+    enrollments = _user_counts(models.Enrollment.user_id)
+    comments = _user_counts(models.Comment.user_id)
+    ratings = _user_counts(models.Rating.user_id)
+    total_comments = func.coalesce(comments.c.total, 0)
+    total_ratings = func.coalesce(ratings.c.total, 0)
+    return (
+        select(
+            models.User.id.label("user_id"),
+            models.User.full_name,
+            func.coalesce(enrollments.c.total, 0).label("total_courses_enrolled"),
+            total_comments.label("total_comments"),
+            total_ratings.label("total_ratings"),
+            (total_comments + total_ratings).label("activity_count"),
+        )
+        .outerjoin(enrollments, enrollments.c.user_id == models.User.id)
+        .outerjoin(comments, comments.c.user_id == models.User.id)
+        .outerjoin(ratings, ratings.c.user_id == models.User.id)
+    )
+
+
+def active_users_query(limit: int):
+    """Самые активные пользователи (комментарии + оценки) как объекты ``User``"""
+    report = user_stats_query().subquery()
+    return (
+        select(models.User)
+        .join(report, report.c.user_id == models.User.id)
+        .where(report.c.activity_count > 0)
+        .order_by(report.c.activity_count.desc(), models.User.id)
+        .limit(limit)
+    )
+
+
+def apply_sort(query, sort: Optional[str], key: str):
+    """Сортировка по списку колонок отчета (``-`` перед именем — по убыванию).
+
+    Последним ключом всегда идет ``key``, чтобы порядок был детерминированным.
+    Неизвестная колонка — ошибка 400.
+    """
+    columns = query.selected_columns
+    order = []
+    for name in filter(None, (part.strip() for part in (sort or "").split(","))):
+        descending = name.startswith("-")
+        name = name.lstrip("-+")
+        if name not in columns:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Сортировка по полю '{name}' не поддерживается. Доступны: {', '.join(columns.keys())}"
+            )
+        column = columns[name]
+        order.append(column.desc() if descending else column.asc())
+    return query.order_by(*order, columns[key].asc())
+
+
+def apply_min_filters(query, minimums: Dict[str, Optional[float]]):
+    """Фильтры вида ``метрика >= значение``; пустые значения пропускаются"""
+    columns = query.selected_columns
+    for name, value in minimums.items():
+        if value is not None:
+            query = query.where(columns[name] >= value)
+    return query
+
+
+def iter_rows(db, query, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Строки отчета как словари, читаемые из курсора порциями"""
+    result = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    for row in result.mappings():
+        yield {name: float(value) if isinstance(value, Decimal) else value for name, value in row.items()}
+
+
+def _batched(rows: Iterable[dict], batch_size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson_lines(rows: Iterable[dict], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """NDJSON: по одному JSON объекту на строку"""
+    for batch in _batched(rows, batch_size):
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch)
+
+
+def csv_lines(rows: Iterable[dict], fieldnames, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """CSV с заголовком; каждая порция строк отдается одним куском"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(fieldnames))
+    writer.writeheader()
+    for batch in _batched(rows, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _export_rows(bind, query) -> Iterator[dict]:
+    # Отдельная сессия на время отправки ответа, закрывается и при обрыве соединения
+    session = Session(bind=bind)
+    try:
+        yield from iter_rows(session, query)
+    finally:
+        session.close()
+
+
+def export_response(db, query, export_format: ExportFormat, filename: str) -> StreamingResponse:
+    """Потоковая выгрузка всего отчета в NDJSON или CSV"""
+    rows = _export_rows(db.get_bind(), query)
+    if export_format == ExportFormat.csv:
+        return StreamingResponse(
+            csv_lines(rows, query.selected_columns.keys()),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
+        )
+    return StreamingResponse(ndjson_lines(rows), media_type="application/x-ndjson")
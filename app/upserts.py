@@ -0,0 +1,94 @@
+"""Запись оценок и записей на курс одним запросом ``INSERT ... ON CONFLICT``.
+
+Вместо "прочитать существующую строку, затем UPDATE или INSERT" база данных
+сама решает, вставить строку или обновить существующую, опираясь на уникальные
+ограничения ``uq_ratings_user_lesson`` и ``uq_enrollments_user_course``. Это
+один запрос вместо двух, и параллельные запросы одного пользователя не создают
+дубликатов. Счетчики ``course_stats``/``lesson_stats`` для этих таблиц
+поддерживают триггеры (см. ``app.aggregates``).
+
+Для СУБД без ``ON CONFLICT`` в SQLAlchemy (не SQLite и не PostgreSQL) строка
+читается перед записью, как раньше, а счетчики обновляются явно.
+"""
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app import aggregates, models
+
+_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def _insert(db, model):
+    """``INSERT ... ON CONFLICT`` диалекта или None, если диалект его не поддерживает"""
+    insert = _INSERTS.get(db.get_bind().dialect.name)
+    return insert(model) if insert is not None else None
+
+
+def _has_triggers(db) -> bool:
+    return db.get_bind().dialect.name in aggregates.TRIGGER_DIALECTS
+
+
+def upsert_rating(db, user_id: int, lesson_id: int, stars: int) -> models.Rating:
+    """Создание оценки или изменение существующей оценки пользователя"""
+    statement = _insert(db, models.Rating)
+    if statement is None:
+        return _save_rating(db, user_id, lesson_id, stars)
+    statement = statement.values(user_id=user_id, lesson_id=lesson_id, stars=stars)
+    statement = statement.on_conflict_do_update(
+        index_elements=[models.Rating.user_id, models.Rating.lesson_id],
+        set_={"stars": statement.excluded.stars},
+    ).returning(models.Rating)
+    return db.scalars(statement, execution_options={"populate_existing": True}).one()
+
+
+def insert_enrollment(db, user_id: int, course_id: int) -> Optional[models.Enrollment]:
+    """Запись на курс; None, если пользователь уже записан"""
+    statement = _insert(db, models.Enrollment)
+    if statement is None:
+        return _add_enrollment(db, user_id, course_id)
+    statement = statement.values(user_id=user_id, course_id=course_id)
+    statement = statement.on_conflict_do_nothing(
+        index_elements=[models.Enrollment.user_id, models.Enrollment.course_id],
+    ).returning(models.Enrollment)
+    return db.scalars(statement).one_or_none()
+
+
+def _save_rating(db, user_id: int, lesson_id: int, stars: int) -> models.Rating:
+    rating = db.scalars(select(models.Rating).where(
+        models.Rating.user_id == user_id, models.Rating.lesson_id == lesson_id,
+    )).one_or_none()
+    old_stars = None
+    if rating is None:
+        rating = models.Rating(user_id=user_id, lesson_id=lesson_id, stars=stars)
+        db.add(rating)
+    else:
+        old_stars = rating.stars
+        rating.stars = stars
+    db.flush()
+    if not _has_triggers(db):
+        aggregates.rating_saved(db.connection(), lesson_id, old_stars, stars)
+    return rating
+
+
+def _add_enrollment(db, user_id: int, course_id: int) -> Optional[models.Enrollment]:
+    exists = db.scalar(select(models.Enrollment.id).where(
+        models.Enrollment.user_id == user_id, models.Enrollment.course_id == course_id,
+    ))
+    if exists is not None:
+        return None
+    enrollment = models.Enrollment(user_id=user_id, course_id=course_id)
+    try:
+        # Параллельная запись того же пользователя нарушит уникальное ограничение
+        with db.begin_nested():
+            db.add(enrollment)
+    except IntegrityError:
+        return None
+    if not _has_triggers(db):
+        aggregates.enrollment_inserted(db.connection(), course_id)
+    return enrollment
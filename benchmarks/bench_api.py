@@ -0,0 +1,180 @@
+"""Нагрузочный прогон основных эндпоинтов API с базовой линией для сравнения.
+
+Наполняет временную SQLite базу (``--users``, ``--courses``, ``--lessons-per-course``,
+``--enrollments-per-user``, ``--comments-per-lesson``, ``--ratings-per-lesson``;
+одинаковый ``--seed`` дает одинаковые данные) и выполняет сценарии через ASGI в
+том же процессе:
+
+* ``course_list`` — ``GET /api/courses/`` по случайным страницам;
+* ``course_search`` — ``GET /api/courses/?search=...``;
+* ``course_detail`` — ``GET /api/courses/{id}``;
+* ``lesson_detail`` — ``GET /api/lessons/{id}`` слушателем курса;
+* ``comment_list`` — ``GET /api/comments/lesson/{id}``;
+* ``rating_upsert`` — ``POST /api/ratings/``;
+* ``login`` — ``POST /api/auth/token`` (``--login-requests``, проверка пароля дорогая);
+* ``admin_stats`` — ``GET /api/admin/stats/dashboard``.
+
+Для каждого сценария выводятся rps и p50/p95/p99. ``--save-baseline`` сохраняет
+результаты в JSON, ``--baseline`` сравнивает с сохраненными и завершается с
+кодом 1, если rps упал или p95 вырос больше ``--tolerance``. Ответы каталога
+по умолчанию отдаются из кэша, как в работающем приложении; ``--no-response-cache``
+сбрасывает кэш перед каждым запросом.
+
+    python -m benchmarks.bench_api --save-baseline benchmarks/baselines/api.json
+    python -m benchmarks.bench_api --baseline benchmarks/baselines/api.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+from benchmarks.common import (
+    BENCH_PASSWORD, TOPICS, compare_to_baseline, drive, print_summary, save_baseline, seed_dataset,
+    summarize, use_temporary_database,
+)
+
+SCENARIOS = (
+    "course_list", "course_search", "course_detail", "lesson_detail",
+    "comment_list", "rating_upsert", "login", "admin_stats",
+)
+
+# Параметры, от которых зависят результаты (сравниваются с базовой линией)
+_RUN_PARAMETERS = (
+    "users", "courses", "lessons_per_course", "enrollments_per_user", "comments_per_lesson",
+    "ratings_per_lesson", "seed", "requests", "login_requests", "concurrency", "no_response_cache",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--courses", type=int, default=100)
+    parser.add_argument("--lessons-per-course", type=int, default=10)
+    parser.add_argument("--enrollments-per-user", type=int, default=3)
+    parser.add_argument("--comments-per-lesson", type=int, default=5)
+    parser.add_argument("--ratings-per-lesson", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=500, help="запросов на сценарий")
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=20, help="неучитываемых запросов перед сценарием")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--active-users", type=int, default=100, help="пользователей, от имени которых идут запросы")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--no-response-cache", action="store_true")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение rps и p95 (доля)")
+    args = parser.parse_args()
+
+    use_temporary_database()
+
+    from app import models
+    from app.database import SessionLocal, configure_db_threadpool
+    from app.log import setup_logging, shutdown_logging
+    from app.response_cache import catalog_cache
+    from app.security import create_user_access_token
+    from main import app
+
+    db = SessionLocal()
+    dataset = seed_dataset(
+        db, users=args.users, courses=args.courses, lessons_per_course=args.lessons_per_course,
+        enrollments_per_user=args.enrollments_per_user, comments_per_lesson=args.comments_per_lesson,
+        ratings_per_lesson=args.ratings_per_lesson, seed=args.seed,
+    )
+    admin_token = create_user_access_token(db.get(models.User, dataset.admin_id))
+    # Пользователи с записями на курсы и уроками этих курсов
+    active = []
+    for user_id in dataset.user_ids[:args.active_users]:
+        lessons = [
+            lesson_id for course_id in dataset.enrollments.get(user_id, [])
+            for lesson_id in dataset.lessons_by_course[course_id]
+        ]
+        if lessons:
+            user = db.get(models.User, user_id)
+            active.append(({"Authorization": f"Bearer {create_user_access_token(user)}"}, user.email, lessons))
+    db.close()
+    if not active:
+        parser.error("нет пользователей с уроками: увеличьте --enrollments-per-user и --lessons-per-course")
+
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    pages = max(1, args.courses // 20)
+
+    def check(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.method} {response.request.url}: {response.status_code}")
+        return response
+
+    def catalog(client, path, params=None):
+        if args.no_response_cache:
+            catalog_cache.invalidate()
+        return client.get(path, params=params)
+
+    def make_scenario(name, rng):
+        async def course_list(client, i):
+            return check(await catalog(client, "/api/courses/", {"limit": 20, "skip": rng.randrange(pages) * 20}))
+
+        async def course_search(client, i):
+            return check(await catalog(client, "/api/courses/", {"search": rng.choice(TOPICS), "limit": 20}))
+
+        async def course_detail(client, i):
+            return check(await catalog(client, f"/api/courses/{rng.choice(dataset.course_ids)}"))
+
+        async def lesson_detail(client, i):
+            headers, _, lessons = rng.choice(active)
+            return check(await client.get(f"/api/lessons/{rng.choice(lessons)}", headers=headers))
+
+        async def comment_list(client, i):
+            headers, _, lessons = rng.choice(active)
+            return check(await client.get(f"/api/comments/lesson/{rng.choice(lessons)}", params={"limit": 20},
+                                          headers=headers))
+
+        async def rating_upsert(client, i):
+            headers, _, lessons = rng.choice(active)
+            return check(await client.post("/api/ratings/", headers=headers,
+                                           json={"lesson_id": rng.choice(lessons), "stars": rng.randint(1, 5)}))
+
+        async def login(client, i):
+            _, email, _ = rng.choice(active)
+            return check(await client.post("/api/auth/token", data={"username": email, "password": BENCH_PASSWORD}))
+
+        async def admin_stats(client, i):
+            return check(await client.get("/api/admin/stats/dashboard", headers=admin_headers))
+
+        return locals()[name]
+
+    async def run():
+        configure_db_threadpool()
+        rows = []
+        for index, name in enumerate(args.scenarios):
+            make_request = make_scenario(name, random.Random(args.seed + index))
+            total = args.login_requests if name == "login" else args.requests
+            if args.warmup:
+                await drive(app, make_request, min(args.warmup, total), args.concurrency)
+            latencies, elapsed = await drive(app, make_request, total, args.concurrency)
+            rows.append(summarize(name, latencies, elapsed))
+            print_summary(rows[-1])
+        return rows
+
+    # Логи, как в работающем приложении, но без вывода на экран
+    output = open(os.devnull, "w")
+    setup_logging(stream=output)
+    try:
+        rows = asyncio.run(run())
+    finally:
+        shutdown_logging()
+        output.close()
+
+    meta = {name: getattr(args, name) for name in _RUN_PARAMETERS}
+    if args.baseline:
+        regressions = compare_to_baseline(rows, args.baseline, args.tolerance, meta)
+        if regressions:
+            print(f"Регрессии: {', '.join(regressions)}")
+            sys.exit(1)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, rows, meta)
+        print(f"Базовая линия сохранена в {args.save_baseline}")
+
+
+if __name__ == "__main__":
+    main()
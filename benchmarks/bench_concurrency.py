@@ -0,0 +1,97 @@
+"""Нагрузочный тест модели выполнения обработчиков.
+
+Сравнивает latency списка курсов, когда синхронный запрос к БД выполняется
+прямо в event loop (как было при ``async def`` обработчиках), и когда
+запрос выполняется в пуле потоков или через AsyncSession (``--mode``). Параллельно
+измеряется latency легкого запроса без БД (``GET /``): именно он страдает,
+когда медленный запрос блокирует весь воркер.
+
+Медленная БД моделируется задержкой перед каждым SQL запросом синхронного
+движка (в режиме async задержка не применяется к AsyncEngine: событие
+выполняется в event loop и исказило бы результат).
+
+    python -m benchmarks.bench_concurrency --requests 400 --concurrency 50 --db-latency-ms 5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import use_temporary_database, drive, summarize, print_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--mode", choices=["threadpool", "async"], default="threadpool",
+                        help="значение DB_EXECUTION_MODE для горячих путей чтения")
+    args = parser.parse_args()
+
+    use_temporary_database()
+    os.environ["DB_EXECUTION_MODE"] = args.mode
+
+    from sqlalchemy import event
+
+    from app.database import SessionLocal, engine, configure_db_threadpool
+    from app import models
+    from benchmarks.common import seed_courses
+    from main import app
+
+    db = SessionLocal()
+    seed_courses(db, count=200)
+    db.close()
+
+    # Эталон "до": синхронная работа с БД внутри корутины блокирует event loop
+    @app.get("/bench/blocking-courses")
+    async def blocking_courses():
+        db = SessionLocal()
+        try:
+            return db.query(models.Course).limit(20).all()
+        finally:
+            db.close()
+
+    delay = args.db_latency_ms / 1000.0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def slow_database(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(delay)
+
+    async def probe(client, latencies, stop):
+        # Легкий запрос без БД: показывает, насколько event loop доступен другим клиентам
+        while not stop.is_set():
+            started = time.perf_counter()
+            await client.get("/")
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.005)
+
+    async def run():
+        import httpx
+
+        configure_db_threadpool()
+        rows = []
+        for name, path in (
+            ("blocking (async def + sync Session)", "/bench/blocking-courses"),
+            (f"{args.mode} handler", "/api/courses/?limit=20"),
+        ):
+            async def request(client, i, path=path):
+                return await client.get(path)
+
+            probe_latencies, stop = [], asyncio.Event()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                probe_task = asyncio.create_task(probe(client, probe_latencies, stop))
+                latencies, elapsed = await drive(app, request, args.requests, args.concurrency)
+                stop.set()
+                await probe_task
+            rows.append(summarize(f"{name} /courses", latencies, elapsed))
+            rows.append(summarize(f"{name} probe /", probe_latencies, elapsed))
+        return rows
+
+    for row in asyncio.run(run()):
+        print_summary(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Импорт курса из N уроков: по одному уроку против массовой загрузки.
+
+Сравнивает загрузку курса через ``POST /api/lessons/`` (запрос, проверка прав и
+коммит на каждый урок) с одним ``POST /api/courses/{id}/lessons:bulk``, а
+переупорядочивание через ``PUT /api/lessons/{id}`` на каждый урок — с одним
+``PATCH /api/courses/{id}/lessons/order``. Для каждого режима выводится время
+одного запроса и число уроков в секунду.
+
+    python -m benchmarks.bench_lesson_import --lessons 500 --courses 5
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import use_temporary_database, seed_courses, drive, summarize, print_summary
+
+
+def lesson_payload(i):
+    return {
+        "title": f"Lesson {i}",
+        "video_url": f"https://example.com/lesson-{i}.mp4",
+        "content": f"Content of benchmark lesson number {i}",
+        "order": i,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lessons", type=int, default=500, help="уроков в импортируемом курсе")
+    parser.add_argument("--courses", type=int, default=5, help="сколько курсов импортировать в каждом режиме")
+    args = parser.parse_args()
+
+    use_temporary_database()
+
+    from app.database import SessionLocal, configure_db_threadpool
+    from app.security import create_user_access_token
+    from main import app
+
+    db = SessionLocal()
+    author = seed_courses(db, 0)
+    headers = {"Authorization": f"Bearer {create_user_access_token(author)}"}
+    db.close()
+
+    lessons = [lesson_payload(i) for i in range(1, args.lessons + 1)]
+
+    async def run():
+        import httpx
+
+        configure_db_threadpool()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            async def new_course(name):
+                response = await client.post("/api/courses/", json={"title": name, "description": name})
+                return response.json()["id"]
+
+            one_by_one = [await new_course(f"One by one {i}") for i in range(args.courses)]
+            bulk = [await new_course(f"Bulk {i}") for i in range(args.courses)]
+
+        rows = []
+        total = args.lessons * args.courses
+
+        async def create_lesson(client, i):
+            course_id = one_by_one[i // args.lessons]
+            return await client.post("/api/lessons/", json={**lessons[i % args.lessons], "course_id": course_id},
+                                     headers=headers)
+
+        latencies, elapsed = await drive(app, create_lesson, total, 1)
+        rows.append((summarize("POST /lessons/ per lesson", latencies, elapsed), total / elapsed))
+
+        async def create_bulk(client, i):
+            response = await client.post(f"/api/courses/{bulk[i]}/lessons:bulk", json={"lessons": lessons},
+                                         headers=headers)
+            response.raise_for_status()
+            return response
+
+        latencies, elapsed = await drive(app, create_bulk, args.courses, 1)
+        rows.append((summarize(f"POST lessons:bulk ({args.lessons} lessons)", latencies, elapsed), total / elapsed))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            orders = []
+            for course_id in bulk:
+                response = await client.get("/api/lessons/", params={"course_id": course_id, "limit": args.lessons})
+                orders.append([lesson["id"] for lesson in reversed(response.json())])
+
+        async def reorder_one_by_one(client, i):
+            lesson_ids = orders[i // args.lessons]
+            position = i % args.lessons
+            return await client.put(f"/api/lessons/{lesson_ids[position]}", json={"order": position + 1},
+                                    headers=headers)
+
+        latencies, elapsed = await drive(app, reorder_one_by_one, total, 1)
+        rows.append((summarize("PUT /lessons/{id} per lesson", latencies, elapsed), total / elapsed))
+
+        async def reorder_bulk(client, i):
+            response = await client.patch(f"/api/courses/{bulk[i]}/lessons/order", json={"lesson_ids": orders[i]},
+                                          headers=headers)
+            response.raise_for_status()
+            return response
+
+        latencies, elapsed = await drive(app, reorder_bulk, args.courses, 1)
+        rows.append((summarize(f"PATCH lessons/order ({args.lessons} lessons)", latencies, elapsed), total / elapsed))
+        return rows
+
+    for row, lessons_per_second in asyncio.run(run()):
+        print_summary(row)
+        print(f"{'':<48} {lessons_per_second:>10.1f} lessons/s")
+
+
+if __name__ == "__main__":
+    main()
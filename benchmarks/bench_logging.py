@@ -0,0 +1,88 @@
+"""Накладные расходы логирования на запрос.
+
+Вызывает ``LoggingMiddleware`` вокруг пустого ASGI приложения (без сети и
+FastAPI, чтобы измерить только логирование) в режимах:
+
+* ``bare`` — приложение без middleware;
+* ``disabled`` — middleware, уровень WARNING (журнал запросов выключен);
+* ``queue`` — middleware и ``--events`` записей INFO на запрос через очередь (``app.log``);
+* ``sync`` — то же, но с обычным ``StreamHandler`` в потоке запроса (для сравнения).
+
+Выводится среднее время на запрос и разница с ``bare`` в микросекундах. В режиме
+``queue`` фоновый поток на время замера остановлен, чтобы он не отнимал GIL у
+запросов: замеряется только работа в потоке запроса, а время форматирования и
+вывода накопленных записей фоновым потоком печатается отдельно.
+Вывод идет в ``--output`` (по умолчанию /dev/null).
+
+    python -m benchmarks.bench_logging --requests 50000 --events 2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--events", type=int, default=2, help="записей INFO из обработчика на запрос")
+    parser.add_argument("--output", default=os.devnull)
+    args = parser.parse_args()
+
+    from app.log import JsonFormatter, LoggingMiddleware, setup_logging, shutdown_logging
+
+    logger = logging.getLogger("app.bench")
+    scope = {"type": "http", "method": "GET", "path": "/api/courses/1", "headers": []}
+
+    async def endpoint(scope, receive, send):
+        for i in range(args.events):
+            logger.info("Событие обработчика", extra={"course_id": 1, "user_id": i})
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def measure(app):
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            await app(scope, receive, send)
+        return (time.perf_counter() - started) / args.requests * 1e6
+
+    output = open(args.output, "w")
+    app_logger = logging.getLogger("app")
+    results = {}
+
+    app_logger.setLevel(logging.WARNING)
+    results["bare"] = asyncio.run(measure(endpoint))
+    results["disabled"] = asyncio.run(measure(LoggingMiddleware(endpoint)))
+
+    listener = setup_logging(stream=output, level="INFO", format="json", sampling={})
+    listener.stop()
+    results["queue"] = asyncio.run(measure(LoggingMiddleware(endpoint)))
+    listener.start()
+    started = time.perf_counter()
+    shutdown_logging()
+    background = (time.perf_counter() - started) / args.requests * 1e6
+
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(JsonFormatter())
+    app_logger.addHandler(handler)
+    app_logger.setLevel(logging.INFO)
+    app_logger.propagate = False
+    results["sync"] = asyncio.run(measure(LoggingMiddleware(endpoint)))
+    app_logger.removeHandler(handler)
+    output.close()
+
+    for name, per_request in results.items():
+        overhead = per_request - results["bare"]
+        print(f"{name:<10} {per_request:>9.2f} us/request  overhead {overhead:>8.2f} us")
+    print(f"queue: фоновое форматирование и вывод {background:.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
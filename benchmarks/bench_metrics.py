@@ -0,0 +1,60 @@
+"""Накладные расходы ``MetricsMiddleware`` на запрос.
+
+Вызывает маршрутизатор Starlette с одним маршрутом ``/api/courses/{course_id}``
+(без сети и FastAPI) напрямую и через ``MetricsMiddleware``; выводится среднее
+время на запрос и разница в микросекундах, а также время формирования
+``/metrics`` для накопленных рядов.
+
+    python -m benchmarks.bench_metrics --requests 50000
+"""
+import argparse
+import asyncio
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50000)
+    args = parser.parse_args()
+
+    from starlette.responses import Response
+    from starlette.routing import Route, Router
+
+    from app.metrics import REGISTRY, MetricsMiddleware
+
+    async def endpoint(request):
+        return Response(b"{}", media_type="application/json")
+
+    router = Router(routes=[Route("/api/courses/{course_id}", endpoint)])
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def measure(app):
+        started = time.perf_counter()
+        for i in range(args.requests):
+            scope = {
+                "type": "http", "method": "GET", "path": f"/api/courses/{i % 100}", "root_path": "",
+                "query_string": b"", "headers": [],
+            }
+            await app(scope, receive, send)
+        return (time.perf_counter() - started) / args.requests * 1e6
+
+    results = {
+        "bare": asyncio.run(measure(router)),
+        "metrics": asyncio.run(measure(MetricsMiddleware(router))),
+    }
+    for name, per_request in results.items():
+        overhead = per_request - results["bare"]
+        print(f"{name:<10} {per_request:>9.2f} us/request  overhead {overhead:>8.2f} us")
+
+    started = time.perf_counter()
+    text = REGISTRY.render_text()
+    print(f"/metrics: {len(text.splitlines())} строк за {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
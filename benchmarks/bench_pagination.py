@@ -0,0 +1,83 @@
+"""Latency глубоких страниц: OFFSET против keyset курсора.
+
+Наполняет временную SQLite базу курсами и измеряет ``GET /api/courses/`` для
+страниц ``--pages`` в двух режимах: ``skip=(page-1)*limit`` и ``after=<курсор>``.
+При OFFSET база читает и отбрасывает все предыдущие строки, поэтому latency
+растет с номером страницы; при курсоре — остается постоянной.
+
+    python -m benchmarks.bench_pagination --courses 250000 --limit 20 --pages 1 100 1000 10000
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import use_temporary_database, drive, summarize, print_summary
+
+
+def seed(db, count, batch=10000):
+    from sqlalchemy import insert
+
+    from app import models
+
+    author = models.User(full_name="Bench Author", email="bench-pages@example.com",
+                         hashed_password="not-a-real-hash", is_active=True, is_admin=False)
+    db.add(author)
+    db.flush()
+    for start in range(0, count, batch):
+        db.execute(insert(models.Course), [
+            {"title": f"Course {i}", "description": f"Description {i}", "author_id": author.id}
+            for i in range(start, min(count, start + batch))
+        ])
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=250_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    use_temporary_database()
+
+    from sqlalchemy import select
+
+    from app import models
+    from app.database import SessionLocal, configure_db_threadpool
+    from app.pagination import encode_cursor
+    from app.routers.courses import COURSE_KEYSET
+    from main import app
+
+    db = SessionLocal()
+    seed(db, args.courses)
+    # Курсор страницы N указывает на последнюю строку страницы N-1
+    cursors = {}
+    for page in args.pages:
+        skip = (page - 1) * args.limit
+        last = db.execute(
+            select(models.Course).order_by(models.Course.id).offset(skip - 1).limit(1)
+        ).scalar_one_or_none() if skip else None
+        cursors[page] = encode_cursor(last, COURSE_KEYSET) if last else None
+    db.close()
+
+    async def run():
+        configure_db_threadpool()
+        rows = []
+        for page in args.pages:
+            skip = (page - 1) * args.limit
+            modes = [("offset", {"skip": skip})]
+            modes.append(("cursor", {"after": cursors[page]} if cursors[page] else {}))
+            for name, params in modes:
+                async def request(client, i, params=params):
+                    return await client.get("/api/courses/", params={"limit": args.limit, **params})
+
+                latencies, elapsed = await drive(app, request, args.repeat, 1)
+                rows.append(summarize(f"{name} page {page}", latencies, elapsed))
+        return rows
+
+    for row in asyncio.run(run()):
+        print_summary(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Нагрузочный тест входа: пропускная способность /auth/token в зависимости от
+числа потоков пула хеширования паролей.
+
+bcrypt освобождает GIL, поэтому при росте ``--workers`` пропускная способность
+растет примерно линейно до числа ядер. Для каждого значения дополнительно
+измеряется latency легкого запроса ``GET /``: event loop остается свободным,
+пока пароли проверяются в пуле.
+
+    python -m benchmarks.bench_password_hashing --requests 64 --concurrency 32 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import use_temporary_database, drive, summarize, print_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    use_temporary_database()
+
+    from app import models
+    from app.database import SessionLocal, configure_db_threadpool
+    from app.passwords import configure_password_pool, get_password_hash
+    from main import app
+
+    password = "bench-password"
+    db = SessionLocal()
+    db.add(models.User(
+        full_name="Bench User",
+        email="bench-login@example.com",
+        hashed_password=get_password_hash(password),
+        is_active=True,
+        is_admin=False,
+    ))
+    db.commit()
+    db.close()
+
+    async def login(client, i):
+        return await client.post(
+            "/api/auth/token",
+            data={"username": "bench-login@example.com", "password": password},
+        )
+
+    async def probe(client, latencies, stop):
+        while not stop.is_set():
+            started = time.perf_counter()
+            await client.get("/")
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.005)
+
+    async def run():
+        import httpx
+
+        configure_db_threadpool()
+        rows = []
+        for workers in args.workers:
+            # Очередь не ограничиваем: измеряется пропускная способность, а не отказы
+            configure_password_pool(workers=workers, max_queue=args.concurrency)
+            probe_latencies, stop = [], asyncio.Event()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                probe_task = asyncio.create_task(probe(client, probe_latencies, stop))
+                latencies, elapsed = await drive(app, login, args.requests, args.concurrency)
+                stop.set()
+                await probe_task
+            rows.append(summarize(f"workers={workers} /auth/token", latencies, elapsed))
+            rows.append(summarize(f"workers={workers} probe /", probe_latencies, elapsed))
+        return rows
+
+    for row in asyncio.run(run()):
+        print_summary(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Кэш ответов каталога: промах, попадание и ``304 Not Modified``.
+
+Наполняет временную SQLite базу курсами и измеряет ``GET /api/courses/`` в трех
+режимах: без кэша (поколение сбрасывается перед каждым запросом), с ответом из
+кэша и с совпадающим ``If-None-Match`` (тело не отправляется).
+
+    python -m benchmarks.bench_response_cache --courses 2000 --limit 100 --requests 500 --concurrency 8
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import use_temporary_database, seed_courses, drive, summarize, print_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    use_temporary_database()
+
+    from app.database import SessionLocal, configure_db_threadpool
+    from app.response_cache import catalog_cache
+    from main import app
+
+    db = SessionLocal()
+    seed_courses(db, args.courses)
+    db.close()
+
+    params = {"limit": args.limit}
+
+    async def run():
+        configure_db_threadpool()
+
+        async def uncached(client, i):
+            catalog_cache.invalidate()
+            return await client.get("/api/courses/", params=params)
+
+        async def cached(client, i):
+            return await client.get("/api/courses/", params=params)
+
+        latencies, elapsed = await drive(app, uncached, args.requests, args.concurrency)
+        rows = [summarize("miss (invalidated per request)", latencies, elapsed)]
+
+        latencies, elapsed = await drive(app, cached, args.requests, args.concurrency)
+        rows.append(summarize("hit", latencies, elapsed))
+
+        etag = {}
+
+        async def remember(client, i):
+            response = await cached(client, i)
+            etag["value"] = response.headers["etag"]
+            return response
+
+        await drive(app, remember, 1, 1)
+
+        async def revalidate(client, i):
+            return await client.get("/api/courses/", params=params, headers={"If-None-Match": etag["value"]})
+
+        latencies, elapsed = await drive(app, revalidate, args.requests, args.concurrency)
+        rows.append(summarize("304 not modified", latencies, elapsed))
+        return rows
+
+    for row in asyncio.run(run()):
+        print_summary(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Сравнение поиска курсов через ILIKE и полнотекстовый индекс.
+
+Наполняет временную SQLite базу ``--courses`` курсами (по умолчанию 100 000) и
+для каждого поискового запроса измеряет latency выборки первой страницы
+(``--limit``) через ILIKE (полный просмотр таблицы) и через FTS5 с ранжированием.
+
+ILIKE без сортировки останавливается на первых ``--limit`` совпадениях, поэтому
+для очень частых слов он быстр; для редких слов и запросов без совпадений он
+просматривает всю таблицу. FTS читает только индекс, но ранжирует все совпадения.
+
+    python -m benchmarks.bench_search --courses 100000 --repeat 20
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import use_temporary_database, summarize, print_summary
+
+WORDS = (
+    "python", "data", "science", "web", "backend", "frontend", "design", "marketing",
+    "algebra", "physics", "history", "english", "java", "kotlin", "docker", "cloud",
+    "security", "network", "statistics", "finance", "основы", "программирование",
+    "математика", "анализ", "введение", "продвинутый", "практика", "алгоритмы",
+)
+
+QUERIES = ("python", "pyth", "data science", "программ", "kotlin cloud", "zorvex", "nonexistentword")
+
+SYLLABLES = ("ka", "lo", "mi", "ren", "tus", "vex", "zor", "pa", "qui", "dan", "sel", "bo")
+
+
+def _vocabulary(rng, size=20000):
+    """Частые предметные слова и длинный хвост редких (как в реальных описаниях)"""
+    rare = {"".join(rng.choice(SYLLABLES) for _ in range(3)) for _ in range(size)}
+    return list(WORDS), sorted(rare)
+
+
+def _text(rng, vocabulary, count):
+    common, rare = vocabulary
+    return " ".join(rng.choice(common) if rng.random() < 0.2 else rng.choice(rare) for _ in range(count))
+
+
+def seed(db, count, batch=5000):
+    """Быстрое наполнение таблицы курсов пакетными вставками"""
+    from sqlalchemy import insert
+
+    from app import models
+
+    rng = random.Random(42)
+    vocabulary = _vocabulary(rng)
+    author = models.User(full_name="Bench Author", email="bench-search@example.com",
+                         hashed_password="not-a-real-hash", is_active=True, is_admin=False)
+    db.add(author)
+    db.flush()
+    for start in range(0, count, batch):
+        db.execute(insert(models.Course), [
+            {"title": _text(rng, vocabulary, 3), "description": _text(rng, vocabulary, 40), "author_id": author.id}
+            for _ in range(start, min(count, start + batch))
+        ])
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    use_temporary_database()
+
+    from sqlalchemy import select
+
+    from app import models
+    from app.database import Base, SessionLocal, engine
+    from app.search import apply_course_ilike, apply_course_search
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    started = time.perf_counter()
+    seed(db, args.courses)
+    print(f"seeded {args.courses} courses in {time.perf_counter() - started:.1f}s")
+
+    for search in QUERIES:
+        for name, build in (
+            ("ilike", lambda query: apply_course_ilike(query, search)),
+            ("fts", lambda query: apply_course_search(query, search, db)),
+        ):
+            statement = build(select(models.Course)).limit(args.limit)
+            latencies = []
+            total_started = time.perf_counter()
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                db.execute(statement).scalars().all()
+                latencies.append(time.perf_counter() - started)
+            print_summary(summarize(f"{name} '{search}'", latencies, time.perf_counter() - total_started))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Общие утилиты для бенчмарков: временная БД, наполнение данными и нагрузка через ASGI."""
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+def use_temporary_database():
+    """Переключение приложения на временную файловую SQLite базу.
+
+    Вызывается до импорта ``main``/``app.database``, так как движок создается
+    при импорте модуля.
+    """
+    directory = tempfile.mkdtemp(prefix="okp-bench-")
+    path = os.path.join(directory, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+
+def seed_courses(db, count=200, author_email="bench-author@example.com"):
+    """Создание автора и заданного количества курсов"""
+    from app import models
+
+    author = models.User(
+        full_name="Bench Author",
+        email=author_email,
+        hashed_password="not-a-real-hash",
+        is_active=True,
+        is_admin=False,
+    )
+    db.add(author)
+    db.flush()
+    db.add_all([
+        models.Course(
+            title=f"Course {i}",
+            description=f"Description of benchmark course number {i}",
+            author_id=author.id,
+        )
+        for i in range(count)
+    ])
+    db.commit()
+    return author
+
+
+# Слова для названий курсов и уроков (поиск находит по несколько курсов на слово)
+TOPICS = ("Python", "FastAPI", "SQL", "JavaScript", "DevOps", "Docker", "Algorithms", "Design")
+LEVELS = ("Basics", "Advanced", "Workshop", "Bootcamp", "Deep Dive")
+
+BENCH_PASSWORD = "bench-password"
+
+
+@dataclass
+class Dataset:
+    """Идентификаторы наполненной базы, нужные для построения запросов"""
+    admin_id: int
+    user_ids: List[int]
+    course_ids: List[int]
+    lessons_by_course: Dict[int, List[int]]
+    enrollments: Dict[int, List[int]] = field(default_factory=dict)  # user_id -> course_ids
+
+
+def seed_dataset(db, users=1000, courses=100, lessons_per_course=10, enrollments_per_user=3,
+                 comments_per_lesson=5, ratings_per_lesson=5, seed=42) -> Dataset:
+    """Наполнение базы пользователями, курсами, уроками, записями, комментариями и оценками.
+
+    Строки вставляются пакетами в обход ORM, поэтому счетчики ``course_stats`` и
+    ``lesson_stats`` пересчитываются в конце (``app.aggregates.reconcile``).
+    Одинаковый ``seed`` дает одинаковые данные.
+    """
+    from sqlalchemy import insert, select
+
+    from app import models
+    from app.aggregates import reconcile
+    from app.security import get_password_hash
+
+    rng = random.Random(seed)
+    # Хеш один на всех: стоимость хеширования нужна только в сценарии входа
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+
+    admin_id = db.execute(insert(models.User).returning(models.User.id), {
+        "full_name": "Bench Admin", "email": "bench-admin@example.com",
+        "hashed_password": hashed_password, "is_active": True, "is_admin": True,
+    }).scalar_one()
+    user_ids = db.scalars(insert(models.User).returning(models.User.id), [
+        {
+            "full_name": f"Bench User {i}", "email": f"bench-user-{i}@example.com",
+            "hashed_password": hashed_password, "is_active": True, "is_admin": False,
+        }
+        for i in range(users)
+    ]).all()
+
+    course_ids = db.scalars(insert(models.Course).returning(models.Course.id), [
+        {
+            "title": f"{rng.choice(TOPICS)} {rng.choice(LEVELS)} {i}",
+            "description": f"{rng.choice(TOPICS)} and {rng.choice(TOPICS)}: benchmark course number {i}",
+            "author_id": rng.choice(user_ids),
+        }
+        for i in range(courses)
+    ]).all()
+
+    db.execute(insert(models.Lesson), [
+        {
+            "course_id": course_id, "title": f"{rng.choice(TOPICS)} lesson {order}",
+            "video_url": f"https://example.com/video/{course_id}/{order}.mp4",
+            "content": "Lesson content " * 20, "order": order,
+        }
+        for course_id in course_ids for order in range(lessons_per_course)
+    ])
+    lessons_by_course = {course_id: [] for course_id in course_ids}
+    for lesson_id, course_id in db.execute(select(models.Lesson.id, models.Lesson.course_id).order_by(models.Lesson.id)):
+        lessons_by_course[course_id].append(lesson_id)
+
+    enrollments = {
+        user_id: rng.sample(course_ids, min(enrollments_per_user, len(course_ids))) for user_id in user_ids
+    }
+    db.execute(insert(models.Enrollment), [
+        {"user_id": user_id, "course_id": course_id}
+        for user_id, enrolled in enrollments.items() for course_id in enrolled
+    ])
+
+    # Комментарии и оценки оставляют слушатели курса урока
+    students = {course_id: [] for course_id in course_ids}
+    for user_id, enrolled in enrollments.items():
+        for course_id in enrolled:
+            students[course_id].append(user_id)
+    comments, ratings = [], []
+    for course_id, lesson_ids in lessons_by_course.items():
+        if not students[course_id]:
+            continue
+        for lesson_id in lesson_ids:
+            for i in range(comments_per_lesson):
+                comments.append({
+                    "user_id": rng.choice(students[course_id]), "lesson_id": lesson_id,
+                    "text": f"Comment {i} about lesson {lesson_id}",
+                })
+            for user_id in rng.sample(students[course_id], min(ratings_per_lesson, len(students[course_id]))):
+                ratings.append({"user_id": user_id, "lesson_id": lesson_id, "stars": rng.randint(1, 5)})
+    if comments:
+        db.execute(insert(models.Comment), comments)
+    if ratings:
+        db.execute(insert(models.Rating), ratings)
+
+    reconcile(db.connection())
+    db.commit()
+    return Dataset(
+        admin_id=admin_id, user_ids=list(user_ids), course_ids=list(course_ids),
+        lessons_by_course=lessons_by_course, enrollments=enrollments,
+    )
+
+
+def percentile(samples, pct):
+    """Перцентиль по отсортированной выборке (nearest-rank)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name, latencies, elapsed):
+    """Сводка по latency (в миллисекундах) и пропускной способности"""
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def print_summary(row):
+    print(
+        f"{row['name']:<48} {row['requests']:>7} req  {row['rps']:>9} rps  "
+        f"p50={row['p50_ms']:>8}ms  p95={row['p95_ms']:>8}ms  p99={row['p99_ms']:>8}ms"
+    )
+
+
+async def drive(app, make_request, total, concurrency):
+    """Выполнение ``total`` запросов с заданной конкурентностью через ASGI транспорт.
+
+    ``make_request(client, i)`` — корутина, выполняющая один запрос.
+    Возвращает список latency в секундах и общее время прогона.
+    """
+    import httpx
+
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while True:
+                try:
+                    i = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                response = await make_request(client, i)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 500:
+                    raise RuntimeError(f"{response.request.url}: {response.status_code}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def save_baseline(path, rows, meta):
+    """Сохранение результатов прогона как базовой линии (JSON)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    baseline = {
+        "meta": {
+            **meta,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {row["name"]: row for row in rows},
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(baseline, file, ensure_ascii=False, indent=2)
+
+
+def compare_to_baseline(rows, path, tolerance=0.2, meta=None):
+    """Сравнение с базовой линией; возвращает сценарии, где rps упал или p95 вырос больше ``tolerance``"""
+    with open(path, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if meta is not None:
+        changed = {key: (baseline["meta"].get(key), value) for key, value in meta.items()
+                   if baseline["meta"].get(key) != value}
+        if changed:
+            print(f"Параметры прогона отличаются от базовой линии: {changed}")
+
+    regressions = []
+    print(f"\nСравнение с {path} (сохранена {baseline['meta'].get('saved_at')}):")
+    for row in rows:
+        before = baseline["results"].get(row["name"])
+        if before is None:
+            print(f"{row['name']:<24} нет в базовой линии")
+            continue
+        rps_change = row["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        p95_change = row["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        regressed = rps_change < -tolerance or p95_change > tolerance
+        if regressed:
+            regressions.append(row["name"])
+        print(
+            f"{row['name']:<24} rps {before['rps']:>9} -> {row['rps']:>9} ({rps_change:+.0%})  "
+            f"p95 {before['p95_ms']:>8} -> {row['p95_ms']:>8} ms ({p95_change:+.0%})"
+            + ("  РЕГРЕССИЯ" if regressed else "")
+        )
+    return regressions
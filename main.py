@@ -1,18 +1,50 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from contextlib import asynccontextmanager, suppress
+from typing import Optional
+import asyncio
+import hmac
 import uvicorn
 import os
 
-from app.database import engine, Base
+from app.database import engine, async_engine, Base, configure_db_threadpool
 from app.routers import users, auth, courses, lessons, comments, ratings, admin
 from app.routers import admin_ui
+# Обработчики событий ORM, поддерживающие счетчики course_stats/lesson_stats
+from app import aggregates  # noqa: F401
+from app.dashboard import DASHBOARD_REFRESH_SECONDS, run_refresher
+from app.log import LoggingMiddleware, setup_logging, shutdown_logging
+from app.metrics import METRICS_TOKEN, PROMETHEUS_CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from app.query_stats import QueryStatsMiddleware
+from app.response_cache import ResponseCacheMiddleware, catalog_cache
 
 # Создание таблиц в базе данных
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка приложения"""
+    # Логи пишутся через очередь и фоновый поток (app.log)
+    setup_logging()
+    configure_db_threadpool()
+    # Фоновое обновление статистики дашборда
+    refresher = None
+    if DASHBOARD_REFRESH_SECONDS > 0:
+        refresher = asyncio.create_task(run_refresher(DASHBOARD_REFRESH_SECONDS))
+    yield
+    if refresher is not None:
+        refresher.cancel()
+        with suppress(asyncio.CancelledError):
+            await refresher
+    if async_engine is not None:
+        await async_engine.dispose()
+    shutdown_logging()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Online Kurs Platformasi",
     description="Foydalanuvchilar ro'yxatdan o'tib, onlayn kurslarga yozilishi, video darslarni ko'rishi va izoh qoldirishi mumkin bo'lgan platforma",
     version="1.0.0"
@@ -50,6 +82,14 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+# Кэш ответов публичного каталога (ETag/304); внутри CORS, чтобы заголовки CORS
+# добавлялись и к ответам из кэша
+app.add_middleware(
+    ResponseCacheMiddleware,
+    cache=catalog_cache,
+    paths=["/api/courses/", "/api/courses/{id}", "/api/lessons/"],
+)
+
 # CORS настройки
 app.add_middleware(
     CORSMiddleware,
@@ -57,8 +97,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Курсор следующей страницы списков (keyset пагинация)
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Количество, время и размер ответов по маршрутам; снаружи кэша, чтобы учитывались
+# и ответы из кэша
+app.add_middleware(MetricsMiddleware)
+
+# Контекст запроса для логов (id, путь) и журнал запросов; снаружи всех middleware,
+# чтобы время и статус учитывали ответы из кэша и CORS
+app.add_middleware(LoggingMiddleware)
+
+# Количество и время SQL запросов на HTTP запрос (Server-Timing, журнал запросов);
+# снаружи LoggingMiddleware, чтобы статистика попадала в журнал запросов
+app.add_middleware(QueryStatsMiddleware)
+
 # Монтирование статических файлов
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
@@ -78,5 +132,12 @@ app.include_router(admin_ui.router)
 def read_root():
     return {"message": "Welcome to Online Kurs Platformasi API"}
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics(authorization: Optional[str] = Header(None)):
+    """Метрики процесса в текстовом формате Prometheus"""
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен метрик")
+    return PlainTextResponse(REGISTRY.render_text(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
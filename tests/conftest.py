@@ -1,12 +1,22 @@
+import os
+
+# Фоновое обновление статистики дашборда в тестах выключено: снимок
+# вычисляется по запросу из тестовой БД
+os.environ.setdefault("DASHBOARD_REFRESH_SECONDS", "0")
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.database import Base, get_db
-from app.security import get_current_user, get_current_admin_user
+from app.security import get_current_user, get_current_admin_user, principal_cache, token_version_cache
 from app import models
+from app.dashboard import dashboard_cache
+from app.response_cache import catalog_cache
+from app.access import enrolled_courses_cache, lesson_course_cache
+from app import query_stats
 from main import app
 
 # Создание тестовой базы данных в памяти
@@ -18,6 +28,27 @@ engine = create_engine(
     poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Server-Timing, медленные запросы и бюджет запросов для тестовой БД
+query_stats.instrument_queries(engine)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(n): тест падает, если HTTP запрос выполнил больше n SQL запросов"
+    )
+
+
+@pytest.fixture(autouse=True)
+def query_budget(request, monkeypatch):
+    # Бюджет из маркера теста или переменной окружения QUERY_BUDGET
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is not None:
+        monkeypatch.setattr(query_stats, "QUERY_BUDGET", marker.args[0])
+    violations = []
+    monkeypatch.setattr(query_stats, "budget_violations", violations)
+    yield violations
+    if violations:
+        pytest.fail(f"Превышен бюджет SQL запросов ({query_stats.QUERY_BUDGET}): {violations}")
 
 
 @pytest.fixture(scope="function")
@@ -45,8 +76,15 @@ def client(db):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    # Кэш пользователей живет в процессе, а БД пересоздается для каждого теста
+    principal_cache.clear()
+    token_version_cache.clear()
+    dashboard_cache.clear()
+    catalog_cache.clear()
+    enrolled_courses_cache.clear()
+    lesson_course_cache.clear()
     
-    with TestClient(app) as client:
+    with TestClient(app, base_url="http://testserver/api") as client:
         yield client
     
     # Сброс переопределений после тестов
@@ -157,3 +195,30 @@ def test_lesson(db, test_course):
     db.refresh(lesson)
     
     return lesson
+
+
+@pytest.fixture(scope="function")
+def admin_lesson(db, test_admin):
+    # Урок курса, автор которого — администратор (test_user на него не записан)
+    course = models.Course(title="Admin Course", description="Admin course", author_id=test_admin.id)
+    db.add(course)
+    db.commit()
+    lesson = models.Lesson(course_id=course.id, title="Admin Lesson", video_url="https://example.com/admin.mp4",
+                            content="Content", order=1)
+    db.add(lesson)
+    db.commit()
+    db.refresh(lesson)
+    return lesson
+
+
+@pytest.fixture
+def query_counter():
+    # Список SQL запросов, выполненных к тестовой БД за время теста
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", count)
@@ -0,0 +1,57 @@
+from fastapi import status
+
+from app import models
+
+
+def test_access_checked_with_one_cached_query(authorized_client, admin_lesson, test_user, db, query_counter):
+    """Тест: доступ слушателя проверяется одним запросом, повторная проверка берется из кэша"""
+    db.add(models.Enrollment(user_id=test_user.id, course_id=admin_lesson.course_id))
+    db.commit()
+    query_counter.clear()
+    assert authorized_client.get(f"/comments/lesson/{admin_lesson.id}").status_code == status.HTTP_200_OK
+    access_queries = [sql for sql in query_counter if "enrollments" in sql]
+    assert len(access_queries) == 1
+    assert "JOIN courses" in access_queries[0]
+
+    query_counter.clear()
+    assert authorized_client.get(f"/comments/lesson/{admin_lesson.id}").status_code == status.HTTP_200_OK
+    assert not [sql for sql in query_counter if "enrollments" in sql]
+
+
+def test_access_not_enrolled_and_enroll(authorized_client, admin_lesson):
+    """Тест: без записи на курс доступ запрещен, после записи открывается сразу"""
+    response = authorized_client.get(f"/comments/lesson/{admin_lesson.id}")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.json()["detail"] == "Вы не записаны на этот курс"
+    assert authorized_client.get(f"/lessons/{admin_lesson.id}").status_code == status.HTTP_403_FORBIDDEN
+    assert authorized_client.get(f"/ratings/lesson/{admin_lesson.id}").status_code == status.HTTP_403_FORBIDDEN
+
+    assert authorized_client.post(f"/courses/enroll/{admin_lesson.course_id}").status_code == status.HTTP_200_OK
+
+    assert authorized_client.get(f"/comments/lesson/{admin_lesson.id}").status_code == status.HTTP_200_OK
+    assert authorized_client.get(f"/lessons/{admin_lesson.id}").status_code == status.HTTP_200_OK
+    response = authorized_client.post("/ratings/", json={"lesson_id": admin_lesson.id, "stars": 4})
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_enrollment_from_another_process_opens_access(authorized_client, admin_lesson, test_user, db):
+    """Тест: отказ в доступе не кэшируется, запись, сделанная в обход этого процесса, видна сразу"""
+    assert authorized_client.get(f"/lessons/{admin_lesson.id}").status_code == status.HTTP_403_FORBIDDEN
+
+    # Запись без enroll_in_course: кэш процесса не сбрасывается
+    db.add(models.Enrollment(user_id=test_user.id, course_id=admin_lesson.course_id))
+    db.commit()
+
+    assert authorized_client.get(f"/lessons/{admin_lesson.id}").status_code == status.HTTP_200_OK
+    response = authorized_client.post("/ratings/", json={"lesson_id": admin_lesson.id, "stars": 5})
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_access_lesson_not_found(authorized_client, test_lesson):
+    """Тест: несуществующий урок — 404, в том числе после удаления урока"""
+    assert authorized_client.get("/comments/lesson/999").status_code == status.HTTP_404_NOT_FOUND
+
+    assert authorized_client.get(f"/lessons/{test_lesson.id}").status_code == status.HTTP_200_OK
+    assert authorized_client.delete(f"/lessons/{test_lesson.id}").status_code == status.HTTP_204_NO_CONTENT
+    assert authorized_client.get(f"/lessons/{test_lesson.id}").status_code == status.HTTP_404_NOT_FOUND
+    assert authorized_client.get(f"/comments/lesson/{test_lesson.id}").status_code == status.HTTP_404_NOT_FOUND
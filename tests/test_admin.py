@@ -173,3 +173,150 @@ def test_get_active_users_admin(admin_client, test_user, test_lesson, db):
     
     # Проверка, что наш пользователь в списке активных
     assert any(user["id"] == test_user.id for user in data)
+
+
+def test_dashboard_stats_snapshot(admin_client, db, test_admin, monkeypatch):
+    """Тест снимка статистики дашборда: чтение из памяти и обновление по запросу"""
+    from app.dashboard import dashboard_cache
+    from app.models import Course
+
+    first = admin_client.get("/admin/stats/dashboard").json()
+    assert first["users_count"] == 1
+    assert first["courses_count"] == 0
+
+    db.add(Course(title="New Course", description="d", author_id=test_admin.id))
+    db.commit()
+
+    # Снимок не пересчитывается ни при чтении, ни при частом обновлении
+    assert admin_client.get("/admin/stats/dashboard").json() == first
+    assert admin_client.post("/admin/stats/dashboard/refresh").json() == first
+
+    monkeypatch.setattr(dashboard_cache, "min_refresh_interval", 0)
+    refreshed = admin_client.post("/admin/stats/dashboard/refresh").json()
+    assert refreshed["courses_count"] == 1
+    assert refreshed["computed_at"] > first["computed_at"]
+
+
+def test_dashboard_stats_requires_admin(authorized_client):
+    """Тест доступа к статистике дашборда без прав администратора"""
+    response = authorized_client.get("/admin/stats/dashboard")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def _seed_activity(db, test_user, test_lesson, comments, ratings_users):
+    """Комментарии пользователя и оценки урока от нескольких пользователей"""
+    from app.models import Comment, Rating, User
+    for i in range(comments):
+        db.add(Comment(user_id=test_user.id, lesson_id=test_lesson.id, text=f"Comment {i}"))
+    db.add(Rating(user_id=test_user.id, lesson_id=test_lesson.id, stars=5))
+    for i in range(ratings_users):
+        user = User(full_name=f"Rater {i}", email=f"rater{i}@example.com",
+                    hashed_password="not-a-real-hash", is_active=True)
+        db.add(user)
+        db.flush()
+        db.add(Rating(user_id=user.id, lesson_id=test_lesson.id, stars=3))
+    db.commit()
+
+
+def test_user_stats_counts_are_not_multiplied(admin_client, test_user, test_lesson, db):
+    """Тест: комментарии и оценки считаются независимо (без comments × ratings)"""
+    _seed_activity(db, test_user, test_lesson, comments=3, ratings_users=0)
+
+    data = admin_client.get("/admin/stats/users").json()
+    user_stat = next(u for u in data if u["user_id"] == test_user.id)
+    assert user_stat["total_comments"] == 3
+    assert user_stat["total_ratings"] == 1
+    assert user_stat["activity_count"] == 4
+
+    active = admin_client.get("/admin/stats/active-users").json()
+    assert active[0]["id"] == test_user.id
+
+
+def test_stats_sort_and_filter(admin_client, test_user, test_lesson, db):
+    """Тест серверной сортировки и фильтрации статистики"""
+    _seed_activity(db, test_user, test_lesson, comments=2, ratings_users=2)
+
+    response = admin_client.get("/admin/stats/users", params={"sort": "-activity_count", "min_activity": 1})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data[0]["user_id"] == test_user.id
+    assert all(u["activity_count"] >= 1 for u in data)
+    assert [u["activity_count"] for u in data] == sorted((u["activity_count"] for u in data), reverse=True)
+
+    response = admin_client.get("/admin/stats/courses", params={"min_rating": 3.5})
+    assert [c["average_rating"] for c in response.json()] == [3.7]
+
+    response = admin_client.get("/admin/stats/courses", params={"sort": "password"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_stats_streaming_export(admin_client, test_user, test_lesson, db):
+    """Тест потоковой выгрузки статистики в NDJSON и CSV"""
+    import csv
+    import io
+    import json
+    from app.models import User
+
+    _seed_activity(db, test_user, test_lesson, comments=1, ratings_users=2)
+
+    response = admin_client.get("/admin/stats/users", params={"format": "ndjson", "sort": "user_id"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == db.query(User).count()
+    assert rows == admin_client.get("/admin/stats/users", params={"sort": "user_id"}).json()
+
+    response = admin_client.get("/admin/stats/courses", params={"format": "csv"})
+    assert response.status_code == status.HTTP_200_OK
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert rows[0]["course_id"] == str(test_lesson.course_id)
+    assert rows[0]["total_ratings"] == "3"
+
+
+def test_stats_export_outlives_request_session(db, test_user, test_admin):
+    """Тест: выгрузка читает строки в своей сессии, закрытие сессии запроса ей не мешает"""
+    import asyncio
+    import json
+    from sqlalchemy.orm import Session
+    from app import stats
+
+    # После close() сессия больше не открывается (как закрытая сессия запроса)
+    request_session = Session(bind=db.get_bind(), close_resets_only=False)
+    response = stats.export_response(request_session, stats.user_stats_query(), stats.ExportFormat.ndjson, "users")
+    # Так ведут себя зависимости с yield в FastAPI 0.106–0.117
+    request_session.close()
+
+    async def read_body():
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    rows = [json.loads(line) for line in asyncio.run(read_body()).splitlines()]
+    assert {row["user_id"] for row in rows} == {test_user.id, test_admin.id}
+
+
+def test_lookup_prefix_search(admin_client, test_user, test_admin, test_course, test_lesson):
+    """Тест подсказок: поиск по началу строки без учета регистра, лимит и поиск по id"""
+    response = admin_client.get("/admin/lookup/users", params={"q": "TEST"})
+    assert response.status_code == status.HTTP_200_OK
+    assert {item["id"] for item in response.json()} == {test_user.id, test_admin.id}
+
+    # Совпадения по email после совпадений по имени
+    data = admin_client.get("/admin/lookup/users", params={"q": "testadmin@"}).json()
+    assert data == [{"id": test_admin.id, "label": f"{test_admin.full_name} ({test_admin.email})"}]
+
+    assert len(admin_client.get("/admin/lookup/users", params={"q": "test", "limit": 1}).json()) == 1
+    assert admin_client.get("/admin/lookup/users", params={"q": "est"}).json() == []
+
+    data = admin_client.get("/admin/lookup/courses", params={"q": "test c"}).json()
+    assert data == [{"id": test_course.id, "label": test_course.title}]
+
+    data = admin_client.get("/admin/lookup/lessons", params={"id": test_lesson.id}).json()
+    assert data == [{"id": test_lesson.id, "label": f"{test_lesson.title} ({test_course.title})"}]
+    assert admin_client.get("/admin/lookup/lessons", params={"course_id": test_course.id + 1}).json() == []
+
+
+def test_lookup_requires_admin(authorized_client):
+    """Тест: подсказки доступны только администраторам"""
+    response = authorized_client.get("/admin/lookup/users", params={"q": "test"})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
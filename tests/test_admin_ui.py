@@ -0,0 +1,80 @@
+import pytest
+
+from app import models
+
+
+@pytest.fixture
+def admin_ui_client(client, admin_token_headers):
+    # Административный интерфейс читает токен из cookie
+    client.cookies.set("access_token", admin_token_headers["Authorization"].split(" ")[1])
+    return client
+
+
+def _seed(db, admin, count):
+    """Курсы с уроками, записями, комментариями и оценками"""
+    for i in range(count):
+        course = models.Course(title=f"Course {i}", description="d", author_id=admin.id)
+        db.add(course)
+        db.flush()
+        lesson = models.Lesson(course_id=course.id, title=f"Lesson {i}", video_url="v", content="c", order=1)
+        db.add(lesson)
+        db.flush()
+        db.add_all([
+            models.Enrollment(user_id=admin.id, course_id=course.id),
+            models.Comment(user_id=admin.id, lesson_id=lesson.id, text=f"Comment {i}"),
+            models.Rating(user_id=admin.id, lesson_id=lesson.id, stars=i % 5 + 1),
+        ])
+    db.commit()
+
+
+def _count_queries(client, counter, path, limit):
+    counter.clear()
+    response = client.get(f"http://testserver/admin/{path}", params={"limit": limit})
+    assert response.status_code == 200
+    return len(counter)
+
+
+@pytest.mark.parametrize("path", ["courses", "lessons", "comments", "ratings", "enrollments"])
+def test_admin_pages_query_count_is_constant(admin_ui_client, db, test_admin, query_counter, path):
+    """Тест отсутствия N+1: число запросов не зависит от размера страницы"""
+    _seed(db, test_admin, 12)
+
+    small_page = _count_queries(admin_ui_client, query_counter, path, 2)
+    large_page = _count_queries(admin_ui_client, query_counter, path, 12)
+
+    assert small_page == large_page
+
+
+def test_admin_courses_aggregates(admin_ui_client, db, test_admin):
+    """Тест агрегатов на странице курсов"""
+    _seed(db, test_admin, 3)
+
+    response = admin_ui_client.get("http://testserver/admin/courses")
+
+    assert response.status_code == 200
+    assert "Course 2" in response.text
+    assert test_admin.full_name in response.text
+
+
+def test_admin_dashboard_served_from_snapshot(admin_ui_client, db, test_admin, query_counter):
+    """Тест дашборда: статистика вычисляется один раз и далее читается из памяти"""
+    _seed(db, test_admin, 3)
+
+    first = _count_queries(admin_ui_client, query_counter, "dashboard", 10)
+    second = _count_queries(admin_ui_client, query_counter, "dashboard", 10)
+
+    # Повторная загрузка выполняет только проверку администратора
+    assert second == 1
+    assert first > second
+
+
+def test_admin_pages_do_not_render_all_users(admin_ui_client, db, test_admin):
+    """Тест: выпадающие списки не выгружают всех пользователей, варианты загружаются через lookup"""
+    db.add(models.User(full_name="Dropdown User", email="dropdown@example.com", hashed_password="x"))
+    db.commit()
+
+    for path in ("courses", "enrollments"):
+        response = admin_ui_client.get(f"http://testserver/admin/{path}")
+        assert response.status_code == 200
+        assert "dropdown@example.com" not in response.text
+        assert 'data-lookup="users"' in response.text
@@ -0,0 +1,101 @@
+from app import models
+from app.aggregates import reconcile
+
+
+def _snapshot(db):
+    db.expire_all()
+    courses = {
+        row.course_id: (row.lesson_count, row.enrollment_count, row.comment_count, row.rating_sum, row.rating_count)
+        for row in db.query(models.CourseStats).all()
+    }
+    lessons = {
+        row.lesson_id: (row.comment_count, row.rating_sum, row.rating_count)
+        for row in db.query(models.LessonStats).all()
+    }
+    return courses, lessons
+
+
+def _rebuilt(db):
+    reconcile(db.connection())
+    db.commit()
+    return _snapshot(db)
+
+
+def test_counters_follow_writes(db, test_user, test_course, test_lesson):
+    """Тест инкрементального обновления счетчиков при записи"""
+    other = models.Lesson(course_id=test_course.id, title="Second", video_url="v", content="c", order=2)
+    db.add_all([
+        other,
+        models.Enrollment(user_id=test_user.id, course_id=test_course.id),
+        models.Comment(user_id=test_user.id, lesson_id=test_lesson.id, text="first"),
+        models.Comment(user_id=test_user.id, lesson_id=test_lesson.id, text="second"),
+        models.Rating(user_id=test_user.id, lesson_id=test_lesson.id, stars=4),
+    ])
+    db.commit()
+
+    courses, lessons = _snapshot(db)
+    assert courses[test_course.id] == (2, 1, 2, 4, 1)
+    assert lessons[test_lesson.id] == (2, 4, 1)
+    assert lessons[other.id] == (0, 0, 0)
+
+    # Изменение оценки учитывает разницу между старым и новым значением
+    rating = db.query(models.Rating).one()
+    rating.stars = 2
+    db.commit()
+    assert db.get(models.LessonStats, test_lesson.id).average_rating == 2
+
+    db.delete(db.query(models.Comment).first())
+    db.delete(rating)
+    db.commit()
+    snapshot = _snapshot(db)
+    assert snapshot[0][test_course.id] == (2, 1, 1, 0, 0)
+    assert snapshot == _rebuilt(db)
+
+
+def test_counters_removed_with_course(db, test_user, test_course, test_lesson):
+    """Тест удаления счетчиков вместе с курсом и его уроками"""
+    db.add(models.Rating(user_id=test_user.id, lesson_id=test_lesson.id, stars=5))
+    db.commit()
+
+    db.delete(test_course)
+    db.commit()
+
+    assert _snapshot(db) == ({}, {})
+
+
+def test_reconcile_counts_rows_written_outside_orm(db, test_user, test_course, test_lesson):
+    """Тест пересчета после записей в обход событий ORM"""
+    db.execute(models.Comment.__table__.insert().values(user_id=test_user.id, lesson_id=test_lesson.id, text="SQL"))
+    db.commit()
+    assert _snapshot(db)[1][test_lesson.id] == (0, 0, 0)
+
+    courses, lessons = _rebuilt(db)
+
+    assert lessons[test_lesson.id] == (1, 0, 0)
+    assert courses[test_course.id] == (1, 0, 1, 0, 0)
+
+
+def test_triggers_count_ratings_and_enrollments_written_outside_orm(db, test_user, test_course, test_lesson):
+    """Тест: счетчики оценок и записей поддерживаются триггерами и для SQL в обход ORM"""
+    db.execute(models.Enrollment.__table__.insert().values(user_id=test_user.id, course_id=test_course.id))
+    db.execute(models.Rating.__table__.insert().values(user_id=test_user.id, lesson_id=test_lesson.id, stars=3))
+    db.execute(models.Rating.__table__.update().values(stars=5))
+    db.commit()
+
+    assert _snapshot(db) == _rebuilt(db)
+    assert _snapshot(db)[0][test_course.id] == (1, 1, 0, 5, 1)
+
+
+def test_lesson_average_uses_counters(authorized_client, db, test_user, test_course, test_lesson):
+    """Тест чтения среднего рейтинга из счетчиков"""
+    db.add_all([
+        models.Enrollment(user_id=test_user.id, course_id=test_course.id),
+        models.Rating(user_id=test_user.id, lesson_id=test_lesson.id, stars=3),
+    ])
+    db.commit()
+
+    response = authorized_client.get(f"/ratings/lesson/{test_lesson.id}/average")
+
+    assert response.status_code == 200
+    assert response.json() == 3.0
+    assert authorized_client.get(f"/lessons/{test_lesson.id}").json()["average_rating"] == 3.0
@@ -0,0 +1,117 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base, get_db, get_async_db
+from app.security import get_password_hash, principal_cache, token_version_cache
+from main import app
+
+pytest.importorskip("aiosqlite")
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+
+@pytest.fixture(scope="function")
+def async_client(tmp_path):
+    # Общая файловая БД для синхронной и асинхронной сессий
+    path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    SyncSession = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    db = SyncSession()
+    user = models.User(
+        full_name="Async User",
+        email="asyncuser@example.com",
+        hashed_password=get_password_hash("testpassword"),
+        is_active=True,
+        is_admin=False
+    )
+    db.add(user)
+    db.commit()
+    course = models.Course(title="Async Course", description="Served by AsyncSession", author_id=user.id)
+    db.add(course)
+    db.commit()
+    lesson = models.Lesson(course_id=course.id, title="Async Lesson", video_url="https://example.com/a.mp4", content="content", order=1)
+    db.add(lesson)
+    db.commit()
+    db.add_all([
+        models.Enrollment(user_id=user.id, course_id=course.id),
+        models.Comment(user_id=user.id, lesson_id=lesson.id, text="Async comment"),
+        models.Rating(user_id=user.id, lesson_id=lesson.id, stars=4),
+    ])
+    db.commit()
+    ids = {"course_id": course.id, "lesson_id": lesson.id}
+    db.close()
+
+    def override_get_db():
+        session = SyncSession()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def override_get_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    principal_cache.clear()
+    token_version_cache.clear()
+
+    with TestClient(app, base_url="http://testserver/api") as client:
+        response = client.post(
+            "/auth/token",
+            data={"username": "asyncuser@example.com", "password": "testpassword"}
+        )
+        client.headers.update({"Authorization": f"Bearer {response.json()['access_token']}"})
+        yield client, ids
+
+    app.dependency_overrides = {}
+    sync_engine.dispose()
+
+
+def test_async_get_courses(async_client):
+    """Тест списка курсов через AsyncSession"""
+    client, ids = async_client
+    response = client.get("/courses/?search=Async")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [course["id"] for course in data] == [ids["course_id"]]
+
+
+def test_async_get_course_with_lessons(async_client):
+    """Тест получения курса с уроками и автором через AsyncSession"""
+    client, ids = async_client
+    response = client.get(f"/courses/{ids['course_id']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["author"]["email"] == "asyncuser@example.com"
+    assert [lesson["id"] for lesson in data["lessons"]] == [ids["lesson_id"]]
+
+
+def test_async_get_lesson(async_client):
+    """Тест получения урока с комментариями и рейтингом через AsyncSession"""
+    client, ids = async_client
+    response = client.get(f"/lessons/{ids['lesson_id']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["average_rating"] == 4.0
+    assert [comment["text"] for comment in data["comments"]] == ["Async comment"]
+
+
+def test_async_get_lesson_comments(async_client):
+    """Тест списка комментариев через AsyncSession"""
+    client, ids = async_client
+    response = client.get(f"/comments/lesson/{ids['lesson_id']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [comment["text"] for comment in response.json()] == ["Async comment"]
@@ -64,3 +64,97 @@ def test_login_incorrect_credentials(client):
     
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
     assert "Неверный email или пароль" in response.json()["detail"]
+
+
+def test_token_contains_user_claims(client, test_user):
+    """Тест claims токена: id, роль, статус и версия токенов"""
+    from app.security import decode_token
+
+    response = client.post(
+        "/auth/token",
+        data={"username": "testuser@example.com", "password": "testpassword"}
+    )
+    token_data, payload = decode_token(response.json()["access_token"])
+
+    assert token_data.id == test_user.id
+    assert token_data.is_admin is False
+    assert token_data.is_active is True
+    assert token_data.token_version == 0
+
+
+def test_principal_from_claims_without_user_query(authorized_client, db):
+    """Тест авторизации по claims: таблица users не запрашивается"""
+    from sqlalchemy import event
+    from tests.conftest import engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = authorized_client.get("/ratings/my")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert not any("FROM users" in statement for statement in statements)
+
+
+def test_newer_token_version_checked_in_db(client, test_user, db):
+    """Тест: токен новее известной процессу версии проверяется по БД"""
+    from app.security import create_user_access_token, principal_cache, token_version_cache
+
+    token_version_cache.set(test_user.id, 0)
+    test_user.token_version = 1
+    db.commit()
+    token = create_user_access_token(test_user)
+
+    response = client.get("/ratings/my", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    # Пользователь был загружен из БД и попал в кэш
+    assert principal_cache.get(test_user.email).token_version == 1
+
+
+@pytest.mark.parametrize("path", ["/ratings/my", "/users/me"])
+def test_token_revoked_after_version_bump(client, test_user, db, path):
+    """Тест: токен, выданный до смены пароля или email, отклоняется обеими проверками"""
+    from app.security import (
+        bump_token_version, create_user_access_token, principal_cache, remember_token_version, token_version_cache,
+    )
+
+    headers = {"Authorization": f"Bearer {create_user_access_token(test_user)}"}
+    assert client.get(path, headers=headers).status_code == status.HTTP_200_OK
+
+    bump_token_version(test_user)
+    db.commit()
+    remember_token_version(test_user)
+    assert client.get(path, headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
+
+    # Без версии в кэше процесса токен тоже проверяется по БД
+    principal_cache.clear()
+    token_version_cache.clear()
+    assert client.get(path, headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_legacy_token_without_version_revoked_after_bump(client, test_user, db):
+    """Тест: токен старого формата без ver считается версией 0"""
+    from app.security import bump_token_version, create_access_token, invalidate_principal
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': test_user.email})}"}
+    assert client.get("/users/me", headers=headers).status_code == status.HTTP_200_OK
+
+    bump_token_version(test_user)
+    db.commit()
+    invalidate_principal(test_user.email)
+    assert client.get("/users/me", headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_password_change_revokes_previous_token(authorized_client):
+    """Тест: после смены пароля через /users/me прежний токен больше не действует"""
+    response = authorized_client.put("/users/me", json={"password": "newpassword"})
+    assert response.status_code == status.HTTP_200_OK
+
+    assert authorized_client.get("/users/me").status_code == status.HTTP_401_UNAUTHORIZED
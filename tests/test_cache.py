@@ -0,0 +1,46 @@
+import time
+
+from app.cache import TTLCache
+
+
+def test_cache_hit_and_miss():
+    """Тест попаданий и промахов кэша"""
+    cache = TTLCache(maxsize=10, ttl=60, name="test-hit-miss")
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache._hits.value == 1
+    assert cache._misses.value == 1
+
+
+def test_cache_lru_eviction():
+    """Тест вытеснения самой давно использованной записи"""
+    cache = TTLCache(maxsize=2, ttl=60, name="test-lru")
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_cache_ttl_expiry():
+    """Тест истечения срока жизни записи"""
+    cache = TTLCache(maxsize=10, ttl=60, name="test-ttl")
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_cache_pop():
+    """Тест явного удаления записи"""
+    cache = TTLCache(maxsize=10, ttl=60, name="test-pop")
+    cache.set("a", 1)
+
+    assert cache.pop("a") == 1
+    assert cache.get("a") is None
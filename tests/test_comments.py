@@ -29,12 +29,12 @@ def test_create_comment(authorized_client, test_lesson, test_user, db):
     assert "created_at" in data
 
 
-def test_create_comment_not_enrolled(authorized_client, test_lesson):
+def test_create_comment_not_enrolled(authorized_client, admin_lesson):
     """Тест создания комментария пользователем, не записанным на курс"""
     response = authorized_client.post(
         "/comments/",
         json={
-            "lesson_id": test_lesson.id,
+            "lesson_id": admin_lesson.id,
             "text": "This comment should not be created"
         }
     )
@@ -65,6 +65,38 @@ def test_get_specific_course(client, test_course):
     assert "lessons" in data  # Должен содержать список уроков
 
 
+def _add_course_with_lessons(db, author_id, orders):
+    from app.models import Course, Lesson
+    course = Course(title="Detail Course", description="Detail", author_id=author_id)
+    db.add(course)
+    db.flush()
+    db.add_all([
+        Lesson(course_id=course.id, title=f"Lesson {order}", video_url="https://example.com/v.mp4",
+               content="c", order=order)
+        for order in orders
+    ])
+    db.commit()
+    return course
+
+
+def test_get_specific_course_loads_relations_eagerly(client, db, test_user, query_counter):
+    """Тест: автор и упорядоченные уроки загружаются фиксированным числом запросов"""
+    small = _add_course_with_lessons(db, test_user.id, [1])
+    large = _add_course_with_lessons(db, test_user.id, [3, 1, 2, 5, 4])
+
+    query_counter.clear()
+    assert client.get(f"/courses/{small.id}").status_code == status.HTTP_200_OK
+    small_queries = len(query_counter)
+
+    query_counter.clear()
+    response = client.get(f"/courses/{large.id}")
+    assert len(query_counter) == small_queries
+
+    data = response.json()
+    assert [lesson["order"] for lesson in data["lessons"]] == [1, 2, 3, 4, 5]
+    assert data["author"]["id"] == test_user.id
+
+
 def test_update_course(authorized_client, test_course):
     """Тест обновления информации о курсе"""
     response = authorized_client.put(
@@ -171,3 +203,128 @@ def test_get_enrolled_courses(authorized_client, test_user, test_course, db):
     assert isinstance(data, list)
     assert len(data) == 1
     assert data[0]["id"] == test_course.id
+
+
+def test_enroll_twice_keeps_single_row(authorized_client, test_user, test_admin, db):
+    """Тест: повторная запись на курс не создает дубликат и не меняет счетчик"""
+    from app.models import Course, CourseStats, Enrollment
+    course = Course(title="Upsert Course", description="Upsert", author_id=test_admin.id)
+    db.add(course)
+    db.commit()
+
+    assert authorized_client.post(f"/courses/enroll/{course.id}").status_code == status.HTTP_200_OK
+    response = authorized_client.post(f"/courses/enroll/{course.id}")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    db.expire_all()
+    assert db.query(Enrollment).filter(Enrollment.course_id == course.id).count() == 1
+    assert db.get(CourseStats, course.id).enrollment_count == 1
+
+
+def test_enroll_without_on_conflict(db, test_user, test_course, monkeypatch):
+    """Тест: на СУБД без ON CONFLICT и триггеров запись на курс проверяется чтением, счетчик обновляется явно"""
+    from sqlalchemy import text
+    from app import aggregates, upserts
+    from app.models import CourseStats
+
+    monkeypatch.setattr(upserts, "_INSERTS", {})
+    monkeypatch.setattr(aggregates, "TRIGGER_DIALECTS", ())
+    for trigger in ("enrollments_stats_ai", "enrollments_stats_au", "enrollments_stats_ad"):
+        db.execute(text(f"DROP TRIGGER {trigger}"))
+
+    assert upserts.insert_enrollment(db, test_user.id, test_course.id) is not None
+    db.commit()
+    assert upserts.insert_enrollment(db, test_user.id, test_course.id) is None
+    db.commit()
+
+    stats = db.get(CourseStats, test_course.id)
+    db.refresh(stats)
+    assert stats.enrollment_count == 1
+
+
+def _lesson_payload(i):
+    return {
+        "title": f"Bulk Lesson {i}",
+        "video_url": f"https://example.com/bulk-{i}.mp4",
+        "content": f"Bulk lesson content {i}",
+        "order": i,
+    }
+
+
+def test_create_lessons_bulk(authorized_client, test_course, test_lesson, db, query_counter):
+    """Тест массовой загрузки уроков: один INSERT, счетчики и кэш каталога обновлены"""
+    from app.models import CourseStats, LessonStats
+
+    assert len(authorized_client.get(f"/courses/{test_course.id}").json()["lessons"]) == 1
+
+    query_counter.clear()
+    response = authorized_client.post(
+        f"/courses/{test_course.id}/lessons:bulk",
+        json={"lessons": [_lesson_payload(i) for i in range(2, 52)]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [lesson["title"] for lesson in data] == [f"Bulk Lesson {i}" for i in range(2, 52)]
+    assert all(lesson["course_id"] == test_course.id for lesson in data)
+    assert len([sql for sql in query_counter if sql.startswith("INSERT INTO lessons")]) == 1
+
+    db.expire_all()
+    assert db.get(CourseStats, test_course.id).lesson_count == 51
+    assert db.get(LessonStats, data[-1]["id"]) is not None
+    assert len(authorized_client.get(f"/courses/{test_course.id}").json()["lessons"]) == 51
+
+
+def test_create_lessons_bulk_forbidden(authorized_client, test_admin, db):
+    """Тест: массово добавлять уроки может только автор курса или администратор"""
+    from app.models import Course
+    course = Course(title="Foreign Course", description="Foreign", author_id=test_admin.id)
+    db.add(course)
+    db.commit()
+
+    response = authorized_client.post(f"/courses/{course.id}/lessons:bulk", json={"lessons": [_lesson_payload(1)]})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = authorized_client.post("/courses/999/lessons:bulk", json={"lessons": [_lesson_payload(1)]})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_reorder_course_lessons(authorized_client, test_course, test_lesson, query_counter):
+    """Тест изменения порядка уроков одним UPDATE"""
+    created = authorized_client.post(
+        f"/courses/{test_course.id}/lessons:bulk",
+        json={"lessons": [_lesson_payload(i) for i in range(2, 5)]}
+    ).json()
+    lesson_ids = [lesson["id"] for lesson in reversed(created)] + [test_lesson.id]
+
+    query_counter.clear()
+    response = authorized_client.patch(f"/courses/{test_course.id}/lessons/order", json={"lesson_ids": lesson_ids})
+    assert response.status_code == status.HTTP_200_OK
+    assert [lesson["id"] for lesson in response.json()] == lesson_ids
+    assert [lesson["order"] for lesson in response.json()] == [1, 2, 3, 4]
+    assert len([sql for sql in query_counter if sql.startswith("UPDATE lessons")]) == 1
+
+    lessons = authorized_client.get("/lessons/", params={"course_id": test_course.id}).json()
+    assert [lesson["id"] for lesson in lessons] == lesson_ids
+
+    # Не все уроки курса, повторы и чужие уроки отклоняются
+    url = f"/courses/{test_course.id}/lessons/order"
+    assert authorized_client.patch(url, json={"lesson_ids": lesson_ids[:-1]}).status_code == status.HTTP_400_BAD_REQUEST
+    assert authorized_client.patch(url, json={"lesson_ids": lesson_ids[:-1] + lesson_ids[:1]}).status_code == status.HTTP_400_BAD_REQUEST
+    assert authorized_client.patch(url, json={"lesson_ids": lesson_ids[:-1] + [999]}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_reorder_ignores_lesson_counter(authorized_client, test_course, test_lesson, db):
+    """Тест: полнота списка уроков проверяется по таблице lessons, а не по счетчику course_stats"""
+    from app.models import CourseStats, Lesson
+
+    other = Lesson(course_id=test_course.id, title="Second", video_url="v", content="c", order=2)
+    db.add(other)
+    db.commit()
+    # Счетчик разошелся с реальным числом уроков
+    db.get(CourseStats, test_course.id).lesson_count = 1
+    db.commit()
+
+    url = f"/courses/{test_course.id}/lessons/order"
+    assert authorized_client.patch(url, json={"lesson_ids": [test_lesson.id]}).status_code == status.HTTP_400_BAD_REQUEST
+    response = authorized_client.patch(url, json={"lesson_ids": [other.id, test_lesson.id]})
+    assert response.status_code == status.HTTP_200_OK
+    assert [lesson["id"] for lesson in response.json()] == [other.id, test_lesson.id]
@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.lookup import _starts_with
+from app.pagination import paginate
+from app.routers.comments import COMMENT_KEYSET
+from app.routers.lessons import LESSON_KEYSET
+from tests.conftest import engine
+
+
+def _query_plan(statement):
+    """EXPLAIN QUERY PLAN запроса в тестовой SQLite базе (строки detail)"""
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        return [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+HOT_QUERIES = {
+    "enrollment_access_check": select(models.Enrollment.id).where(
+        models.Enrollment.user_id == 1, models.Enrollment.course_id == 1
+    ).limit(1),
+    "rating_by_user_and_lesson": select(models.Rating).where(
+        models.Rating.user_id == 1, models.Rating.lesson_id == 1
+    ),
+    "lesson_comments_page": paginate(
+        select(models.Comment).where(models.Comment.lesson_id == 1), COMMENT_KEYSET, 20
+    ),
+    "course_lessons_page": paginate(
+        select(models.Lesson).where(models.Lesson.course_id == 1), LESSON_KEYSET, 20
+    ),
+    **{
+        f"lookup_{column.class_.__tablename__}_{column.key}": select(column.class_.id)
+        .where(_starts_with(column, "Ab", "sqlite")).order_by(func.lower(column)).limit(10)
+        for column in (models.User.full_name, models.User.email, models.Course.title, models.Lesson.title)
+    },
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_queries_use_index(db, name):
+    """Тест: горячие запросы ищут по индексу и не сортируют результат отдельно"""
+    plan = _query_plan(HOT_QUERIES[name])
+
+    assert any("USING INDEX" in step or "USING COVERING INDEX" in step for step in plan), plan
+    assert not any(step.startswith("SCAN") for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+@pytest.mark.parametrize("make_row", [
+    lambda user, lesson: models.Enrollment(user_id=user.id, course_id=lesson.course_id),
+    lambda user, lesson: models.Rating(user_id=user.id, lesson_id=lesson.id, stars=5),
+], ids=["enrollment", "rating"])
+def test_unique_constraints(db, test_user, test_lesson, make_row):
+    """Тест: повторная запись на курс и повторная оценка урока запрещены на уровне БД"""
+    db.add(make_row(test_user, test_lesson))
+    db.commit()
+
+    db.add(make_row(test_user, test_lesson))
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+
+def test_lookup_prefix_like_on_postgresql(db):
+    """Тест: вне SQLite префикс ищется через LIKE с экранированием и индексом text_pattern_ops"""
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateIndex
+
+    condition = _starts_with(models.Course.title, "50%_off", "postgresql")
+    sql = str(condition.compile(dialect=postgresql.dialect()))
+    assert "lower(courses.title) LIKE" in sql and "ESCAPE" in sql
+
+    db.add_all([
+        models.Course(title=title, description="d", author_id=None)
+        for title in ("50%_Off sale", "50% off", "500_off")
+    ])
+    db.commit()
+    # То же условие выполняется и в SQLite: % и _ в q не работают как шаблон
+    titles = db.scalars(select(models.Course.title).where(condition)).all()
+    assert titles == ["50%_Off sale"]
+
+    index = next(index for index in models.Course.__table__.indexes if index.name == "ix_courses_title_lower_pattern")
+    assert str(CreateIndex(index).compile(dialect=postgresql.dialect())).endswith("(lower(title) text_pattern_ops)")
+    assert "ix_courses_title_lower_pattern" not in {
+        row[0] for row in db.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))
+    }
@@ -97,10 +97,66 @@ def test_get_specific_lesson(authorized_client, test_lesson, db):
     assert "average_rating" in data
 
 
-def test_get_lesson_not_enrolled(authorized_client, test_lesson):
+def test_get_specific_lesson_query_count(admin_client, test_lesson, test_user, db, query_counter):
+    """Тест: комментарии загружаются одним запросом независимо от их количества"""
+    from app.access import enrolled_courses_cache
+    from app.models import Comment
+
+    def lesson_queries():
+        # Проверка доступа кэшируется; сбрасываем, чтобы сравнивать одинаковые запросы
+        enrolled_courses_cache.clear()
+        query_counter.clear()
+        assert admin_client.get(f"/lessons/{test_lesson.id}").status_code == status.HTTP_200_OK
+        return len(query_counter)
+
+    db.add(Comment(user_id=test_user.id, lesson_id=test_lesson.id, text="First"))
+    db.commit()
+    one_comment = lesson_queries()
+
+    db.add_all([Comment(user_id=test_user.id, lesson_id=test_lesson.id, text=f"More {i}") for i in range(10)])
+    db.commit()
+    assert lesson_queries() == one_comment
+
+
+def test_get_specific_lesson_embeds_bounded_comments(admin_client, test_lesson, test_user, db):
+    """Тест: в ответ урока встраиваются только последние комментарии и курсор на остальные"""
+    from app.models import Comment
+
+    db.add_all([Comment(user_id=test_user.id, lesson_id=test_lesson.id, text=f"Comment {i}") for i in range(5)])
+    db.commit()
+
+    data = admin_client.get(f"/lessons/{test_lesson.id}", params={"comments_limit": 2}).json()
+    assert [comment["text"] for comment in data["comments"]] == ["Comment 4", "Comment 3"]
+    assert data["comments_count"] == 5
+    assert data["comments_next_cursor"]
+
+    rest = admin_client.get(f"/comments/lesson/{test_lesson.id}", params={"after": data["comments_next_cursor"]})
+    assert [comment["text"] for comment in rest.json()] == ["Comment 2", "Comment 1", "Comment 0"]
+
+    data = admin_client.get(f"/lessons/{test_lesson.id}", params={"comments_limit": 5}).json()
+    assert len(data["comments"]) == 5
+    assert data["comments_next_cursor"] is None
+
+    response = admin_client.get(f"/lessons/{test_lesson.id}", params={"comments_limit": 1000})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_loader_options_follow_response_schema():
+    """Тест построения опций загрузки по схеме ответа"""
+    from app import models, schemas
+    from app.loaders import loader_options
+
+    course_options = loader_options(models.Course, schemas.CourseWithLessons)
+    paths = sorted(str(option.path) for option in course_options)
+    assert len(course_options) == 2
+    assert any("lessons" in path for path in paths) and any("author" in path for path in paths)
+    assert loader_options(models.Lesson, schemas.LessonResponse) == ()
+
+
+def test_get_lesson_not_enrolled(authorized_client, admin_lesson):
     """Тест получения урока пользователем, не записанным на курс"""
     # Предполагается, что пользователь не записан на курс
-    response = authorized_client.get(f"/lessons/{test_lesson.id}")
+    response = authorized_client.get(f"/lessons/{admin_lesson.id}")
     
     assert response.status_code == status.HTTP_403_FORBIDDEN
     assert "Вы не записаны на этот курс" in response.json()["detail"]
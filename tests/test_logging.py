@@ -0,0 +1,75 @@
+import io
+import json
+import logging
+
+from fastapi import status
+
+from app.log import RequestContextFilter, parse_sampling, request_path_var, setup_logging, shutdown_logging
+
+
+def _capture_logs():
+    # Клиент уже настроил вывод в stdout; перенастраиваем вывод в буфер
+    shutdown_logging()
+    stream = io.StringIO()
+    setup_logging(stream=stream, level="INFO", format="json", sampling={})
+    return stream
+
+
+def _records(stream):
+    # Остановка фонового потока выводит все записи из очереди
+    shutdown_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_logs_are_json_with_request_context(client):
+    """Тест: записи в JSON с id и путем запроса, журнал запросов со статусом и временем"""
+    stream = _capture_logs()
+    response = client.post("/auth/register", json={
+        "full_name": "Logged User",
+        "email": "logged@example.com",
+        "password": "password123",
+    })
+    assert response.status_code == status.HTTP_200_OK
+    records = _records(stream)
+
+    registered = next(record for record in records if record["message"] == "Зарегистрирован пользователь")
+    assert registered["user_id"] == response.json()["id"]
+    assert registered["path"] == "/api/auth/register"
+    assert registered["logger"] == "app.routers.auth"
+
+    access = next(record for record in records if record["logger"] == "app.access")
+    assert access["method"] == "POST"
+    assert access["status"] == status.HTTP_200_OK
+    assert access["duration_ms"] >= 0
+    assert access["request_id"] == registered["request_id"]
+
+
+def test_admin_logs_do_not_leak_tokens(client, admin_token_headers):
+    """Тест: административный вход не пишет токен в логи"""
+    token = admin_token_headers["Authorization"].split(" ")[1]
+    stream = _capture_logs()
+    response = client.post("http://testserver/admin/dashboard-redirect", headers=admin_token_headers)
+    assert response.status_code == status.HTTP_200_OK
+    client.get("http://testserver/admin/dashboard", cookies={"access_token": token})
+    records = _records(stream)
+
+    assert any(record["message"] == "Вход в административную панель" for record in records)
+    assert token[:10] not in json.dumps(records, ensure_ascii=False)
+
+
+def test_sampling_by_path():
+    """Тест прореживания: записи ниже WARNING отбрасываются по префиксу пути, предупреждения остаются"""
+    assert parse_sampling("/api/courses=0, /api=0.5") == {"/api/courses": 0.0, "/api": 0.5}
+    sampler = RequestContextFilter(parse_sampling("/api/courses=0,/api=1"))
+
+    def passes(path, level):
+        token = request_path_var.set(path)
+        try:
+            return sampler.filter(logging.LogRecord("app", level, "", 0, "message", (), None))
+        finally:
+            request_path_var.reset(token)
+
+    assert not passes("/api/courses/1", logging.INFO)
+    assert passes("/api/courses/1", logging.WARNING)
+    assert passes("/api/lessons/1", logging.INFO)
+    assert passes(None, logging.INFO)
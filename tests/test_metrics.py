@@ -0,0 +1,60 @@
+from fastapi import status
+
+from app.metrics import PROMETHEUS_CONTENT_TYPE, Counter, Histogram, Registry, REGISTRY
+
+
+def _requests(route, method="GET", code=200):
+    return REGISTRY.get("http_requests").labels(route, method, code).value
+
+
+def test_render_text_prometheus_format():
+    """Тест текстового формата Prometheus: HELP/TYPE, экранирование меток, корзины гистограмм"""
+    registry = Registry()
+    counter = Counter("jobs", "Задачи\nпо очереди", labelnames=("queue",), registry=registry)
+    counter.labels('say "hi"\\').inc(2)
+    histogram = Histogram("latency_seconds", "Время", buckets=(0.1, 1.0), registry=registry)
+    histogram.observe(0.5)
+
+    assert registry.render_text().splitlines() == [
+        "# HELP jobs Задачи\\nпо очереди",
+        "# TYPE jobs counter",
+        'jobs_total{queue="say \\"hi\\"\\\\"} 2.0',
+        "# HELP latency_seconds Время",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 0.0',
+        'latency_seconds_bucket{le="1.0"} 1.0',
+        'latency_seconds_bucket{le="+Inf"} 1.0',
+        "latency_seconds_sum 0.5",
+        "latency_seconds_count 1.0",
+    ]
+
+
+def test_requests_recorded_by_route_template(client, test_course):
+    """Тест: метка route — шаблон маршрута, в том числе для ответов из кэша каталога"""
+    detail = "/api/courses/{course_id}"
+    before = _requests(detail)
+    unmatched_before = _requests("unmatched", code=404)
+
+    assert client.get(f"/courses/{test_course.id}").headers["x-cache"] == "MISS"
+    assert client.get(f"/courses/{test_course.id}").headers["x-cache"] == "HIT"
+    client.get("http://testserver/no-such-page")
+
+    assert _requests(detail) == before + 2
+    assert _requests("unmatched", code=404) == unmatched_before + 1
+    sizes = REGISTRY.get("http_response_size_bytes").labels(detail, "GET")
+    assert sizes.sum > 0
+
+    response = client.get("http://testserver/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == PROMETHEUS_CONTENT_TYPE
+    assert f'http_request_duration_seconds_count{{route="{detail}",method="GET",status="200"}}' in response.text
+    assert "http_requests_in_progress 1.0" in response.text
+
+
+def test_metrics_token(client, monkeypatch):
+    """Тест: при заданном METRICS_TOKEN метрики доступны только с этим токеном"""
+    monkeypatch.setattr("main.METRICS_TOKEN", "scrape-secret")
+
+    assert client.get("http://testserver/metrics").status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.get("http://testserver/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == status.HTTP_200_OK
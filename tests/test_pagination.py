@@ -0,0 +1,96 @@
+from fastapi import status
+
+from app import models
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+
+
+def _walk(client, path, limit, **params):
+    """Обход всех страниц списка по курсору"""
+    pages, after = [], None
+    while True:
+        query = {"limit": limit, **params}
+        if after:
+            query["after"] = after
+        response = client.get(path, params=query)
+        assert response.status_code == status.HTTP_200_OK
+        pages.append(response.json())
+        after = response.headers.get(NEXT_CURSOR_HEADER)
+        if not after:
+            return pages
+
+
+def test_courses_cursor_pagination(client, db, test_user):
+    """Тест обхода курсов по курсору: без пропусков и повторов"""
+    db.add_all([models.Course(title=f"Course {i}", description="d", author_id=test_user.id) for i in range(7)])
+    db.commit()
+
+    pages = _walk(client, "/courses/", limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    ids = [course["id"] for page in pages for course in page]
+    assert ids == sorted(ids) and len(set(ids)) == 7
+
+
+def test_lessons_cursor_with_equal_order(client, db, test_course):
+    """Тест составного ключа (order, id), когда порядковые номера совпадают"""
+    db.add_all([
+        models.Lesson(course_id=test_course.id, title=f"Lesson {i}", video_url="v", content="c", order=i // 2)
+        for i in range(5)
+    ])
+    db.commit()
+
+    pages = _walk(client, "/lessons/", limit=2, course_id=test_course.id)
+
+    lessons = [(lesson["order"], lesson["id"]) for page in pages for lesson in page]
+    assert lessons == sorted(lessons) and len(lessons) == 5
+
+
+def test_lessons_without_order_stay_in_cursor_pages(authorized_client, db, test_course):
+    """Тест: урок, созданный с order = null, получает 0 и не выпадает из страниц по курсору"""
+    db.add_all([
+        models.Lesson(course_id=test_course.id, title=f"Lesson {i}", video_url="v", content="c", order=i)
+        for i in range(3)
+    ])
+    db.commit()
+    response = authorized_client.post("/lessons/", json={
+        "course_id": test_course.id, "title": "No order", "video_url": "v", "content": "c", "order": None,
+    })
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["order"] == 0
+
+    pages = _walk(authorized_client, "/lessons/", limit=2, course_id=test_course.id)
+
+    ids = [lesson["id"] for page in pages for lesson in page]
+    assert response.json()["id"] in ids and len(ids) == 4
+
+
+def test_comments_cursor_newest_first(authorized_client, db, test_user, test_lesson):
+    """Тест пагинации комментариев: новые первыми"""
+    db.add_all([models.Comment(user_id=test_user.id, lesson_id=test_lesson.id, text=f"c{i}") for i in range(5)])
+    db.commit()
+
+    pages = _walk(authorized_client, f"/comments/lesson/{test_lesson.id}", limit=2)
+
+    assert [comment["text"] for page in pages for comment in page] == ["c4", "c3", "c2", "c1", "c0"]
+
+
+def test_offset_mode_still_supported(client, db, test_user):
+    """Тест обратной совместимости параметра skip"""
+    db.add_all([models.Course(title=f"Course {i}", description="d", author_id=test_user.id) for i in range(4)])
+    db.commit()
+
+    response = client.get("/courses/", params={"skip": 2, "limit": 10})
+
+    assert [course["title"] for course in response.json()] == ["Course 2", "Course 3"]
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_invalid_cursor(client):
+    """Тест некорректного курсора и курсора вместе с поиском"""
+    assert client.get("/courses/", params={"after": "not-a-cursor"}).status_code == status.HTTP_400_BAD_REQUEST
+
+    keyset = ((models.Course.id, False),)
+    cursor = encode_cursor(models.Course(id=5), keyset)
+    assert decode_cursor(cursor, keyset) == [5]
+    response = client.get("/courses/", params={"after": cursor, "search": "python"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app import models, passwords
+from app.metrics import REGISTRY
+
+
+@pytest.fixture
+def small_pool():
+    passwords.configure_password_pool(workers=1, max_queue=0)
+    yield
+    passwords.configure_password_pool()
+
+
+def test_hash_and_verify_in_pool():
+    """Тест хеширования и проверки пароля через пул"""
+    duration = REGISTRY.get("password_hash_duration_seconds")
+    before = duration.count
+
+    hashed = passwords.get_password_hash("secret")
+
+    assert passwords.verify_password("secret", hashed)
+    assert not passwords.verify_password("wrong", hashed)
+    assert duration.count == before + 3
+
+
+def test_pool_rejects_when_queue_is_full(small_pool):
+    """Тест отказа с 503, когда все места в пуле и очереди заняты"""
+    release = threading.Event()
+    busy = passwords._submit(release.wait)
+    rejected = REGISTRY.get("password_hash_rejected").value
+
+    with pytest.raises(HTTPException) as exc_info:
+        passwords.get_password_hash("secret")
+
+    release.set()
+    busy.result()
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+    assert REGISTRY.get("password_hash_rejected").value == rejected + 1
+    assert passwords.get_password_hash("secret")
+
+
+
+def test_cancelled_queued_operation_releases_slot():
+    """Тест: отмена операции, ожидающей в очереди, возвращает место в пуле"""
+    passwords.configure_password_pool(workers=1, max_queue=1)
+    try:
+        depth = REGISTRY.get("password_hash_queue_depth")
+        started, release = threading.Event(), threading.Event()
+        busy = passwords._submit(lambda: started.set() or release.wait())
+        started.wait()
+        queued = passwords._submit(passwords.pwd_context.hash, "secret")
+        # Пул и очередь заполнены
+        with pytest.raises(HTTPException):
+            passwords._submit(passwords.pwd_context.hash, "secret")
+        depth_before = depth.value
+
+        assert queued.cancel()
+        release.set()
+        busy.result()
+
+        assert depth.value == depth_before - 1
+        # Оба места снова свободны
+        assert passwords._slots.acquire(blocking=False)
+        assert passwords._slots.acquire(blocking=False)
+    finally:
+        passwords.configure_password_pool()
+
+
+def test_rehash_on_login_when_cost_changes(client, db, monkeypatch):
+    """Тест пересчета хеша при входе после изменения стоимости bcrypt"""
+    old_context = passwords.build_password_context(schemes=["bcrypt"], bcrypt_rounds=4)
+    user = models.User(
+        full_name="Rehash User",
+        email="rehash@example.com",
+        hashed_password=old_context.hash("testpassword"),
+        is_active=True,
+        is_admin=False
+    )
+    db.add(user)
+    db.commit()
+    monkeypatch.setattr(passwords, "pwd_context", passwords.build_password_context(schemes=["bcrypt"], bcrypt_rounds=5))
+
+    response = client.post("/auth/token", data={"username": "rehash@example.com", "password": "testpassword"})
+
+    assert response.status_code == 200
+    db.refresh(user)
+    assert user.hashed_password.startswith("$2b$05$")
+    assert user.token_version == 0
+    assert passwords.verify_password("testpassword", user.hashed_password)
+
+
+def test_legacy_scheme_is_upgraded(monkeypatch):
+    """Тест перехода на argon2id: старые bcrypt хеши проверяются и пересчитываются"""
+    pytest.importorskip("argon2")
+    legacy = passwords.build_password_context(schemes=["bcrypt"], bcrypt_rounds=4).hash("secret")
+    monkeypatch.setattr(passwords, "pwd_context", passwords.build_password_context(
+        schemes=["argon2", "bcrypt"], bcrypt_rounds=4,
+        argon2_time_cost=1, argon2_memory_cost=1024, argon2_parallelism=1,
+    ))
+
+    verified, new_hash = passwords.verify_and_update_password("secret", legacy)
+
+    assert verified
+    assert new_hash.startswith("$argon2id$")
+    assert passwords.verify_and_update_password("secret", new_hash) == (True, None)
@@ -0,0 +1,79 @@
+import logging
+
+import pytest
+from fastapi import status
+
+from app import query_stats
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _server_timing(response):
+    metric, *params = response.headers["server-timing"].split(";")
+    assert metric == "db"
+    return {name: float(value) for name, value in (param.split("=") for param in params)}
+
+
+@pytest.mark.query_budget(5)
+def test_server_timing_counts_request_queries(client, test_course, query_counter):
+    """Тест: Server-Timing содержит число и время SQL запросов обработчика"""
+    query_counter.clear()
+    response = client.get(f"/courses/{test_course.id}")
+    assert response.status_code == status.HTTP_200_OK
+
+    timing = _server_timing(response)
+    assert timing["count"] == len(query_counter) > 0
+    assert timing["dur"] > 0
+
+    # Ответ из кэша каталога не обращается к БД
+    cached = client.get(f"/courses/{test_course.id}")
+    assert _server_timing(cached) == {"dur": 0.0, "count": 0}
+
+
+def _slow_course_query(client, course_id, monkeypatch):
+    monkeypatch.setattr(query_stats, "SLOW_QUERY_MS", 1e-6)
+    handler = _ListHandler()
+    query_stats.logger.addHandler(handler)
+    try:
+        client.get(f"/courses/{course_id}")
+    finally:
+        query_stats.logger.removeHandler(handler)
+    return next(
+        record for record in handler.records
+        if record.statement.lstrip().startswith("SELECT") and "FROM courses" in record.statement
+    )
+
+
+def test_slow_queries_logged_with_plan(client, test_course, monkeypatch):
+    """Тест: запросы дольше порога пишутся в лог с планом выполнения, но без параметров"""
+    course_query = _slow_course_query(client, test_course.id, monkeypatch)
+
+    assert not hasattr(course_query, "params")
+    assert "courses" in course_query.plan
+    assert course_query.duration_ms > 0
+
+
+def test_slow_query_params_logged_when_enabled(client, test_course, monkeypatch):
+    """Тест: параметры медленных запросов пишутся в лог только при SLOW_QUERY_LOG_PARAMS"""
+    monkeypatch.setattr(query_stats, "SLOW_QUERY_LOG_PARAMS", True)
+    course_query = _slow_course_query(client, test_course.id, monkeypatch)
+
+    assert str(test_course.id) in course_query.params
+
+
+def test_query_budget_violation_recorded(client, test_course, monkeypatch, query_budget):
+    """Тест: HTTP запрос сверх бюджета SQL запросов отмечается как нарушение"""
+    monkeypatch.setattr(query_stats, "QUERY_BUDGET", 1)
+    client.get(f"/courses/{test_course.id}")
+
+    assert query_budget == [("GET", f"/api/courses/{test_course.id}", query_budget[0][2])]
+    assert query_budget[0][2] > 1
+    # Нарушение ожидаемо, тест не должен падать
+    query_budget.clear()
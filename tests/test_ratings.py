@@ -241,3 +241,47 @@ def test_delete_rating(authorized_client, test_lesson, test_user, db):
     # Проверка, что оценка действительно удалена
     deleted_rating = db.query(Rating).filter(Rating.id == rating.id).first()
     assert deleted_rating is None
+
+
+def test_rating_upsert_single_write(authorized_client, test_lesson, test_user, db, query_counter):
+    """Тест: оценка записывается одним INSERT ... ON CONFLICT без предварительного чтения"""
+    from app.models import Enrollment, LessonStats, Rating
+    db.add(Enrollment(user_id=test_user.id, course_id=test_lesson.course_id))
+    db.commit()
+
+    for stars in (2, 4):
+        query_counter.clear()
+        response = authorized_client.post("/ratings/", json={"lesson_id": test_lesson.id, "stars": stars})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["stars"] == stars
+        rating_statements = [sql for sql in query_counter if "ratings" in sql]
+        assert len(rating_statements) == 1
+        assert "ON CONFLICT" in rating_statements[0]
+
+    db.expire_all()
+    assert db.query(Rating).filter(Rating.lesson_id == test_lesson.id).count() == 1
+    stats = db.get(LessonStats, test_lesson.id)
+    assert (stats.rating_sum, stats.rating_count) == (4, 1)
+
+
+def test_rating_upsert_without_on_conflict(db, test_lesson, test_user, monkeypatch):
+    """Тест: на СУБД без ON CONFLICT и триггеров оценка пишется чтением и записью, счетчики обновляются явно"""
+    from sqlalchemy import text
+    from app import aggregates, upserts
+    from app.models import LessonStats, Rating
+
+    monkeypatch.setattr(upserts, "_INSERTS", {})
+    monkeypatch.setattr(aggregates, "TRIGGER_DIALECTS", ())
+    for trigger in ("ratings_stats_ai", "ratings_stats_au", "ratings_stats_ad"):
+        db.execute(text(f"DROP TRIGGER {trigger}"))
+
+    first = upserts.upsert_rating(db, test_user.id, test_lesson.id, 2)
+    db.commit()
+    second = upserts.upsert_rating(db, test_user.id, test_lesson.id, 5)
+    db.commit()
+
+    assert first.id == second.id
+    assert db.query(Rating).filter(Rating.lesson_id == test_lesson.id).count() == 1
+    stats = db.get(LessonStats, test_lesson.id)
+    db.refresh(stats)
+    assert (stats.rating_sum, stats.rating_count) == (5, 1)
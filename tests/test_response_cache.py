@@ -0,0 +1,139 @@
+import time
+
+import pytest
+from fastapi import status
+
+from app.response_cache import CacheBackend, RedisBackend, ResponseCache, catalog_cache
+
+
+def test_catalog_response_cached_with_etag(client, test_course, db):
+    """Тест: повторный запрос отдается из кэша, совпадающий ETag дает 304 без тела"""
+    first = client.get("/courses/", params={"limit": 5, "skip": 0})
+    assert first.status_code == status.HTTP_200_OK
+    assert first.headers["x-cache"] == "MISS"
+    etag = first.headers["etag"]
+
+    # Изменение в обход обработчиков не видно, пока кэш не инвалидирован
+    test_course.title = "Changed Directly"
+    db.commit()
+
+    second = client.get("/courses/", params={"skip": 0, "limit": 5})
+    assert second.headers["x-cache"] == "HIT"
+    assert second.headers["etag"] == etag
+    assert second.json() == first.json()
+
+    not_modified = client.get("/courses/", params={"limit": 5, "skip": 0}, headers={"If-None-Match": etag})
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    catalog_cache.invalidate()
+    fresh = client.get("/courses/", params={"limit": 5, "skip": 0}, headers={"If-None-Match": etag})
+    assert fresh.status_code == status.HTTP_200_OK
+    assert fresh.json()[0]["title"] == "Changed Directly"
+    assert fresh.headers["etag"] != etag
+
+
+def test_catalog_cache_invalidated_by_handlers(authorized_client, test_course, test_lesson):
+    """Тест: создание и изменение курсов и уроков сбрасывает кэш каталога"""
+    assert authorized_client.get(f"/courses/{test_course.id}").json()["title"] == test_course.title
+    lessons = authorized_client.get("/lessons/", params={"course_id": test_course.id}).json()
+    assert len(lessons) == 1
+
+    response = authorized_client.put(f"/courses/{test_course.id}", json={"title": "Updated Title"})
+    assert response.status_code == status.HTTP_200_OK
+    assert authorized_client.get(f"/courses/{test_course.id}").json()["title"] == "Updated Title"
+
+    response = authorized_client.post("/lessons/", json={
+        "course_id": test_course.id,
+        "title": "Second Lesson",
+        "video_url": "https://example.com/second.mp4",
+        "content": "Second lesson content",
+        "order": 2,
+    })
+    assert response.status_code == status.HTTP_200_OK
+    lessons = authorized_client.get("/lessons/", params={"course_id": test_course.id}).json()
+    assert [lesson["title"] for lesson in lessons] == [test_lesson.title, "Second Lesson"]
+    assert len(authorized_client.get(f"/courses/{test_course.id}").json()["lessons"]) == 2
+
+
+def test_not_found_is_not_cached(client, db):
+    """Тест: ошибки не кэшируются"""
+    assert client.get("/courses/999").status_code == status.HTTP_404_NOT_FOUND
+    response = client.get("/courses/999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert "x-cache" not in response.headers
+
+
+class _FakeRedis:
+    """Минимальный клиент с API redis-py (get/set/incr/scan_iter/delete)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, time.monotonic() + ex if ex else None)
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.data[key] = (str(value).encode(), None)
+        return value
+
+    def scan_iter(self, match):
+        return [key for key in list(self.data) if key.startswith(match.rstrip("*"))]
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_redis_backend_generations():
+    """Тест Redis-совместимого хранилища: сохранение ответа и инвалидация поколением"""
+    from app.response_cache import CachedResponse
+
+    cache = ResponseCache(RedisBackend(_FakeRedis()), name="test", ttl=30)
+    key = cache.key(cache.generation(), "/api/courses/", "b=2&a=1")
+    assert key == cache.key(0, "/api/courses/", "a=1&b=2")
+
+    response = CachedResponse(status=200, headers=[(b"content-type", b"application/json")],
+                              body=b'[{"id": 1}]\n', etag='"abc"')
+    cache.set(key, response)
+    assert cache.get(key) == response
+
+    cache.invalidate()
+    assert cache.generation() == 1
+    assert cache.get(cache.key(cache.generation(), "/api/courses/", "a=1&b=2")) is None
+
+    cache.clear()
+    assert cache.get(key) is None
+
+
+def test_redis_backend_requires_package(monkeypatch):
+    """Тест: без пакета redis хранилище не создается"""
+    import builtins
+
+    real_import = builtins.__import__
+
+    def fake_import(name, *args, **kwargs):
+        if name == "redis":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", fake_import)
+    with pytest.raises(RuntimeError):
+        RedisBackend.from_url("redis://localhost:6379/0")
+
+
+def test_incomplete_backend_rejected_on_creation():
+    """Тест: хранилище без части методов не создается (ошибка не откладывается до запроса)"""
+    class GetOnlyBackend(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()
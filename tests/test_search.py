@@ -0,0 +1,59 @@
+from fastapi import status
+
+from app import models
+from app.response_cache import catalog_cache
+from app.search import fts5_query, search_terms, tsquery
+
+
+def _add_course(db, author_id, title, description):
+    course = models.Course(title=title, description=description, author_id=author_id)
+    db.add(course)
+    db.commit()
+    db.refresh(course)
+    return course
+
+
+def _titles(client, search):
+    response = client.get("/courses/", params={"search": search})
+    assert response.status_code == status.HTTP_200_OK
+    return [course["title"] for course in response.json()]
+
+
+def test_search_query_builders():
+    """Тест разбора поискового запроса: операторы и кавычки отбрасываются"""
+    terms = search_terms('Py "OR" data-science*')
+
+    assert terms == ["py", "or", "data", "science"]
+    assert fts5_query(terms) == '"py"* "or"* "data"* "science"*'
+    assert tsquery(terms) == "py:* & or:* & data:* & science:*"
+
+
+def test_search_ranking_and_prefix(client, db, test_user):
+    """Тест ранжирования (название важнее описания) и поиска по префиксу"""
+    _add_course(db, test_user.id, "Web development", "Backend with Python and FastAPI")
+    _add_course(db, test_user.id, "Python basics", "Introduction to programming")
+    _add_course(db, test_user.id, "Основы Python", "Программирование для начинающих")
+
+    assert _titles(client, "pyth")[:2] == ["Python basics", "Основы Python"]
+    assert _titles(client, "pyth")[2] == "Web development"
+    assert _titles(client, "программ") == ["Основы Python"]
+    assert _titles(client, "python fast") == ["Web development"]
+    assert _titles(client, "!!!") == []
+
+
+def test_search_index_follows_updates_and_deletes(client, db, test_user):
+    """Тест синхронизации индекса при изменении и удалении курса"""
+    course = _add_course(db, test_user.id, "Rust for beginners", "Systems programming")
+    assert _titles(client, "rust") == ["Rust for beginners"]
+
+    course.title = "Go for beginners"
+    db.commit()
+    # Изменения в обход обработчиков не сбрасывают кэш ответов каталога
+    catalog_cache.invalidate()
+    assert _titles(client, "rust") == []
+    assert _titles(client, "go") == ["Go for beginners"]
+
+    db.delete(course)
+    db.commit()
+    catalog_cache.invalidate()
+    assert _titles(client, "go") == []
@@ -17,7 +17,7 @@ def test_get_current_user_unauthorized(client):
     response = client.get("/users/me")
     
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
-    assert "Could not validate credentials" in response.json()["detail"]
+    assert response.json()["detail"] == "Not authenticated"
 
 
 def test_update_current_user(authorized_client, test_user, db):
@@ -89,3 +89,20 @@ def test_update_user_admin(admin_client, test_user, db):
     updated_user = db.query(pytest.importorskip("app.models").User).filter_by(id=test_user.id).first()
     assert updated_user.full_name == "Admin Updated Name"
     assert updated_user.email == "adminupdated@example.com"
+
+
+def test_current_user_cached_and_invalidated(authorized_client, test_user):
+    """Тест кэша пользователя: повторный запрос без обращения к БД, сброс после изменения"""
+    from app.security import principal_cache
+
+    hits_before = principal_cache._hits.value
+    authorized_client.get("/users/me")
+    response = authorized_client.get("/users/me")
+    assert response.status_code == status.HTTP_200_OK
+    assert principal_cache._hits.value > hits_before
+
+    response = authorized_client.put("/users/me", json={"full_name": "Renamed User"})
+    assert response.status_code == status.HTTP_200_OK
+
+    response = authorized_client.get("/users/me")
+    assert response.json()["full_name"] == "Renamed User"